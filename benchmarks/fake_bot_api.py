@@ -0,0 +1,280 @@
+"""
+Локальний імітатор Telegram Bot API для навантажувального тестування
+
+Відповідає на getUpdates (long polling), sendMessage, sendPhoto, sendVideo,
+sendDocument, sendMediaGroup, editMessageText, getFile та завантаження
+файлів за тими ж шляхами, що й api.telegram.org:
+
+    POST /bot<token>/<метод>
+    GET  /file/bot<token>/<шлях>
+
+Файли віддаються як JPEG (якщо встановлено Pillow), тож бот проходить і
+етап створення превʼю. Решта методів (answerCallbackQuery,
+deleteMessages, ...) відповідають ``true``. Може додавати затримку до кожного запиту і відповідати 429
+з retry_after на частину запитів.
+
+Генератор навантаження кладе оновлення через push_update() і чекає на
+відповідь бота в чаті через wait_for().
+"""
+import asyncio
+import io
+import json
+import os
+import random
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+# Параметри, які клієнти передають рядком JSON
+_JSON_PARAMS = frozenset({'reply_markup', 'media', 'message_ids', 'allowed_updates', 'entities'})
+
+# Методи, що надсилають повідомлення в чат
+_SEND_METHODS = frozenset({'sendMessage', 'sendPhoto', 'sendVideo', 'sendDocument', 'editMessageText'})
+
+BOT_USER = {
+    'id': 1000,
+    'is_bot': True,
+    'first_name': 'Load test bot',
+    'username': 'load_test_bot',
+    'can_join_groups': False,
+    'can_read_all_group_messages': False,
+    'supports_inline_queries': False,
+}
+
+
+def make_jpeg(size: int) -> bytes:
+    """
+    Фото 1600×1200 у форматі JPEG, доповнене нулями після кінця зображення
+    до ``size`` байт
+
+    Без Pillow повертає випадкові байти: бот тоді теж не створює превʼю.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return os.urandom(size)
+
+    noise = Image.effect_noise((1600, 1200), 8)
+    gradient = Image.linear_gradient('L').resize((1600, 1200))
+    image = Image.merge('RGB', (noise, gradient, noise.transpose(Image.Transpose.ROTATE_180)))
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=75)
+    data = buffer.getvalue()
+    return data + bytes(max(0, size - len(data)))
+
+
+class FakeBotAPI:
+    """
+    Імітатор Bot API на aiohttp
+
+    Args:
+        latency: Середня затримка відповіді на запит, секунди (крім getUpdates)
+        jitter: Розкид затримки, частка від latency
+        rate_limit: Частка запитів, на які відповідається 429
+        retry_after: Значення retry_after у відповідях 429, секунди
+        file_size: Розмір файлів, що віддаються при завантаженні, байти
+            (не менший за розмір згенерованого JPEG)
+        seed: Зерно генератора випадкових чисел (для повторюваних запусків)
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.5,
+        rate_limit: float = 0.0,
+        retry_after: int = 1,
+        file_size: int = 200 * 1024,
+        seed: Optional[int] = None
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        # Файл генерується один раз і віддається на кожне завантаження
+        self.file_data = make_jpeg(file_size)
+        self.file_size = len(self.file_data)
+        self.calls: Counter = Counter()
+        self.rate_limited: Counter = Counter()
+        self.polling = asyncio.Event()
+        self._random = random.Random(seed)
+        self._updates: deque = deque()
+        self._has_updates = asyncio.Event()
+        self._update_id = 0
+        self._message_id = 0
+        self._last_messages: Dict[int, dict] = {}
+        self._waiters: Dict[int, List[Tuple[Callable[[str], bool], asyncio.Future]]] = {}
+        self._runner: Optional[web.AppRunner] = None
+        self.url = ''
+
+    # --- Сервер ---
+
+    def create_app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_route('*', '/bot{token}/{method}', self.handle_method)
+        app.router.add_get('/file/bot{token}/{path:.+}', self.handle_file)
+        return app
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """Запускає сервер і повертає його адресу (порт 0 - вільний порт)"""
+        self._runner = web.AppRunner(self.create_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f'http://{host}:{port}'
+        return self.url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    # --- Оновлення та відповіді бота ---
+
+    def push_update(self, **update: Any) -> dict:
+        """Додає оновлення в чергу getUpdates (update_id призначається тут)"""
+        self._update_id += 1
+        update['update_id'] = self._update_id
+        self._updates.append(update)
+        self._has_updates.set()
+        return update
+
+    def next_message_id(self) -> int:
+        self._message_id += 1
+        return self._message_id
+
+    def last_message(self, chat_id: int) -> Optional[dict]:
+        """Останнє повідомлення бота в чаті (для callback_query.message)"""
+        return self._last_messages.get(chat_id)
+
+    def wait_for(self, chat_id: int, predicate: Callable[[str], bool]) -> asyncio.Future:
+        """
+        Future, що завершиться, коли бот надішле в чат повідомлення, текст
+        або підпис якого задовольняє predicate. Реєструється до надсилання
+        оновлення, тож відповідь не буде пропущена.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(chat_id, []).append((predicate, future))
+        return future
+
+    def _deliver(self, chat_id: int, message: dict) -> None:
+        self._last_messages[chat_id] = message
+        waiters = self._waiters.get(chat_id)
+        if not waiters:
+            return
+        text = message.get('text') or message.get('caption') or ''
+        for waiter in waiters[:]:
+            predicate, future = waiter
+            if future.done():
+                waiters.remove(waiter)
+            elif predicate(text):
+                future.set_result(time.perf_counter())
+                waiters.remove(waiter)
+
+    # --- Методи Bot API ---
+
+    async def handle_method(self, request: web.Request) -> web.Response:
+        method = request.match_info['method']
+        params = await self._read_params(request)
+        self.calls[method] += 1
+
+        if method == 'getUpdates':
+            self.polling.set()
+            return self._ok(await self._get_updates(params))
+
+        if self.latency:
+            spread = self.latency * self.jitter
+            await asyncio.sleep(max(0.0, self._random.uniform(self.latency - spread, self.latency + spread)))
+        if self.rate_limit and self._random.random() < self.rate_limit:
+            self.rate_limited[method] += 1
+            return web.json_response({
+                'ok': False,
+                'error_code': 429,
+                'description': f'Too Many Requests: retry after {self.retry_after}',
+                'parameters': {'retry_after': self.retry_after},
+            }, status=429)
+
+        if method == 'getMe':
+            return self._ok(BOT_USER)
+        if method in _SEND_METHODS:
+            return self._ok(self._send(method, params))
+        if method == 'sendMediaGroup':
+            chat_id = int(params['chat_id'])
+            return self._ok([
+                self._send('sendMediaGroup', {'chat_id': chat_id, 'caption': media.get('caption')})
+                for media in params['media']
+            ])
+        if method == 'getFile':
+            file_id = params['file_id']
+            return self._ok({
+                'file_id': file_id,
+                'file_unique_id': file_id,
+                'file_size': self.file_size,
+                'file_path': f'files/{file_id}',
+            })
+        return self._ok(True)
+
+    async def handle_file(self, request: web.Request) -> web.Response:
+        self.calls['downloadFile'] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return web.Response(body=self.file_data, content_type='image/jpeg')
+
+    async def _get_updates(self, params: Dict[str, Any]) -> List[dict]:
+        offset = int(params.get('offset') or 0)
+        limit = int(params.get('limit') or 100)
+        timeout = float(params.get('timeout') or 0)
+
+        # Оновлення з id меншим за offset підтверджені клієнтом
+        while self._updates and self._updates[0]['update_id'] < offset:
+            self._updates.popleft()
+        if not self._updates and timeout:
+            self._has_updates.clear()
+            try:
+                await asyncio.wait_for(self._has_updates.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return [update for _, update in zip(range(limit), self._updates)]
+
+    def _send(self, method: str, params: Dict[str, Any]) -> dict:
+        chat_id = int(params['chat_id'])
+        if method == 'editMessageText' and params.get('message_id'):
+            message_id = int(params['message_id'])
+        else:
+            message_id = self.next_message_id()
+        message = {
+            'message_id': message_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': BOT_USER,
+        }
+        if params.get('text') is not None:
+            message['text'] = params['text']
+        if params.get('caption') is not None:
+            message['caption'] = params['caption']
+        if method == 'sendDocument':
+            message['document'] = {'file_id': f'doc{message_id}', 'file_unique_id': f'doc{message_id}'}
+        reply_markup = params.get('reply_markup')
+        if isinstance(reply_markup, dict) and 'inline_keyboard' in reply_markup:
+            message['reply_markup'] = reply_markup
+        self._deliver(chat_id, message)
+        return message
+
+    @staticmethod
+    async def _read_params(request: web.Request) -> Dict[str, Any]:
+        if request.content_type == 'application/json':
+            return await request.json()
+        params: Dict[str, Any] = dict(request.query)
+        for name, value in (await request.post()).items():
+            if not isinstance(value, str):
+                value = value.file.read() if hasattr(value, 'file') else value
+            elif name in _JSON_PARAMS:
+                value = json.loads(value)
+            params[name] = value
+        return params
+
+    @staticmethod
+    def _ok(result: Any) -> web.Response:
+        return web.json_response({'ok': True, 'result': result})
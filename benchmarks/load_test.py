@@ -0,0 +1,426 @@
+"""
+Навантажувальний тест: одночасне заповнення заявок багатьма користувачами
+
+Запускає імітатор Bot API (benchmarks/fake_bot_api.py), бота в окремому
+процесі, спрямованого на імітатор, і проганяє сценарії діалогу:
+
+- ptb: /new_application -> ... -> handle_confirm (handlers/conversation.py);
+- aiogram: "🔧 Поломка" -> ... -> confirm_request (routers/breakdown.py).
+
+Кожен крок - оновлення в getUpdates і очікування відповіді бота в чаті
+користувача. Звіт: p50/p95/p99 затримки кроків, запити до API на завершену
+заявку, пікова RSS процесу бота.
+
+Запуск з кореня репозиторію:
+    python benchmarks/load_test.py --flow ptb --users 500
+    python benchmarks/load_test.py --flow all --users 100 --latency 0.05 --rate-limit 0.01
+
+Із заданим REDIS_HOST бот зберігає заявки, нагадування та стан діалогів
+aiogram (FSM, DialogManager, UserManager) у Redis, як у кількох репліках:
+    REDIS_HOST=localhost python benchmarks/load_test.py --flow aiogram --users 100
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_bot_api import FakeBotAPI  # noqa: E402
+
+TOKEN = '123456:LOAD-TEST-TOKEN'
+ENGINEER_ID = 999
+FIRST_USER_ID = 10_000
+DESCRIPTION = "Принтер не друкує перший шар, сопло забивається після 10 хвилин друку."
+
+
+class SimulatedUser:
+    """Формує оновлення від імені одного користувача"""
+
+    def __init__(self, server: FakeBotAPI, user_id: int):
+        self.server = server
+        self.id = user_id
+        self.profile = {'id': user_id, 'is_bot': False, 'first_name': 'Тест', 'last_name': str(user_id)}
+        self._files = 0
+
+    def _message(self, **fields) -> dict:
+        return {
+            'message_id': self.server.next_message_id(),
+            'date': int(time.time()),
+            'chat': {'id': self.id, 'type': 'private'},
+            'from': self.profile,
+            **fields,
+        }
+
+    def text(self, text: str) -> dict:
+        return {'message': self._message(text=text)}
+
+    def command(self, command: str) -> dict:
+        text = f'/{command}'
+        entities = [{'type': 'bot_command', 'offset': 0, 'length': len(text)}]
+        return {'message': self._message(text=text, entities=entities)}
+
+    def callback(self, data: str) -> dict:
+        return {'callback_query': {
+            'id': str(self.server.next_message_id()),
+            'from': self.profile,
+            'chat_instance': str(self.id),
+            'data': data,
+            'message': self.server.last_message(self.id),
+        }}
+
+    def photo(self) -> dict:
+        self._files += 1
+        file_id = f'photo-{self.id}-{self._files}'
+        size = {
+            'file_id': file_id,
+            'file_unique_id': file_id,
+            'width': 1280,
+            'height': 960,
+            'file_size': self.server.file_size,
+        }
+        return {'message': self._message(photo=[size])}
+
+
+@dataclass(frozen=True)
+class Step:
+    """Крок сценарію: оновлення від користувача і фрагмент очікуваної відповіді"""
+    name: str
+    update: Callable[[SimulatedUser], dict]
+    expect: str
+
+
+PTB_SCENARIO = (
+    Step('new_application', lambda u: u.command('new_application'), "ім'я та прізвище"),
+    Step('name', lambda u: u.text('Олександр Петренко'), 'email адресу'),
+    Step('email', lambda u: u.text(f'user{u.id}@example.com'), 'номер телефону'),
+    Step('phone', lambda u: u.text(f'050{u.id:07d}'), 'номер замовлення'),
+    Step('order_number', lambda u: u.text('123456'), 'модель вашого 3D-принтера'),
+    Step('printer_model', lambda u: u.callback('printer_0'), 'тип філаменту'),
+    Step('filament_type', lambda u: u.callback('filament_type_0'), 'виробника філаменту'),
+    Step('filament_manufacturer', lambda u: u.callback('filament_man_0'), 'фото або відео'),
+    Step('photo', lambda u: u.photo(), 'Фото додано'),
+    Step('skip_photos', lambda u: u.callback('skip'), '3D модель'),
+    Step('skip_model', lambda u: u.callback('skip'), 'проблему та додаткову інформацію'),
+    Step('description', lambda u: u.text(DESCRIPTION), 'підтвердіть відправку'),
+    Step('confirm', lambda u: u.callback('confirm'), 'Заявка успішно відправлена'),
+)
+
+AIOGRAM_SCENARIO = (
+    Step('start_breakdown', lambda u: u.text('🔧 Поломка'), 'номер вашого замовлення'),
+    Step('order', lambda u: u.text('немає'), "Ім'я і Прізвище"),
+    Step('name', lambda u: u.text('Олександр Петренко'), 'номер телефону'),
+    Step('phone', lambda u: u.text(f'+38050{u.id:07d}'), 'модель вашого принтеру'),
+    Step('printer_model', lambda u: u.text('P1S (Combo)'), 'код поломки'),
+    Step('description', lambda u: u.text(DESCRIPTION), 'Надішліть фото або відео'),
+    Step('photo', lambda u: u.photo(), 'Файл додано'),
+    Step('finish_photos', lambda u: u.text('Далі'), 'Перевірте дані'),
+    Step('confirm', lambda u: u.text('✅ Підтверджую'), 'тему звернення'),
+)
+
+SCENARIOS = {'ptb': PTB_SCENARIO, 'aiogram': AIOGRAM_SCENARIO}
+
+
+@dataclass
+class FlowResult:
+    flow: str
+    users: int
+    completed: int = 0
+    duration: float = 0.0
+    latencies: Dict[str, List[float]] = field(default_factory=lambda: defaultdict(list))
+    timeouts: Counter = field(default_factory=Counter)
+    calls: Counter = field(default_factory=Counter)
+    rate_limited: Counter = field(default_factory=Counter)
+    max_rss_kb: int = 0
+
+
+# --- Генератор навантаження ---
+
+async def run_user(
+    server: FakeBotAPI,
+    scenario,
+    user: SimulatedUser,
+    result: FlowResult,
+    timeout: float,
+    think: float,
+    rng: random.Random
+) -> None:
+    for step in scenario:
+        reply = server.wait_for(user.id, lambda text, marker=step.expect: marker in text)
+        started = time.perf_counter()
+        server.push_update(**step.update(user))
+        try:
+            finished = await asyncio.wait_for(reply, timeout)
+        except asyncio.TimeoutError:
+            result.timeouts[step.name] += 1
+            return
+        result.latencies[step.name].append(finished - started)
+        if think:
+            await asyncio.sleep(rng.uniform(0, 2 * think))
+    result.completed += 1
+
+
+async def run_flow(flow: str, args: argparse.Namespace) -> FlowResult:
+    server = FakeBotAPI(
+        latency=args.latency,
+        rate_limit=args.rate_limit,
+        file_size=args.file_size,
+        seed=args.seed
+    )
+    url = await server.start()
+    result = FlowResult(flow, args.users)
+
+    with tempfile.TemporaryDirectory() as media_dir:
+        env = {
+            **os.environ,
+            'TELEGRAM_TOKEN': TOKEN,
+            'ENGINEER_TELEGRAM_ID': str(ENGINEER_ID),
+            'MEDIA_STORAGE_PATH': media_dir,
+            'LOG_LEVEL': os.getenv('LOG_LEVEL', 'WARNING'),
+            'LOG_FORMAT': os.getenv('LOG_FORMAT', 'text'),
+        }
+        command = [sys.executable, os.path.abspath(__file__), '--bot', flow, '--api', url]
+        if flow == 'ptb':
+            command += ['--concurrent-updates', str(args.concurrent_updates)]
+        process = await asyncio.create_subprocess_exec(
+            *command, env=env, stdout=asyncio.subprocess.PIPE
+        )
+        try:
+            # Чекаємо, поки бот почне отримувати оновлення
+            polling = asyncio.ensure_future(server.polling.wait())
+            exited = asyncio.ensure_future(process.wait())
+            await asyncio.wait({polling, exited}, timeout=60, return_when=asyncio.FIRST_COMPLETED)
+            exited.cancel()
+            if not polling.done():
+                polling.cancel()
+                raise RuntimeError(f"Бот {flow} не запустився")
+            server.calls.clear()
+
+            rng = random.Random(args.seed)
+            scenario = SCENARIOS[flow]
+
+            async def user_session(index: int) -> None:
+                await asyncio.sleep(index * args.ramp / args.users)
+                user = SimulatedUser(server, FIRST_USER_ID + index)
+                await run_user(server, scenario, user, result, args.timeout, args.think, rng)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(user_session(index) for index in range(args.users)))
+            result.duration = time.perf_counter() - started
+            result.calls = Counter(server.calls)
+            result.rate_limited = Counter(server.rate_limited)
+        finally:
+            if process.returncode is None:
+                process.send_signal(signal.SIGTERM)
+            output, _ = await process.communicate()
+            await server.stop()
+
+    for line in output.decode().splitlines()[::-1]:
+        if line.startswith('{'):
+            result.max_rss_kb = json.loads(line)['max_rss_kb']
+            break
+    return result
+
+
+# --- Боти (запускаються в окремому процесі) ---
+
+def run_ptb_bot(api_url: str, concurrent_updates: int) -> None:
+    """Бот на python-telegram-bot з обробниками handlers/"""
+    sys.path.insert(0, ROOT)
+    from telegram.ext import Application
+
+    from src.handlers import register_commands, register_conversation_handlers
+    from src.services.container import ServiceContainer
+    from src.services.context import CONTEXT_TYPES, set_services
+    from src.services.update_processor import PerUserUpdateProcessor
+    from src.utils.logging_config import setup_logging
+
+    setup_logging()
+    # Сервіси з MEDIA_STORAGE_PATH тимчасової директорії, як у main.py
+    services = ServiceContainer()
+
+    async def on_startup(_: Application) -> None:
+        await services.reminder_service.start()
+
+    async def on_shutdown(_: Application) -> None:
+        await services.close()
+
+    # Як у main.py; з concurrent_updates=1 оновлення обробляються послідовно
+    update_processor = PerUserUpdateProcessor(concurrent_updates, max(concurrent_updates, 1000))
+    application = (
+        Application.builder()
+        .token(TOKEN)
+        .base_url(f'{api_url}/bot')
+        .base_file_url(f'{api_url}/file/bot')
+        .update_queue(update_processor.create_update_queue(1000))
+        .concurrent_updates(update_processor)
+        .context_types(CONTEXT_TYPES)
+        .job_queue(None)
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+        .build()
+    )
+    set_services(application, services)
+    register_commands(application)
+    register_conversation_handlers(application)
+
+    application.run_polling(poll_interval=0, timeout=10)
+
+
+def run_aiogram_bot(api_url: str) -> None:
+    """Бот на aiogram з роутером routers/breakdown.py"""
+    sys.path.insert(0, os.path.join(ROOT, 'src'))
+    from aiogram import Bot, Dispatcher
+    from aiogram.client.session.aiohttp import AiohttpSession
+    from aiogram.client.telegram import TelegramAPIServer
+
+    from middlewares.setup_middlewares import setup_middlewares
+    from models.dialog import DialogManager
+    from models.storage import create_state_storages
+    from models.user import UserManager
+    from routers import breakdown
+    from services.container import ServiceContainer
+    from services.message_service import MessageService
+    from services.send_scheduler import SendScheduler
+    from utils.logging_config import setup_logging
+
+    setup_logging()
+    bot = Bot(TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(api_url)))
+    # Із REDIS_HOST стан FSM, діалогів і користувачів зберігається в Redis
+    storages = create_state_storages()
+    dialog_manager = DialogManager(storages.dialogs)
+    services = ServiceContainer(
+        bot,
+        dialog_manager=dialog_manager,
+        user_manager=UserManager(storages.users),
+        message_service=MessageService(
+            bot, dialog_manager, SendScheduler(priority_chat_ids=[ENGINEER_ID])
+        )
+    )
+
+    dp = Dispatcher(storage=storages.fsm)
+    setup_middlewares(dp, services)
+    dp.include_router(breakdown.router)
+    dp.run_polling(bot, polling_timeout=10)
+
+
+def run_bot(args: argparse.Namespace) -> None:
+    import resource
+
+    if args.bot == 'ptb':
+        run_ptb_bot(args.api, args.concurrent_updates)
+    else:
+        run_aiogram_bot(args.api)
+    # Генератор навантаження читає пікову пам'ять з останнього рядка виводу
+    print(json.dumps({'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}), flush=True)
+
+
+# --- Звіт ---
+
+def percentile(values: List[float], q: float) -> float:
+    """Перцентиль методом найближчого рангу"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))]
+
+
+def report(result: FlowResult) -> None:
+    print(f"\n{result.flow}: {result.users} користувачів, завершено заявок: {result.completed}, "
+          f"час: {result.duration:.1f} с")
+    if result.timeouts:
+        print(f"  тайм-аути по кроках: {dict(result.timeouts)}")
+
+    print(f"  {'крок':24} {'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9}")
+    every_step = []
+    for step in SCENARIOS[result.flow]:
+        values = result.latencies.get(step.name)
+        if not values:
+            continue
+        every_step += values
+        print(f"  {step.name:24} " + ' '.join(
+            f"{percentile(values, q) * 1e3:9.1f}" for q in (50, 95, 99)
+        ))
+    if every_step:
+        print(f"  {'усі кроки':24} " + ' '.join(
+            f"{percentile(every_step, q) * 1e3:9.1f}" for q in (50, 95, 99)
+        ))
+
+    calls = Counter({method: n for method, n in result.calls.items() if method != 'getUpdates'})
+    if result.completed:
+        per_application = sum(calls.values()) / result.completed
+        methods = ', '.join(f"{method} {n / result.completed:.1f}" for method, n in calls.most_common())
+        print(f"  запитів до API на заявку: {per_application:.1f} ({methods})")
+    if result.rate_limited:
+        print(f"  відповідей 429: {dict(result.rate_limited)}")
+    print(f"  пікова RSS бота: {result.max_rss_kb / 1024:.1f} МБ")
+
+
+def to_json(result: FlowResult) -> dict:
+    return {
+        'flow': result.flow,
+        'users': result.users,
+        'completed': result.completed,
+        'duration': result.duration,
+        'latency': {
+            step: {f'p{q}': percentile(values, q) for q in (50, 95, 99)}
+            for step, values in result.latencies.items()
+        },
+        'timeouts': dict(result.timeouts),
+        'calls': dict(result.calls),
+        'rate_limited': dict(result.rate_limited),
+        'max_rss_kb': result.max_rss_kb,
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--flow', choices=('ptb', 'aiogram', 'all'), default='all')
+    parser.add_argument('--users', type=int, default=500, help='кількість користувачів')
+    parser.add_argument('--ramp', type=float, default=5.0, help='за скільки секунд стартують усі користувачі')
+    parser.add_argument('--think', type=float, default=0.0, help='середня пауза між кроками, с')
+    parser.add_argument('--timeout', type=float, default=60.0, help='тайм-аут відповіді на крок, с')
+    parser.add_argument('--latency', type=float, default=0.0, help='затримка відповіді Bot API, с')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='частка відповідей 429')
+    parser.add_argument('--file-size', type=int, default=200 * 1024, help='розмір файлів, байти')
+    parser.add_argument('--concurrent-updates', type=int, default=64,
+                        help='скільки користувачів PTB обробляє одночасно (1 - послідовно)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='зберегти результати у файл JSON')
+    # Внутрішній режим: запуск самого бота
+    parser.add_argument('--bot', choices=tuple(SCENARIOS), help=argparse.SUPPRESS)
+    parser.add_argument('--api', help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+async def run(args: argparse.Namespace) -> List[FlowResult]:
+    flows = tuple(SCENARIOS) if args.flow == 'all' else (args.flow,)
+    results = []
+    for flow in flows:
+        result = await run_flow(flow, args)
+        report(result)
+        results.append(result)
+    return results
+
+
+def main() -> None:
+    args = parse_args()
+    if args.bot:
+        run_bot(args)
+        return
+
+    results = asyncio.run(run(args))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump([to_json(result) for result in results], file, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Бенчмарк пам'яті записів Application та DialogState
+
+Порівнює 100k записів у вигляді звичайних dataclass (як було раніше, з
+``__dict__`` у кожного екземпляра) та поточних класів зі ``__slots__``,
+а також швидкість бінарної серіалізації.
+
+Запуск з кореня репозиторію:
+    python benchmarks/models_memory.py [кількість записів]
+"""
+import copy
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from dataclasses import MISSING, field, fields, make_dataclass
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from models.application import Application  # noqa: E402
+from models.dialog import DialogState  # noqa: E402
+
+
+def legacy_class(cls):
+    """Та сама модель без __slots__ - звичайний dataclass, як до оптимізації"""
+    spec = []
+    for f in fields(cls):
+        if f.default is not MISSING:
+            spec.append((f.name, f.type, field(default=f.default)))
+        elif f.default_factory is not MISSING:
+            spec.append((f.name, f.type, field(default_factory=f.default_factory)))
+        else:
+            spec.append((f.name, f.type))
+    return make_dataclass(f'Legacy{cls.__name__}', spec)
+
+
+def make_application(cls, index: int):
+    return cls(
+        user_id=index,
+        full_name=f"Користувач {index}",
+        email=f"user{index}@example.com",
+        phone_number=f"+380{index:09d}",
+        printer_model="Bambu Lab X1 Carbon",
+        problem_description="Принтер не друкує перший шар",
+        photos=[f"https://example.com/media/photos/{index}/1.jpg"],
+        created_at=datetime.now(timezone.utc)
+    )
+
+
+def make_dialog(cls, index: int):
+    return cls(
+        user_id=index,
+        order_number=str(100000 + index),
+        user_name=f"Користувач {index}",
+        phone_number=f"+380{index:09d}",
+        printer_model="Bambu Lab P1S",
+        current_step="waiting_media",
+        started_at=datetime.now(timezone.utc)
+    )
+
+
+def measure(factory, cls, count: int, shared: bool = False) -> int:
+    """
+    Пам'ять (у байтах), яку займають count записів
+
+    З shared=True записи - копії одного запису зі спільними значеннями полів,
+    тобто вимірюються лише самі екземпляри.
+    """
+    template = factory(cls, 0)
+    gc.collect()
+    tracemalloc.start()
+    if shared:
+        records = [copy.copy(template) for _ in range(count)]
+    else:
+        records = [factory(cls, i) for i in range(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return size
+
+
+def measure_serialization(factory, cls, count: int) -> tuple:
+    """Час to_bytes()/from_bytes() для count записів, у секундах"""
+    records = [factory(cls, i) for i in range(count)]
+    start = time.perf_counter()
+    blobs = [record.to_bytes() for record in records]
+    dumped = time.perf_counter() - start
+    start = time.perf_counter()
+    for blob in blobs:
+        cls.from_bytes(blob)
+    loaded = time.perf_counter() - start
+    return dumped, loaded, sum(map(len, blobs)) / count
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    print(f"Записів: {count}")
+    for cls, factory in ((Application, make_application), (DialogState, make_dialog)):
+        legacy = legacy_class(cls)
+        for title, shared in (("з даними", False), ("екземпляри", True)):
+            before = measure(factory, legacy, count, shared)
+            after = measure(factory, cls, count, shared)
+            print(
+                f"{cls.__name__:12} {title:10}  dataclass: {before / 2**20:6.1f} MiB  "
+                f"slots: {after / 2**20:6.1f} MiB  "
+                f"({(1 - after / before) * 100:.0f}% менше)"
+            )
+        dumped, loaded, blob_size = measure_serialization(factory, cls, count)
+        print(
+            f"{'':12} to_bytes: {dumped / count * 1e6:.2f} мкс  "
+            f"from_bytes: {loaded / count * 1e6:.2f} мкс  "
+            f"розмір: {blob_size:.0f} байт"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Бенчмарк холодного старту: час імпорту src.main
+
+Запускає ``python -X importtime -c "import src.main"`` у новому процесі
+кілька разів і показує загальний час імпорту та найдорожчі модулі (за
+власним часом і за пакетами верхнього рівня).
+
+Заодно перевіряє, що імпорт не тягне модулі, які мають завантажуватися
+лише за потреби (aiohttp - тільки для HTTP-сервера, redis - тільки з
+REDIS_HOST, сервіси - при першому зверненні). При порушенні, або якщо
+задано --budget-ms і його перевищено, завершується з кодом 1, тож його
+можна запускати в CI як регресійну перевірку. Той самий список
+відкладених модулів перевіряє тест tests/test_startup.py.
+
+Запуск з кореня репозиторію:
+    python benchmarks/startup.py [--runs 5] [--top 15] [--budget-ms 600]
+"""
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Модулі, які не повинні імпортуватися разом із src.main
+DEFERRED_MODULES = (
+    'aiohttp',
+    'redis',
+    'dotenv',
+    'src.services.webhook_server',
+    'src.services.media_storage',
+    'src.services.reminder_service',
+    'src.services.error_handler',
+)
+
+
+def measure() -> List[Tuple[str, int, int]]:
+    """Один запуск: список (модуль, власний час, накопичений час) у мкс"""
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import src.main'],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        env={**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'}
+    )
+    if process.returncode != 0:
+        sys.exit(f"Імпорт src.main завершився з помилкою:\n{process.stderr[-2000:]}")
+
+    modules = []
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--budget-ms', type=float, help='максимальний час імпорту src.main')
+    args = parser.parse_args()
+
+    # Перший запуск прогріває кеш байткоду та файлової системи
+    measure()
+    runs = [measure() for _ in range(args.runs)]
+    totals = [next(cumulative for name, _, cumulative in run if name == 'src.main') for run in runs]
+    best = runs[totals.index(min(totals))]
+
+    print(f"import src.main: мін {min(totals) / 1e3:.1f} мс, "
+          f"медіана {sorted(totals)[len(totals) // 2] / 1e3:.1f} мс ({args.runs} запусків)")
+
+    print("\nНайдорожчі модулі (власний час, мс):")
+    for name, self_us, _ in sorted(best, key=lambda module: -module[1])[:args.top]:
+        print(f"  {self_us / 1e3:7.1f}  {name}")
+
+    packages: Dict[str, int] = defaultdict(int)
+    for name, self_us, _ in best:
+        packages[name.split('.')[0]] += self_us
+    print("\nЗа пакетами (мс):")
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {self_us / 1e3:7.1f}  {package}")
+
+    failures = []
+    imported = {name for name, _, _ in best}
+    for module in DEFERRED_MODULES:
+        if any(name == module or name.startswith(module + '.') for name in imported):
+            failures.append(f"{module} імпортується разом із src.main")
+    if args.budget_ms is not None and min(totals) / 1e3 > args.budget_ms:
+        failures.append(f"час імпорту {min(totals) / 1e3:.1f} мс перевищує {args.budget_ms} мс")
+
+    if failures:
+        print("\nРегресія:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\nВідкладені модулі не імпортуються")
+
+
+if __name__ == '__main__':
+    main()
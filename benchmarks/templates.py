@@ -0,0 +1,212 @@
+"""
+Бенчмарк рендерингу повідомлень
+
+Порівнює попередні реалізації Application.to_message (ланцюжок ``+=``) та
+DialogState.get_summary (список + join) - як є і з html.escape кожного
+значення, що потрібно для parse_mode='HTML' - з поточними
+скомпільованими шаблонами, а також розбиття довгого тексту на повідомлення.
+
+Запуск з кореня репозиторію:
+    python benchmarks/templates.py [кількість повторів]
+"""
+import html
+import os
+import sys
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from models.application import Application  # noqa: E402
+from models.dialog import DialogState  # noqa: E402
+from utils.templates import escape, split_message  # noqa: E402
+
+
+def legacy_to_message(self) -> str:
+    message = "📋 <b>Нова заявка на сервісне обслуговування</b>\n\n"
+    message += f"👤 <b>Клієнт:</b> {self.full_name}\n"
+    message += f"📧 <b>Email:</b> {self.email}\n"
+    message += f"📱 <b>Телефон:</b> {self.phone_number}\n"
+    if self.order_number:
+        message += f"🛒 <b>Номер замовлення:</b> {self.order_number}\n"
+    message += "\n<b>Інформація про принтер:</b>\n"
+    if self.printer_model:
+        message += f"🖨️ <b>Модель принтера:</b> {self.printer_model}\n"
+    if self.filament_type:
+        message += f"🧵 <b>Тип філаменту:</b> {self.filament_type}\n"
+    if self.filament_manufacturer:
+        message += f"🏭 <b>Виробник філаменту:</b> {self.filament_manufacturer}\n"
+    if self.problem_description:
+        message += f"\n📝 <b>Опис проблеми:</b>\n{self.problem_description}\n"
+    message += f"\n🕐 <b>Час створення:</b> {self.created_at.strftime('%d.%m.%Y %H:%M')}\n"
+    if self.photos:
+        message += f"\n📷 <b>Фото/відео:</b> {len(self.photos)} файлів\n"
+        for i, photo_url in enumerate(self.photos[:5], 1):
+            message += f"  {i}. {photo_url}\n"
+        if len(self.photos) > 5:
+            message += f"  ... та ще {len(self.photos) - 5} файлів\n"
+    if self.model_file:
+        message += f"\n📦 <b>3D модель:</b> {self.model_file}\n"
+    return message
+
+
+def legacy_escaped_to_message(self) -> str:
+    """Попередня реалізація з html.escape для кожного значення - еталон для шаблонів"""
+    e = lambda value: html.escape(str(value), quote=False)
+    message = "📋 <b>Нова заявка на сервісне обслуговування</b>\n\n"
+    message += f"👤 <b>Клієнт:</b> {e(self.full_name)}\n"
+    message += f"📧 <b>Email:</b> {e(self.email)}\n"
+    message += f"📱 <b>Телефон:</b> {e(self.phone_number)}\n"
+    if self.order_number:
+        message += f"🛒 <b>Номер замовлення:</b> {e(self.order_number)}\n"
+    message += "\n<b>Інформація про принтер:</b>\n"
+    if self.printer_model:
+        message += f"🖨️ <b>Модель принтера:</b> {e(self.printer_model)}\n"
+    if self.filament_type:
+        message += f"🧵 <b>Тип філаменту:</b> {e(self.filament_type)}\n"
+    if self.filament_manufacturer:
+        message += f"🏭 <b>Виробник філаменту:</b> {e(self.filament_manufacturer)}\n"
+    if self.problem_description:
+        message += f"\n📝 <b>Опис проблеми:</b>\n{e(self.problem_description)}\n"
+    message += f"\n🕐 <b>Час створення:</b> {self.created_at.strftime('%d.%m.%Y %H:%M')}\n"
+    if self.photos:
+        message += f"\n📷 <b>Фото/відео:</b> {len(self.photos)} файлів\n"
+        for i, photo_url in enumerate(self.photos[:5], 1):
+            message += f"  {i}. {e(photo_url)}\n"
+        if len(self.photos) > 5:
+            message += f"  ... та ще {len(self.photos) - 5} файлів\n"
+    if self.model_file:
+        message += f"\n📦 <b>3D модель:</b> {e(self.model_file)}\n"
+    return message
+
+
+def legacy_escaped_get_summary(self) -> str:
+    """Попередня реалізація з html.escape для кожного значення"""
+    e = lambda value: html.escape(str(value), quote=False)
+    summary_parts = []
+    if self.order_number:
+        summary_parts.append(f"📋 Номер замовлення: {e(self.order_number)}")
+    else:
+        summary_parts.append("📑 Замовлення: Купували не у нас")
+    if self.user_name:
+        summary_parts.append(f"👤 Контактна особа: {e(self.user_name)}")
+    if self.phone_number:
+        summary_parts.append(f"📱 Телефон: {e(self.phone_number)}")
+    if self.printer_model:
+        summary_parts.append(f"🖨 Модель принтера: {e(self.printer_model)}")
+    if self.issue_description:
+        summary_parts.append(f"❗️ Опис проблеми:\n{e(self.issue_description)}")
+    if self.photo_files or self.video_files:
+        media_count = len(self.photo_files) + len(self.video_files)
+        summary_parts.append(f"📎 Додано медіафайлів: {media_count}")
+    return "\n\n".join(summary_parts)
+
+
+def legacy_get_summary(self) -> str:
+    summary_parts = []
+    if self.order_number:
+        summary_parts.append(f"📋 Номер замовлення: {self.order_number}")
+    else:
+        summary_parts.append("📑 Замовлення: Купували не у нас")
+    if self.user_name:
+        summary_parts.append(f"👤 Контактна особа: {self.user_name}")
+    if self.phone_number:
+        summary_parts.append(f"📱 Телефон: {self.phone_number}")
+    if self.printer_model:
+        summary_parts.append(f"🖨 Модель принтера: {self.printer_model}")
+    if self.issue_description:
+        summary_parts.append(f"❗️ Опис проблеми:\n{self.issue_description}")
+    if self.photo_files or self.video_files:
+        media_count = len(self.photo_files) + len(self.video_files)
+        summary_parts.append(f"📎 Додано медіафайлів: {media_count}")
+    return "\n\n".join(summary_parts)
+
+
+DESCRIPTION = "Принтер не друкує перший шар, сопло забивається після 10 хвилин друку. " * 4
+
+
+def make_application() -> Application:
+    return Application(
+        user_id=1,
+        full_name="Олександр Петренко",
+        email="user@example.com",
+        phone_number="+380501234567",
+        order_number="123456",
+        printer_model="Bambu Lab X1 Carbon",
+        filament_type="PLA",
+        filament_manufacturer="Bambu Lab",
+        problem_description=DESCRIPTION,
+        photos=[f"https://example.com/media/photos/1/{i}.jpg" for i in range(7)],
+        model_file="https://example.com/media/models/1/part.3mf",
+        created_at=datetime(2024, 5, 1, 12, 30)
+    )
+
+
+def make_dialog() -> DialogState:
+    return DialogState(
+        user_id=1,
+        order_number="123456",
+        user_name="Олександр Петренко",
+        phone_number="+380501234567",
+        printer_model="P1S (Combo)",
+        issue_description=DESCRIPTION,
+        photo_files=['a', 'b', 'c'],
+        video_files=['d']
+    )
+
+
+def report(title: str, seconds: float, number: int, baseline: float = None) -> None:
+    line = f"  {title:40} {seconds / number * 1e6:7.2f} мкс"
+    if baseline:
+        line += f"  x{baseline / seconds:.2f}"
+    print(line)
+
+
+def bench(func, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5))
+
+
+def main() -> None:
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    application = make_application()
+    dialog = make_dialog()
+
+    # Без спецсимволів HTML результат не змінився
+    assert application.to_message() == legacy_to_message(application)
+    assert dialog.get_summary() == legacy_get_summary(dialog)
+    dialog.user_name = "<script>"
+    assert "&lt;script&gt;" in dialog.get_summary()
+    dialog.user_name = "Олександр Петренко"
+
+    print("Application.to_message:")
+    baseline = bench(lambda: legacy_to_message(application), number)
+    report("legacy (+=, без екранування)", baseline, number)
+    escaped = bench(lambda: legacy_escaped_to_message(application), number)
+    report("legacy + html.escape", escaped, number)
+    report("шаблони (x - відносно legacy + escape)", bench(application.to_message, number), number, escaped)
+
+    print("DialogState.get_summary:")
+    baseline = bench(lambda: legacy_get_summary(dialog), number)
+    report("legacy (join, без екранування)", baseline, number)
+    escaped = bench(lambda: legacy_escaped_get_summary(dialog), number)
+    report("legacy + html.escape", escaped, number)
+    report("шаблони (x - відносно legacy + escape)", bench(dialog.get_summary, number), number, escaped)
+
+    print("escape:")
+    report("без спецсимволів", bench(lambda: escape(DESCRIPTION), number), number)
+    report("зі спецсимволами", bench(lambda: escape(DESCRIPTION + "<b> & </b>"), number), number)
+
+    print("split_message:")
+    text = application.to_message()
+    report(f"{len(text)} символів (1 частина)", bench(lambda: split_message(text), number), number)
+    long_text = "\n\n".join([text] * 5)
+    chunks = split_message(long_text)
+    report(
+        f"{len(long_text)} символів ({len(chunks)} частини)",
+        bench(lambda: split_message(long_text), number // 10),
+        number // 10
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Мікробенчмарк валідаторів
+
+Порівнює попередню реалізацію (re.match/re.sub зі строковими шаблонами на
+кожен виклик), поточні скомпільовані валідатори та пакетну validate_many.
+
+Запуск з кореня репозиторію:
+    python benchmarks/validators.py [кількість значень]
+"""
+import os
+import random
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.validators import parse_phone, validate_email, validate_many  # noqa: E402
+
+
+def legacy_validate_email(email: str) -> bool:
+    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+    return bool(re.match(pattern, email))
+
+
+def legacy_validate_phone(phone: str) -> bool:
+    digits_only = re.sub(r'\D', '', phone)
+    if digits_only.startswith('380'):
+        digits_only = '0' + digits_only[3:]
+    return len(digits_only) == 10 and digits_only.startswith('0')
+
+
+def sample_phones(count: int) -> list:
+    rng = random.Random(1)
+    formats = (
+        '0{}', '+380{}', '380{}', '+38 (0{}{}) {}{}{}-{}{}-{}{}',
+        '0{}{} {}{}{} {}{} {}{}', '12345', '+1 555 010 9999'
+    )
+    phones = []
+    for _ in range(count):
+        digits = ''.join(rng.choice('0123456789') for _ in range(9))
+        fmt = rng.choice(formats)
+        phones.append(fmt.format(*digits) if '{}{}' in fmt else fmt.format(digits))
+    return phones
+
+
+def sample_emails(count: int) -> list:
+    rng = random.Random(2)
+    domains = ('gmail.com', 'ukr.net', 'i.ua', 'example', 'bambulab.com.ua')
+    return [f"user.{rng.randint(1, 10**6)}@{rng.choice(domains)}" for _ in range(count)]
+
+
+def report(title: str, seconds: float, count: int, baseline: float = None) -> None:
+    line = f"  {title:32} {seconds * 1e3:8.1f} мс  {seconds / count * 1e9:7.0f} нс/значення"
+    if baseline:
+        line += f"  x{baseline / seconds:.1f}"
+    print(line)
+
+
+def bench(func, repeat: int = 5) -> float:
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    phones = sample_phones(count)
+    emails = sample_emails(count)
+
+    # Пакетна перевірка має збігатися з поштучною
+    assert validate_many(phones, 'phone') == [parse_phone(phone) for phone in phones]
+    assert validate_many(emails, 'email') == [e if validate_email(e) else None for e in emails]
+
+    print(f"Телефони ({count}):")
+    baseline = bench(lambda: [legacy_validate_phone(p) for p in phones])
+    report("legacy validate_phone", baseline, count)
+    report("parse_phone", bench(lambda: [parse_phone(p) for p in phones]), count, baseline)
+    report("validate_many(phone)", bench(lambda: validate_many(phones, 'phone')), count, baseline)
+
+    print(f"Email ({count}):")
+    baseline = bench(lambda: [legacy_validate_email(e) for e in emails])
+    report("legacy validate_email", baseline, count)
+    report("validate_email", bench(lambda: [validate_email(e) for e in emails]), count, baseline)
+    report("validate_many(email)", bench(lambda: validate_many(emails, 'email')), count, baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,7 @@ from models.dialog import DialogManager
 from services.message_service import MessageService
 from utils.validators import IssueDescriptionValidator
 from utils.keyboards import remove_keyboard, get_next_keyboard
+from utils.messages import ISSUE_DESCRIPTION_CONFIRMED
 
 class IssueDescriptionInputComponent:
 	"""
@@ -40,7 +41,7 @@ class IssueDescriptionInputComponent:
 		# Відправляємо підтвердження
 		await self.message_service.send_message(
 			chat_id=message.chat.id,
-			text=f"✅ Зафіксували опис проблеми: {result}",
+			text=ISSUE_DESCRIPTION_CONFIRMED.render(description=result),
 			keyboard=remove_keyboard
 		)
 		
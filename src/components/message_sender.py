@@ -1,12 +1,16 @@
-from aiogram import Bot
 from aiogram.types import Message, ReplyKeyboardMarkup, ReplyKeyboardRemove
 
+from services.message_service import MessageService
+
 class MessageSender:
 	"""
 	Компонент для надсилання повідомлень користувачу
+
+	Запити до Telegram проходять через MessageService, тобто через його
+	планувальник з лімітами швидкості.
 	"""
-	def __init__(self, bot: Bot):
-		self.bot = bot
+	def __init__(self, message_service: MessageService):
+		self.message_service = message_service
 		
 	async def send_message(
 		self,
@@ -17,10 +21,10 @@ class MessageSender:
 		"""
 		Надсилає повідомлення користувачу
 		"""
-		return await self.bot.send_message(
+		return await self.message_service.send_message(
 			chat_id=chat_id,
 			text=text,
-			reply_markup=keyboard
+			keyboard=keyboard
 		)
 
 	async def delete_message(self, chat_id: int, message_id: int) -> bool:
@@ -28,6 +32,7 @@ class MessageSender:
 		Видаляє повідомлення
 		"""
 		try:
-			return await self.bot.delete_message(chat_id=chat_id, message_id=message_id)
+			await self.message_service.delete_messages(chat_id, [message_id])
+			return True
 		except Exception:
 			return False
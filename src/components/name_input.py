@@ -5,6 +5,7 @@ from models.dialog import DialogManager
 from models.user import UserManager
 from components.message_sender import MessageSender
 from utils.keyboards import remove_keyboard
+from utils.messages import NAME_CONFIRMED
 
 class NameInputComponent:
 	"""
@@ -52,6 +53,6 @@ class NameInputComponent:
 		await self.message_sender.send_message(
 			update,
 			context,
-			f"✅ Зафіксували ваші дані: {first_name} {last_name}",
-			keyboard=remove_keyboard()
+			NAME_CONFIRMED.render(first_name=first_name, last_name=last_name),
+			keyboard=remove_keyboard
 		)
\ No newline at end of file
@@ -2,6 +2,7 @@ from aiogram.types import Message
 
 from models.dialog import DialogManager
 from services.message_service import MessageService
+from utils.messages import ORDER_CONFIRMED, ORDER_NOT_FOUND
 
 class OrderInputComponent:
 	"""
@@ -28,9 +29,9 @@ class OrderInputComponent:
 		)
 		
 		# Відправляємо підтвердження
-		confirmation_text = ("✅ Зафіксували, що ви купували не у нас" 
-						   if order_number.lower() == 'немає' 
-						   else f"✅ Зафіксували номер замовлення: {order_number}")
+		confirmation_text = (ORDER_NOT_FOUND
+						   if order_number.lower() == 'немає'
+						   else ORDER_CONFIRMED.render(order_number=order_number))
 		
 		await self.message_service.send_message(
 			chat_id=message.chat.id,
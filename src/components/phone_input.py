@@ -4,6 +4,7 @@ from models.dialog import DialogManager
 from services.message_service import MessageService
 from utils.validators import PhoneValidator
 from utils.keyboards import get_phone_keyboard, remove_keyboard
+from utils.messages import PHONE_CONFIRMED
 
 class PhoneInputComponent:
 	"""
@@ -47,6 +48,6 @@ class PhoneInputComponent:
 		# Відправляємо підтвердження
 		await self.message_service.send_message(
 			chat_id=message.chat.id,
-			text=f"✅ Зафіксували ваш номер телефону: {result}",
-			keyboard=remove_keyboard()
+			text=PHONE_CONFIRMED.render(phone=result),
+			keyboard=remove_keyboard
 		)
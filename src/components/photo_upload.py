@@ -75,7 +75,7 @@ class PhotoUploadComponent:
 			)
 			
 		except Exception as e:
-			logger.error(f"Error processing media upload: {str(e)}")
+			logger.error("Error processing media upload: %s", e)
 			await self._send_error_message(message.chat.id, "Виникла помилка при обробці файлу")
 	
 	async def _validate_file(self, message: Message) -> Optional[Tuple[str, bool]]:
@@ -2,6 +2,7 @@ from aiogram.types import Message
 from models.dialog import DialogManager
 from services.message_service import MessageService
 from utils.keyboards import get_printer_model_keyboard, remove_keyboard
+from utils.messages import MODEL_CONFIRMED
 
 class PrinterModelInputComponent:
 	"""
@@ -28,6 +29,6 @@ class PrinterModelInputComponent:
 		# Відправляємо підтвердження
 		await self.message_service.send_message(
 			chat_id=message.chat.id,
-			text=f"✅ Зафіксували модель принтеру: {model}",
+			text=MODEL_CONFIRMED.render(model=model),
 			keyboard=remove_keyboard
 		)
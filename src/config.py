@@ -1,15 +1,46 @@
+"""
+Конфигурация бота
+
+Файл .env и переменные окружения читаются один раз при первом обращении к
+настройке, а не при импорте модуля: импорт не падает без переменных и не
+тратит время холодного старта.
+"""
 import os
 import logging
-from dotenv import load_dotenv
-
-load_dotenv()
+from functools import cached_property
+from typing import Optional
 
 logger = logging.getLogger('config')
 
+_env_loaded = False
+
+
+def load_env() -> None:
+    """Загружает .env один раз; уже заданные переменные окружения не перезаписываются"""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+
 class Config:
-    """Конфигурация бота"""
-    TOKEN = os.getenv('TELEGRAM_TOKEN')
-    ENGINEER_TELEGRAM_ID = int(os.getenv('ENGINEER_TELEGRAM_ID'))
+    """Конфигурация бота; каждое значение вычисляется при первом обращении"""
 
-config = Config()
+    @cached_property
+    def TOKEN(self) -> Optional[str]:
+        load_env()
+        return os.getenv('TELEGRAM_TOKEN')
+
+    @cached_property
+    def ENGINEER_TELEGRAM_ID(self) -> Optional[int]:
+        """ID инженера, которому отправляются заявки (None, если не задан)"""
+        load_env()
+        value = os.getenv('ENGINEER_TELEGRAM_ID')
+        if not value:
+            logger.error("ENGINEER_TELEGRAM_ID не задан")
+            return None
+        return int(value)
 
+
+config = Config()
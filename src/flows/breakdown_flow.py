@@ -11,7 +11,7 @@ from models.dialog import DialogManager
 from models.user import UserManager
 from utils.messages import (
 	BREAKDOWN_START, REQUEST_ORDER, REQUEST_NAME, REQUEST_PHONE, 
-	REQUEST_PRINTER_MODEL, REQUEST_ISSUE_DESCRIPTION
+	REQUEST_PRINTER_MODEL, REQUEST_ISSUE_DESCRIPTION, NAME_CONFIRMED
 )
 from utils.keyboards import remove_keyboard, get_phone_keyboard, get_profile_name_keyboard, get_printer_model_keyboard
 
@@ -90,7 +90,7 @@ class BreakdownFlow:
 				dialog.current_step = "phone_input"
 				await self.message_sender.send_message(
 					message.chat.id,
-					f"✅ Зафіксували ваші дані: {user.first_name} {user.last_name or ''}",
+					NAME_CONFIRMED.render(first_name=user.first_name, last_name=user.last_name or ''),
 					keyboard=remove_keyboard
 				)
 				await self.message_sender.send_message(
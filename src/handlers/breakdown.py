@@ -17,7 +17,7 @@ async def handle_breakdown(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     Обробляє початок діалогу гілки 'Поломка'
     """
     user = update.effective_user
-    logger.info(f"Користувач {user.id} ({user.full_name}) обрав розділ 'Поломка'")
+    logger.info("Користувач %s (%s) обрав розділ 'Поломка'", user.id, user.full_name)
     
     await update.message.reply_text(BREAKDOWN_START)
     await update.message.reply_text(REQUEST_ORDER)
@@ -1,5 +1,4 @@
 from telegram import Update
-from telegram.ext import ContextTypes
 from ..handlers.conversation import (
     WAITING_PRINTER_MODEL,
     WAITING_FILAMENT_TYPE,
@@ -15,7 +14,6 @@ from ..handlers.conversation import (
     skip_photos,
     skip_model_file,
     cancel,
-    active_applications,
 )
 from ..keyboards.inline import (
     get_printer_model_keyboard,
@@ -27,30 +25,39 @@ from ..keyboards.inline import (
     FILAMENT_TYPES,
     FILAMENT_MANUFACTURERS,
 )
-import os
+from ..config import config
+from ..services.context import BotContext
+from ..services.delivery import DeliveryItem, DeliveryPlan, guess_media_kind, plan_delivery
+from ..utils.templates import split_message
+from telegram import InputMediaPhoto, InputMediaVideo
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
 
+logger = logging.getLogger(__name__)
 
-async def handle_printer_model(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+
+async def handle_printer_model(update: Update, context: BotContext) -> int:
     """Обробка вибору моделі принтера"""
     return await get_printer_model_callback(update, context)
 
 
-async def handle_filament_type(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+async def handle_filament_type(update: Update, context: BotContext) -> int:
     """Обробка вибору типу філаменту"""
     return await get_filament_type_callback(update, context)
 
 
-async def handle_filament_manufacturer(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+async def handle_filament_manufacturer(update: Update, context: BotContext) -> int:
     """Обробка вибору виробника філаменту"""
     return await get_filament_manufacturer_callback(update, context)
 
 
-async def handle_skip(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+async def handle_skip(update: Update, context: BotContext) -> int:
     """Обробка пропуску опціональних полів"""
     query = update.callback_query
     user_id = update.effective_user.id
 
-    if user_id not in active_applications:
+    if await context.services.application_store.get(user_id) is None:
         await query.answer("❌ Помилка. Будь ласка, почніть з команди /new_application")
         return ConversationHandler.END
 
@@ -81,65 +88,54 @@ async def handle_skip(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int
     return ConversationHandler.END
 
 
-async def handle_confirm(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+async def handle_confirm(update: Update, context: BotContext) -> int:
     """Підтвердження та відправка заявки інженеру"""
     query = update.callback_query
     user_id = update.effective_user.id
 
-    if user_id not in active_applications:
+    applications = context.services.application_store
+    app = await applications.get(user_id)
+
+    if app is None:
         await query.answer("❌ Помилка. Заявка не знайдена.")
         return ConversationHandler.END
 
-    app = active_applications[user_id]
-
     if not app.is_complete():
         await query.answer("❌ Заявка не повна. Будь ласка, заповніть всі обов'язкові поля.")
         return CONFIRMING
 
-    # Отримуємо ID інженера з змінних оточення
-    engineer_id = os.getenv('ENGINEER_TELEGRAM_ID')
+    # ID інженера читається з конфігурації один раз
+    engineer_id = config.ENGINEER_TELEGRAM_ID
 
     if not engineer_id:
         await query.answer("❌ Помилка конфігурації. Інженер не налаштований.")
         return ConversationHandler.END
 
     try:
-        engineer_id = int(engineer_id)
-
-        # Відправляємо заявку інженеру
-        message_text = app.to_message()
-
-        # Відправляємо текст заявки
-        await context.bot.send_message(
-            chat_id=engineer_id,
-            text=message_text,
-            parse_mode='HTML'
-        )
-
-        # Відправляємо фото/відео якщо є
-        if app.photos:
-            media_group = []
-            for photo_id in app.photos[:10]:  # Telegram дозволяє до 10 файлів в групі
-                media_group.append({
-                    'type': 'photo',
-                    'media': photo_id
-                })
-
-            # Розділяємо на групи по 10 файлів
-            for i in range(0, len(media_group), 10):
-                group = media_group[i:i+10]
-                await context.bot.send_media_group(
-                    chat_id=engineer_id,
-                    media=group
-                )
-
-        # Відправляємо 3D модель якщо є
+        # Відправляємо заявку інженеру: текст як підпис до першого альбому,
+        # 3D модель - після альбомів. Фото відправляються превʼю,
+        # оригінали лишаються доступними за посиланням у тексті
+        # Тип файлу записується при додаванні: без хранилища в photos лише
+        # file_id, за якими тип не визначити. За розширенням URL тип
+        # визначається тільки для заявок, збережених до появи media_kinds
+        items = [
+            DeliveryItem(app.media_kind(media) or guess_media_kind(media), app.preview_url(media))
+            for media in app.photos
+        ]
+        plan = plan_delivery(app.to_message(), items)
+
+        # Запити стають у чергу чату інженера в планувальнику: цей чат
+        # обслуговується першим, при 429 запит повторюється після паузи.
+        # Користувач не чекає на доставку, тож повторне підтвердження
+        # не надсилає інженеру частину заявки ще раз
+        steps = _plan_steps(context.bot, engineer_id, plan)
         if app.model_file:
-            await context.bot.send_document(
+            steps.append((lambda: context.bot.send_document(
                 chat_id=engineer_id,
                 document=app.model_file,
                 caption="3D модель від клієнта"
-            )
+            ), None))
+        _submit_steps(context.services.send_scheduler, engineer_id, steps, user_id)
 
         # Підтверджуємо користувачу
         await query.answer("✅ Заявка успішно відправлена!")
@@ -152,13 +148,14 @@ async def handle_confirm(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         )
 
         # Отменяем напоминания
-        from ..services.context import get_reminder_service
-        reminder_service = get_reminder_service()
-        if reminder_service:
-            reminder_service.cancel_reminders(user_id)
+        await context.services.reminder_service.cancel_reminders(user_id)
         
-        # Видаляємо заявку з активних
-        del active_applications[user_id]
+        # Файли відправленої заявки зберігаються, доки не спливе строк зберігання
+        await context.services.media_retention.mark_submitted(app)
+
+        # Видаляємо заявку з активних; незавершене перекодування вже не знадобиться
+        await applications.delete(user_id)
+        context.services.cancel_media_jobs(user_id)
 
         return ConversationHandler.END
 
@@ -167,6 +164,52 @@ async def handle_confirm(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         return CONFIRMING
 
 
+def _plan_steps(bot, chat_id: int, plan: DeliveryPlan) -> List[Tuple[Callable[..., Awaitable[Any]], Optional[str]]]:
+    """
+    Запити до Telegram для відправки заявки за планом: текст (якщо не
+    вміщується в підпис) та альбоми
+
+    Returns:
+        Пари (factory, text) для SendScheduler.submit: для тексту factory
+        викликається з текстом і клавіатурою, для решти - без аргументів
+    """
+    steps = []
+    if plan.text:
+        for chunk in split_message(plan.text):
+            steps.append((lambda text, keyboard: bot.send_message(chat_id=chat_id, text=text, parse_mode='HTML'), chunk))
+
+    for group in plan.groups:
+        if len(group) == 1:
+            item = group[0]
+            send = bot.send_video if item.kind == 'video' else bot.send_photo
+            steps.append((
+                lambda send=send, item=item: send(chat_id, item.media, caption=item.caption, parse_mode='HTML'),
+                None
+            ))
+            continue
+
+        media = [
+            (InputMediaVideo if item.kind == 'video' else InputMediaPhoto)(
+                media=item.media,
+                caption=item.caption,
+                parse_mode='HTML'
+            )
+            for item in group
+        ]
+        steps.append((lambda media=media: bot.send_media_group(chat_id=chat_id, media=media), None))
+    return steps
+
+
+def _submit_steps(scheduler, chat_id: int, steps, user_id: int) -> None:
+    """Ставить запити в чергу чату, не чекаючи на доставку; помилки записуються в лог"""
+    def on_done(future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            logger.error("Помилка при відправці заявки user_id=%s інженеру: %s", user_id, future.exception())
+
+    for factory, text in steps:
+        scheduler.submit(chat_id, factory, text=text).add_done_callback(on_done)
+
+
 # Callback handlers реєструються всередині ConversationHandler
 # Ця функція більше не використовується
 def register_callback_handlers(application):
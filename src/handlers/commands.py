@@ -1,14 +1,9 @@
 from telegram import Update
-from telegram.ext import ContextTypes
-from ..models.application import Application
 from ..utils.validators import validate_email, validate_phone
+from ..services.context import BotContext
 
 
-# Зберігання активних заявок (в продакшені краще використовувати БД)
-active_applications: dict[int, Application] = {}
-
-
-async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def start(update: Update, context: BotContext) -> None:
     """Обробник команди /start"""
     welcome_message = (
         "👋 <b>Ласкаво просимо до сервісного центру Bambu Lab Україна!</b>\n\n"
@@ -35,21 +30,19 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     )
 
 
-async def new_application(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+async def new_application(update: Update, context: BotContext) -> int:
     """Початок створення нової заявки"""
     from .conversation import WAITING_NAME, ConversationHandler
-    from ..main import reminder_service
     
     user_id = update.effective_user.id
+    applications = context.services.application_store
     
-    # Якщо вже є активна заявка, видаляємо її и отменяем напоминания
-    if user_id in active_applications:
-        if reminder_service:
-            reminder_service.cancel_reminders(user_id)
-        del active_applications[user_id]
+    # Якщо вже є активна заявка, отменяем напоминания
+    if await applications.get(user_id) is not None:
+        await context.services.reminder_service.cancel_reminders(user_id)
     
-    # Створюємо нову заявку
-    active_applications[user_id] = Application(user_id=user_id)
+    # Створюємо нову заявку (заменяет существующую)
+    await applications.create(user_id)
     
     await update.message.reply_text(
         "📝 <b>Створення нової заявки</b>\n\n"
@@ -60,7 +53,7 @@ async def new_application(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     return WAITING_NAME
 
 
-async def info(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def info(update: Update, context: BotContext) -> None:
     """Обробник команди /info"""
     info_message = (
         "ℹ️ <b>Інформація про сервісний центр</b>\n\n"
@@ -4,30 +4,32 @@ from aiogram.types import Message
 from aiogram.utils.markdown import hbold
 
 from keyboards.reply import get_main_keyboard
+from services.message_service import MessageService
 from utils.messages import WELCOME_MESSAGE, QUALITY_START, FAQ_START
 
 router = Router(name="common")
 
 @router.message(Command("start"))
-async def cmd_start(message: Message):
+async def cmd_start(message: Message, message_service: MessageService):
 	"""
 	Обработчик команды /start
 	"""
-	await message.answer(
-		WELCOME_MESSAGE.format(name=hbold(message.from_user.full_name)),
-		reply_markup=get_main_keyboard()
+	await message_service.send_message(
+		chat_id=message.chat.id,
+		text=WELCOME_MESSAGE.format(name=hbold(message.from_user.full_name)),
+		keyboard=get_main_keyboard()
 	)
 
 @router.message(lambda m: m.text == "🖨 Якість друку")
-async def handle_quality(message: Message):
+async def handle_quality(message: Message, message_service: MessageService):
 	"""
 	Обработчик раздела качества печати
 	"""
-	await message.answer(QUALITY_START)
+	await message_service.send_message(chat_id=message.chat.id, text=QUALITY_START)
 
 @router.message(lambda m: m.text == "❓ Питання / Відповідь")
-async def handle_faq(message: Message):
+async def handle_faq(message: Message, message_service: MessageService):
 	"""
 	Обработчик раздела вопросов
 	"""
-	await message.answer(FAQ_START)
\ No newline at end of file
+	await message_service.send_message(chat_id=message.chat.id, text=FAQ_START)
\ No newline at end of file
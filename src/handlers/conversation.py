@@ -1,8 +1,10 @@
 import logging
+from typing import List, Optional, Tuple
 from telegram import Update
-from telegram.ext import ContextTypes, ConversationHandler, MessageHandler, filters, CallbackQueryHandler
+from telegram.ext import ConversationHandler, MessageHandler, filters, CallbackQueryHandler
 from ..models.application import Application
-from ..utils.validators import validate_email, validate_phone
+from ..utils.validators import validate_email, parse_phone
+from ..utils.templates import split_message
 from ..keyboards.inline import (
     get_skip_keyboard, 
     get_confirm_keyboard,
@@ -13,7 +15,8 @@ from ..keyboards.inline import (
     FILAMENT_TYPES,
     FILAMENT_MANUFACTURERS
 )
-from .commands import active_applications
+from ..services.context import BotContext
+from ..services.media_group import MediaGroupItem
 
 logger = logging.getLogger(__name__)
 
@@ -33,13 +36,12 @@ logger = logging.getLogger(__name__)
 ) = range(11)
 
 
-async def get_name(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+async def get_name(update: Update, context: BotContext) -> int:
     """Отримання імені та прізвища"""
-    from ..services.context import get_reminder_service
-    
     user_id = update.effective_user.id
+    applications = context.services.application_store
     
-    if user_id not in active_applications:
+    if await applications.get(user_id) is None:
         await update.message.reply_text(
             "❌ Помилка. Будь ласка, почніть з команди /new_application"
         )
@@ -53,12 +55,10 @@ async def get_name(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         )
         return WAITING_NAME
     
-    active_applications[user_id].full_name = full_name
+    application = await applications.update(user_id, full_name=full_name)
     
     # Планируем напоминания после ввода имени
-    reminder_service = get_reminder_service()
-    if reminder_service:
-        reminder_service.schedule_reminders(user_id, active_applications[user_id])
+    await context.services.reminder_service.schedule_reminders(user_id, application)
     
     await update.message.reply_text(
         "✅ Дякую! Тепер введіть ваш <b>email адресу</b>:",
@@ -68,7 +68,7 @@ async def get_name(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     return WAITING_EMAIL
 
 
-async def get_email(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+async def get_email(update: Update, context: BotContext) -> int:
     """Отримання email"""
     user_id = update.effective_user.id
     email = update.message.text.strip()
@@ -79,7 +79,7 @@ async def get_email(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         )
         return WAITING_EMAIL
 
-    active_applications[user_id].email = email
+    await context.services.application_store.update(user_id, email=email)
 
     await update.message.reply_text(
         "✅ Дякую! Тепер введіть ваш <b>номер телефону</b> "
@@ -90,19 +90,19 @@ async def get_email(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     return WAITING_PHONE
 
 
-async def get_phone(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+async def get_phone(update: Update, context: BotContext) -> int:
     """Отримання номера телефону"""
     user_id = update.effective_user.id
-    phone = update.message.text.strip()
+    phone = parse_phone(update.message.text)
 
-    if not validate_phone(phone):
+    if phone is None:
         await update.message.reply_text(
             "❌ Будь ласка, введіть коректний номер телефону "
             "(український формат, наприклад: 0501234567):"
         )
         return WAITING_PHONE
 
-    active_applications[user_id].phone_number = phone
+    await context.services.application_store.update(user_id, phone_number=phone)
 
     await update.message.reply_text(
         "✅ Дякую! Якщо ви купували у нас, вкажіть <b>номер замовлення</b> "
@@ -115,12 +115,12 @@ async def get_phone(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     return WAITING_ORDER_NUMBER
 
 
-async def get_order_number(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+async def get_order_number(update: Update, context: BotContext) -> int:
     """Отримання номера замовлення"""
     user_id = update.effective_user.id
     order_number = update.message.text.strip()
 
-    active_applications[user_id].order_number = order_number
+    await context.services.application_store.update(user_id, order_number=order_number)
 
     await update.message.reply_text(
         "✅ Дякую! Оберіть <b>модель вашого 3D-принтера</b>:",
@@ -131,11 +131,11 @@ async def get_order_number(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     return WAITING_PRINTER_MODEL
 
 
-async def skip_order_number(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+async def skip_order_number(update: Update, context: BotContext) -> int:
     """Пропуск номера замовлення"""
     user_id = update.effective_user.id
 
-    if user_id not in active_applications:
+    if await context.services.application_store.get(user_id) is None:
         await update.callback_query.answer("❌ Помилка. Будь ласка, почніть з команди /new_application")
         return ConversationHandler.END
 
@@ -149,18 +149,19 @@ async def skip_order_number(update: Update, context: ContextTypes.DEFAULT_TYPE)
     return WAITING_PRINTER_MODEL
 
 
-async def get_printer_model_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+async def get_printer_model_callback(update: Update, context: BotContext) -> int:
     """Обробка вибору моделі принтера з клавіатури"""
     user_id = update.effective_user.id
     query = update.callback_query
+    applications = context.services.application_store
 
-    if user_id not in active_applications:
+    if await applications.get(user_id) is None:
         await query.answer("❌ Помилка. Будь ласка, почніть з команди /new_application")
         return ConversationHandler.END
 
     if query.data.startswith("printer_"):
         model_index = int(query.data.split("_")[1])
-        active_applications[user_id].printer_model = PRINTER_MODELS[model_index]
+        await applications.update(user_id, printer_model=PRINTER_MODELS[model_index])
 
         await query.answer()
         await query.edit_message_text(
@@ -175,18 +176,19 @@ async def get_printer_model_callback(update: Update, context: ContextTypes.DEFAU
     return WAITING_PRINTER_MODEL
 
 
-async def get_filament_type_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+async def get_filament_type_callback(update: Update, context: BotContext) -> int:
     """Обробка вибору типу філаменту"""
     user_id = update.effective_user.id
     query = update.callback_query
+    applications = context.services.application_store
 
-    if user_id not in active_applications:
+    if await applications.get(user_id) is None:
         await query.answer("❌ Помилка. Будь ласка, почніть з команди /new_application")
         return ConversationHandler.END
 
     if query.data.startswith("filament_type_"):
         filament_index = int(query.data.split("_")[2])
-        active_applications[user_id].filament_type = FILAMENT_TYPES[filament_index]
+        await applications.update(user_id, filament_type=FILAMENT_TYPES[filament_index])
 
         await query.answer()
         await query.edit_message_text(
@@ -201,18 +203,19 @@ async def get_filament_type_callback(update: Update, context: ContextTypes.DEFAU
     return WAITING_FILAMENT_TYPE
 
 
-async def get_filament_manufacturer_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+async def get_filament_manufacturer_callback(update: Update, context: BotContext) -> int:
     """Обробка вибору виробника філаменту"""
     user_id = update.effective_user.id
     query = update.callback_query
+    applications = context.services.application_store
 
-    if user_id not in active_applications:
+    if await applications.get(user_id) is None:
         await query.answer("❌ Помилка. Будь ласка, почніть з команди /new_application")
         return ConversationHandler.END
 
     if query.data.startswith("filament_man_"):
         manufacturer_index = int(query.data.split("_")[2])
-        active_applications[user_id].filament_manufacturer = FILAMENT_MANUFACTURERS[manufacturer_index]
+        await applications.update(user_id, filament_manufacturer=FILAMENT_MANUFACTURERS[manufacturer_index])
 
         await query.answer()
         await query.edit_message_text(
@@ -229,12 +232,24 @@ async def get_filament_manufacturer_callback(update: Update, context: ContextTyp
     return WAITING_FILAMENT_MANUFACTURER
 
 
-async def get_photos(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+async def get_photos(update: Update, context: BotContext) -> int:
     """Отримання фото/відео"""
-    from ..services.context import get_media_storage
-    
     user_id = update.effective_user.id
-    media_storage = get_media_storage()
+    media_storage = context.services.media_storage
+    applications = context.services.application_store
+    
+    # Без активної заявки файли не завантажуємо
+    application = await applications.get(user_id)
+    if application is None:
+        await update.message.reply_text(
+            "❌ Помилка. Будь ласка, почніть з команди /new_application"
+        )
+        return ConversationHandler.END
+    
+    # Файли альбому збираємо разом і відповідаємо одним повідомленням
+    collector = context.services.media_group_collector
+    if collector and update.message.media_group_id and (update.message.photo or update.message.video):
+        return _add_to_album(update, context, collector, application)
     
     try:
         if update.message.photo:
@@ -243,33 +258,36 @@ async def get_photos(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
             file_id = photo.file_id
             
             # Сохраняем временный file_id
-            active_applications[user_id].photo_file_ids.append(file_id)
+            await applications.append(user_id, 'photo_file_ids', file_id)
             
             # Скачиваем и сохраняем файл
+            saved = []
             if media_storage:
                 file = await context.bot.get_file(file_id)
-                file_data = await file.download_as_bytearray()
-                _, file_url = media_storage.save_file(
-                    bytes(file_data), 
-                    'photo', 
+                file_path, file_url = await media_storage.save_from_url(
+                    file.file_path,
+                    'photo',
                     user_id
                 )
-                active_applications[user_id].photos.append(file_url)
+                saved.append((file_path, file_url))
+                application = await _add_media(applications, user_id, file_url, 'photo')
             else:
                 # Если хранилище не настроено, используем file_id
-                active_applications[user_id].photos.append(file_id)
+                application = await _add_media(applications, user_id, file_id, 'photo')
             
-            count = len(active_applications[user_id].photos)
+            count = len(application.photos)
             if count < 10:
                 await update.message.reply_text(
                     f"✅ Фото додано ({count}/10). Можете надіслати ще фото або натисніть 'Пропустити':",
                     reply_markup=get_skip_keyboard()
                 )
+                await _add_previews(context, user_id, saved)
             else:
                 await update.message.reply_text(
                     "✅ Досягнуто максимум фото (10). Переходимо далі.",
                     reply_markup=get_skip_keyboard()
                 )
+                await _add_previews(context, user_id, saved)
                 return await skip_photos(update, context)
             
             return WAITING_PHOTOS
@@ -278,22 +296,22 @@ async def get_photos(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
             file_id = update.message.video.file_id
             
             # Сохраняем временный file_id
-            active_applications[user_id].photo_file_ids.append(file_id)
+            await applications.append(user_id, 'photo_file_ids', file_id)
             
             # Скачиваем и сохраняем файл
             if media_storage:
                 file = await context.bot.get_file(file_id)
-                file_data = await file.download_as_bytearray()
-                _, file_url = media_storage.save_file(
-                    bytes(file_data), 
-                    'video', 
+                file_path, file_url = await media_storage.save_from_url(
+                    file.file_path,
+                    'video',
                     user_id
                 )
-                active_applications[user_id].photos.append(file_url)
+                application = await _add_media(applications, user_id, file_url, 'video')
+                _submit_videos(context, user_id, [(file_path, file_url)])
             else:
-                active_applications[user_id].photos.append(file_id)
+                application = await _add_media(applications, user_id, file_id, 'video')
             
-            count = len(active_applications[user_id].photos)
+            count = len(application.photos)
             if count < 10:
                 await update.message.reply_text(
                     f"✅ Відео додано ({count}/10). Можете надіслати ще файли або натисніть 'Пропустити':",
@@ -316,7 +334,7 @@ async def get_photos(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
             return WAITING_PHOTOS
             
     except Exception as e:
-        logger.error(f"Ошибка при сохранении медиафайла: {e}")
+        logger.error("Ошибка при сохранении медиафайла: %s", e)
         await update.message.reply_text(
             "❌ Помилка при збереженні файлу. Спробуйте ще раз або пропустіть цей крок.",
             reply_markup=get_skip_keyboard()
@@ -324,7 +342,154 @@ async def get_photos(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         return WAITING_PHOTOS
 
 
-async def skip_photos(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+def _add_to_album(update: Update, context: BotContext, collector, application: Application) -> int:
+    """Додавання файлу альбому до колектора"""
+    message = update.message
+    user_id = update.effective_user.id
+    # Файли альбому понад ліміт заявки не завантажуються
+    free_slots = max(0, 10 - len(application.photos))
+    
+    if message.photo:
+        item = MediaGroupItem(message.message_id, message.photo[-1].file_id, 'photo')
+    else:
+        item = MediaGroupItem(message.message_id, message.video.file_id, 'video')
+    
+    async def on_album_saved(saved_items) -> None:
+        applications = context.services.application_store
+        media_storage = context.services.media_storage
+        application = await applications.get(user_id)
+        if application is None:
+            # Заявку підтвердили або скасували, поки завантажувався альбом
+            await _delete_saved(media_storage, saved_items)
+            return
+        
+        free_slots = max(0, 10 - len(application.photos))
+        added = 0
+        failed = 0
+        photos = []
+        videos = []
+        extra = []
+        for index, saved in enumerate(saved_items):
+            if saved.url is None:
+                failed += 1
+                continue
+            if added >= free_slots:
+                # Місця зайняли файли, додані під час завантаження альбому
+                if saved.path:
+                    extra.append(saved.path)
+                continue
+            await applications.append(user_id, 'photo_file_ids', saved.item.file_id)
+            application = await _add_media(applications, user_id, saved.url, saved.item.file_type)
+            if application is None:
+                # Заявку підтвердили або скасували між додаваннями файлів
+                await _delete_saved(media_storage, saved_items[index:])
+                return
+            if saved.path:
+                (photos if saved.item.file_type == 'photo' else videos).append((saved.path, saved.url))
+            added += 1
+        
+        count = len(application.photos)
+        if count >= 10:
+            text = "✅ Досягнуто максимум файлів (10). Натисніть 'Пропустити', щоб перейти далі."
+        else:
+            text = (
+                f"✅ Додано файлів: {added} ({count}/10). "
+                "Можете надіслати ще файли або натисніть 'Пропустити':"
+            )
+        if failed:
+            text = f"❌ Не вдалося зберегти файлів: {failed}.\n{text}"
+        
+        await message.reply_text(text, reply_markup=get_skip_keyboard())
+        if extra:
+            await media_storage.run_io('delete_files', media_storage.delete_files, extra)
+        _submit_videos(context, user_id, videos)
+        await _add_previews(context, user_id, photos)
+    
+    collector.add(message.media_group_id, user_id, context.bot, item, on_album_saved, limit=free_slots)
+    return WAITING_PHOTOS
+
+
+async def _delete_saved(media_storage, saved_items) -> None:
+    """Видаляє файли альбому, які не потрапили до заявки"""
+    paths = [saved.path for saved in saved_items if saved.path]
+    if paths:
+        await media_storage.run_io('delete_files', media_storage.delete_files, paths)
+
+
+async def _add_media(applications, user_id: int, media: str, kind: str) -> Optional[Application]:
+    """Додає файл (URL або file_id) до заявки разом з його типом"""
+    application = await applications.append(user_id, 'photos', media)
+    if application is None:
+        return None
+    return await applications.update(user_id, media_kinds={**application.media_kinds, media: kind})
+
+
+async def _add_previews(context: BotContext, user_id: int, photos: List[Tuple[str, str]]) -> None:
+    """
+    Створює превʼю та мініатюри збережених фото і записує їх у заявку
+
+    Викликається після відповіді користувачу: обробка йде в пулі процесів,
+    а наступне оновлення цього користувача чекає на неї, тож на момент
+    підтвердження заявки превʼю вже є.
+
+    Args:
+        photos: Пари (шлях до файлу, URL) збережених фото
+    """
+    processor = context.services.image_processor
+    if processor is None or not photos:
+        return
+
+    infos = await processor.process_many([path for path, _ in photos])
+    previews = {url: info.to_list() for (_, url), info in zip(photos, infos) if info is not None}
+    if previews:
+        await _record_previews(context.services.application_store, user_id, previews)
+
+
+def _submit_videos(context: BotContext, user_id: int, videos: List[Tuple[str, str]]) -> None:
+    """
+    Ставить збережені відео в чергу перекодування, не чекаючи на результат
+
+    Превʼю записується в заявку, коли буде готове; якщо заявку підтвердять
+    раніше, інженер отримає оригінал.
+
+    Args:
+        videos: Пари (шлях до файлу, URL) збережених відео
+    """
+    transcoder = context.services.video_transcoder
+    if transcoder is None:
+        return
+
+    applications = context.services.application_store
+
+    async def on_complete(job) -> None:
+        await _record_previews(applications, user_id, {job.file_url: job.info.to_list()})
+
+    for file_path, file_url in videos:
+        transcoder.submit(user_id, file_path, file_url, on_complete)
+
+
+def _video_progress_note(context: BotContext, user_id: int) -> str:
+    """Рядок про незавершене перекодування відео заявки (порожній, якщо його немає)"""
+    if not context.services.is_created('video_transcoder'):
+        return ""
+    transcoder = context.services.video_transcoder
+    progress = transcoder.progress(user_id) if transcoder is not None else None
+    if progress is None:
+        return ""
+    return (
+        f"⏳ Відео ще обробляються ({progress:.0%}). Якщо підтвердити зараз, "
+        "інженер отримає оригінали.\n\n"
+    )
+
+
+async def _record_previews(applications, user_id: int, previews: dict) -> None:
+    """Додає превʼю до заявки, якщо вона ще активна"""
+    application = await applications.get(user_id)
+    if application is not None:
+        await applications.update(user_id, media_previews={**application.media_previews, **previews})
+
+
+async def skip_photos(update: Update, context: BotContext) -> int:
     """Пропуск завантаження фото"""
     if update.callback_query:
         await update.callback_query.answer()
@@ -345,30 +510,28 @@ async def skip_photos(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int
     return WAITING_MODEL_FILE
 
 
-async def get_model_file(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+async def get_model_file(update: Update, context: BotContext) -> int:
     """Отримання 3D моделі"""
-    from ..services.context import get_media_storage
-    
     user_id = update.effective_user.id
-    media_storage = get_media_storage()
+    media_storage = context.services.media_storage
     
     if update.message.document:
         try:
             file_id = update.message.document.file_id
-            active_applications[user_id].model_file_id = file_id
+            applications = context.services.application_store
+            await applications.update(user_id, model_file_id=file_id)
             
             # Скачиваем и сохраняем файл
             if media_storage:
                 file = await context.bot.get_file(file_id)
-                file_data = await file.download_as_bytearray()
-                _, file_url = media_storage.save_file(
-                    bytes(file_data), 
-                    'model', 
+                _, file_url = await media_storage.save_from_url(
+                    file.file_path,
+                    'model',
                     user_id
                 )
-                active_applications[user_id].model_file = file_url
+                await applications.update(user_id, model_file=file_url)
             else:
-                active_applications[user_id].model_file = file_id
+                await applications.update(user_id, model_file=file_id)
             
             await update.message.reply_text(
                 "✅ 3D модель додано!\n\n"
@@ -378,7 +541,7 @@ async def get_model_file(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             
             return WAITING_DESCRIPTION
         except Exception as e:
-            logger.error(f"Ошибка при сохранении 3D модели: {e}")
+            logger.error("Ошибка при сохранении 3D модели: %s", e)
             await update.message.reply_text(
                 "❌ Помилка при збереженні файлу. Спробуйте ще раз або пропустіть цей крок.",
                 reply_markup=get_skip_keyboard()
@@ -392,7 +555,7 @@ async def get_model_file(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         return WAITING_MODEL_FILE
 
 
-async def skip_model_file(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+async def skip_model_file(update: Update, context: BotContext) -> int:
     """Пропуск завантаження 3D моделі"""
     if update.callback_query:
         await update.callback_query.answer()
@@ -409,20 +572,22 @@ async def skip_model_file(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     return WAITING_DESCRIPTION
 
 
-async def get_description(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+async def get_description(update: Update, context: BotContext) -> int:
     """Отримання опису проблеми"""
     user_id = update.effective_user.id
     description = update.message.text.strip()
 
-    active_applications[user_id].problem_description = description
-
     # Показуємо підсумок заявки
-    app = active_applications[user_id]
-    summary = app.to_message()
-
+    app = await context.services.application_store.update(user_id, problem_description=description)
+    *head, last = split_message(
+        f"{app.to_message()}\n\n"
+        f"{_video_progress_note(context, user_id)}"
+        "Перевірте інформацію та підтвердіть відправку заявки:"
+    )
+    for chunk in head:
+        await update.message.reply_text(chunk, parse_mode='HTML')
     await update.message.reply_text(
-        f"{summary}\n\n"
-        "Перевірте інформацію та підтвердіть відправку заявки:",
+        last,
         parse_mode='HTML',
         reply_markup=get_confirm_keyboard()
     )
@@ -430,12 +595,13 @@ async def get_description(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     return CONFIRMING
 
 
-async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+async def cancel(update: Update, context: BotContext) -> int:
     """Скасування створення заявки"""
     user_id = update.effective_user.id
 
-    if user_id in active_applications:
-        del active_applications[user_id]
+    await context.services.application_store.delete(user_id)
+    # Перекодування відео скасованої заявки більше не потрібне
+    context.services.cancel_media_jobs(user_id)
 
     cancel_message = "❌ Створення заявки скасовано.\n\nДля створення нової заявки натисніть /new_application"
 
@@ -452,6 +618,7 @@ def register_conversation_handlers(application):
     """Реєстрація обробників розмови"""
     from telegram.ext import CommandHandler
     from .callbacks import handle_confirm
+    from .commands import new_application
 
     conversation_handler = ConversationHandler(
         entry_points=[CommandHandler("new_application", new_application)],
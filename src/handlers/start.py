@@ -30,7 +30,7 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     # Ініціалізуємо новий діалог
     dialog_manager.get_dialog(user.id)
     
-    logger.info(f"Користувач {user.id} ({user.first_name} {user.last_name or ''}) запустив бота")
+    logger.info("Користувач %s (%s %s) запустив бота", user.id, user.first_name, user.last_name or '')
     
     await update.message.reply_text(
         text=WELCOME_MESSAGE,
@@ -1,8 +1,11 @@
+from functools import lru_cache
+from typing import Any, Dict, Tuple
+
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
 
 # Моделі принтерів Bambu Lab
-PRINTER_MODELS = [
+PRINTER_MODELS = (
     "Bambu Lab X1 Carbon",
     "Bambu Lab X1",
     "Bambu Lab P1S",
@@ -10,10 +13,10 @@ PRINTER_MODELS = [
     "Bambu Lab A1 mini",
     "Bambu Lab A1",
     "Інша модель",
-]
+)
 
 # Типи філаменту
-FILAMENT_TYPES = [
+FILAMENT_TYPES = (
     "PLA",
     "PETG",
     "ABS",
@@ -25,10 +28,10 @@ FILAMENT_TYPES = [
     "PVA",
     "PET",
     "Інший тип",
-]
+)
 
 # Виробники філаменту
-FILAMENT_MANUFACTURERS = [
+FILAMENT_MANUFACTURERS = (
     "Bambu Lab",
     "Polymaker",
     "eSun",
@@ -37,48 +40,84 @@ FILAMENT_MANUFACTURERS = [
     "HATCHBOX",
     "Prusament",
     "Інший виробник",
-]
+)
+
+
+class CachedInlineKeyboardMarkup(InlineKeyboardMarkup):
+    """
+    Inline-клавіатура, яка серіалізується один раз при створенні
+
+    Об'єкти PTB незмінні, тому одну клавіатуру можна відправляти скільки
+    завгодно разів; to_dict() повертає вже готовий словник замість обходу
+    всіх кнопок при кожному запиті. Повернутий словник не можна змінювати.
+    """
+
+    __slots__ = ("_payload",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._payload = super().to_dict()
+
+    def to_dict(self, recursive: bool = True) -> Dict[str, Any]:
+        if not recursive:
+            return super().to_dict(recursive)
+        return self._payload
+
+
+@lru_cache(maxsize=None)
+def get_choice_keyboard(options: Tuple[str, ...], prefix: str) -> InlineKeyboardMarkup:
+    """
+    Клавіатура вибору одного з варіантів (по кнопці в рядку)
+
+    Результат кешується за аргументами, тому options має бути кортежем.
+
+    Args:
+        options: Варіанти вибору
+        prefix: Префікс callback_data, до якого додається індекс варіанта
+    """
+    return CachedInlineKeyboardMarkup([
+        [InlineKeyboardButton(option, callback_data=f"{prefix}{i}")]
+        for i, option in enumerate(options)
+    ])
+
+
+# Клавіатури будуються один раз при імпорті модуля
+_PRINTER_MODEL_KEYBOARD = get_choice_keyboard(PRINTER_MODELS, "printer_")
+_FILAMENT_TYPE_KEYBOARD = get_choice_keyboard(FILAMENT_TYPES, "filament_type_")
+_FILAMENT_MANUFACTURER_KEYBOARD = get_choice_keyboard(FILAMENT_MANUFACTURERS, "filament_man_")
+
+_SKIP_KEYBOARD = CachedInlineKeyboardMarkup([
+    [InlineKeyboardButton("⏭️ Пропустити", callback_data="skip")]
+])
+
+_CONFIRM_KEYBOARD = CachedInlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("✅ Підтвердити", callback_data="confirm"),
+        InlineKeyboardButton("❌ Скасувати", callback_data="cancel")
+    ]
+])
 
 
 def get_printer_model_keyboard() -> InlineKeyboardMarkup:
     """Клавіатура для вибору моделі принтера"""
-    buttons = [
-        [InlineKeyboardButton(model, callback_data=f"printer_{i}")]
-        for i, model in enumerate(PRINTER_MODELS)
-    ]
-    return InlineKeyboardMarkup(buttons)
+    return _PRINTER_MODEL_KEYBOARD
 
 
 def get_filament_type_keyboard() -> InlineKeyboardMarkup:
     """Клавіатура для вибору типу філаменту"""
-    buttons = [
-        [InlineKeyboardButton(filament_type, callback_data=f"filament_type_{i}")]
-        for i, filament_type in enumerate(FILAMENT_TYPES)
-    ]
-    return InlineKeyboardMarkup(buttons)
+    return _FILAMENT_TYPE_KEYBOARD
 
 
 def get_filament_manufacturer_keyboard() -> InlineKeyboardMarkup:
     """Клавіатура для вибору виробника філаменту"""
-    buttons = [
-        [InlineKeyboardButton(manufacturer, callback_data=f"filament_man_{i}")]
-        for i, manufacturer in enumerate(FILAMENT_MANUFACTURERS)
-    ]
-    return InlineKeyboardMarkup(buttons)
+    return _FILAMENT_MANUFACTURER_KEYBOARD
 
 
 def get_skip_keyboard() -> InlineKeyboardMarkup:
     """Клавіатура з кнопкою 'Пропустити'"""
-    return InlineKeyboardMarkup([
-        [InlineKeyboardButton("⏭️ Пропустити", callback_data="skip")]
-    ])
+    return _SKIP_KEYBOARD
 
 
 def get_confirm_keyboard() -> InlineKeyboardMarkup:
     """Клавіатура для підтвердження заявки"""
-    return InlineKeyboardMarkup([
-        [
-            InlineKeyboardButton("✅ Підтвердити", callback_data="confirm"),
-            InlineKeyboardButton("❌ Скасувати", callback_data="cancel")
-        ]
-    ])
+    return _CONFIRM_KEYBOARD
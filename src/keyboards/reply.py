@@ -1,20 +1,27 @@
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemove
 
-def get_main_keyboard() -> ReplyKeyboardMarkup:
-	"""
-	Повертає клавіатуру головного меню
-	"""
-	kb = [
+# Клавіатури незмінні, тому будуються один раз при імпорті модуля
+_MAIN_KEYBOARD = ReplyKeyboardMarkup(
+	keyboard=[
 		[
 			KeyboardButton(text="🔧 Поломка"),
 			KeyboardButton(text="🖨 Якість друку"),
 			KeyboardButton(text="❓ Питання / Відповідь")
 		]
-	]
-	return ReplyKeyboardMarkup(keyboard=kb, resize_keyboard=True)
+	],
+	resize_keyboard=True
+)
+
+_REMOVE_KEYBOARD = ReplyKeyboardRemove()
+
+def get_main_keyboard() -> ReplyKeyboardMarkup:
+	"""
+	Повертає клавіатуру головного меню
+	"""
+	return _MAIN_KEYBOARD
 
 def remove_keyboard() -> ReplyKeyboardRemove:
 	"""
 	Повертає об'єкт для видалення клавіатури
 	"""
-	return ReplyKeyboardRemove()
+	return _REMOVE_KEYBOARD
@@ -3,72 +3,130 @@
 Головний файл Telegram бота для сервісного центру Bambu Lab Україна
 """
 import os
+import asyncio
 import logging
-from dotenv import load_dotenv
 from telegram.ext import Application
 
-from handlers import register_commands, register_conversation_handlers
-from services import MediaStorage, ErrorHandler, ReminderService
-from services.context import (
-    set_media_storage, set_error_handler, set_reminder_service
-)
+from .config import config, load_env
+from .handlers import register_commands, register_conversation_handlers
+from .services.application_store import ACTIVE_APPLICATIONS
+from .services.container import ServiceContainer
+from .services.context import CONTEXT_TYPES, set_services
+from .services.telegram_metrics import InstrumentedRequest, instrument_handlers
+from .services.update_processor import PerUserUpdateProcessor
+from .utils.logging_config import setup_logging, stop_logging
 
-# Налаштування логування
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
+# Налаштування логування: JSON-записи пишуться фоновим потоком, рівень,
+# формат і семплінг задаються LOG_LEVEL, LOG_FORMAT та LOG_SAMPLING
+setup_logging()
 logger = logging.getLogger(__name__)
 
 
 def main() -> None:
     """Головна функція для запуску бота"""
-    # Завантажуємо змінні оточення
-    load_dotenv()
+    # Завантажуємо змінні оточення (один раз)
+    load_env()
 
     # Отримуємо токен бота
-    token = os.getenv('TELEGRAM_TOKEN')
+    token = config.TOKEN
     if not token:
         raise ValueError("TELEGRAM_TOKEN не встановлено в змінних оточення")
 
-    # Створюємо додаток
-    application = Application.builder().token(token).build()
-    
-    # Инициализируем сервисы
-    media_storage = MediaStorage(
-        storage_path=os.getenv('MEDIA_STORAGE_PATH', './media'),
-        base_url=os.getenv('BASE_URL', 'http://localhost:8000')
+    # Режим отримання оновлень: polling (за замовчуванням) або webhook
+    bot_mode = os.getenv('BOT_MODE', 'polling').lower()
+    if bot_mode not in ('polling', 'webhook'):
+        raise ValueError(f"Невідомий BOT_MODE: {bot_mode}")
+
+    # Сервисы создаются при первом обращении, а не при запуске
+    services = ServiceContainer()
+    ACTIVE_APPLICATIONS.set_function(lambda: len(services.application_store))
+
+    # В режиме polling /health и /metrics доступны, если задан PORT;
+    # в режиме webhook их обслуживает сервер вебхука
+    metrics_server = None
+
+    async def on_startup(app: Application) -> None:
+        nonlocal metrics_server
+        # Цикл напоминаний запускается в цикле событий бота; просроченные
+        # за время простоя напоминания отправляются сразу
+        await services.reminder_service.start()
+        # Очистка медиахранилища; RETENTION_INTERVAL=0 отключает ее
+        if float(os.getenv('RETENTION_INTERVAL', '300')) > 0:
+            await services.media_retention.start()
+        if bot_mode == 'polling' and os.getenv('PORT'):
+            # aiohttp импортируется, только если HTTP-сервер нужен
+            from .services.webhook_server import WebhookServer
+            metrics_server = WebhookServer(app, secret_token=None, port=int(os.getenv('PORT')))
+            await metrics_server.start()
+
+    async def on_shutdown(_: Application) -> None:
+        if metrics_server is not None:
+            await metrics_server.stop()
+        # Останавливаем только созданные сервисы, сбрасывая изменения заявок
+        await services.close()
+
+    # Оновлення різних користувачів обробляються паралельно, одного
+    # користувача - по черзі; кількість оновлень в обробці обмежена
+    update_processor = PerUserUpdateProcessor(
+        max_concurrent_updates=int(os.getenv('MAX_CONCURRENT_UPDATES', '64')),
+        max_pending_updates=int(os.getenv('MAX_PENDING_UPDATES', '1000'))
+    )
+
+    # Створюємо додаток; обмежена черга оновлень захищає від перевантаження
+    # (вебхук відповідає 503, коли вона заповнена). Запити до Bot API
+    # рахуються в метриках за методами
+    application = (
+        Application.builder()
+        .token(token)
+        .request(InstrumentedRequest(connection_pool_size=256))
+        .get_updates_request(InstrumentedRequest(connection_pool_size=1))
+        .update_queue(update_processor.create_update_queue(int(os.getenv('UPDATE_QUEUE_SIZE', '1000'))))
+        .concurrent_updates(update_processor)
+        # Обработчики получают сервисы через context.services
+        .context_types(CONTEXT_TYPES)
+        # Планировщик JobQueue (APScheduler) не используется: напоминания
+        # отправляет ReminderService
+        .job_queue(None)
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+        .build()
     )
     
-    error_handler = ErrorHandler()
-    reminder_service = ReminderService(bot=application.bot)
-    
-    # Устанавливаем сервисы в контекст для доступа из обработчиков
-    set_media_storage(media_storage)
-    set_error_handler(error_handler)
-    set_reminder_service(reminder_service)
+    # Контейнер сервисов приложения; напоминания отправляются через его бота
+    set_services(application, services)
     
     # Реєструємо обробники
     register_commands(application)
     register_conversation_handlers(application)
     
+    # Время выполнения каждого обработчика в метриках
+    instrument_handlers(application)
+    
     # Регистрируем глобальный обработчик ошибок
-    application.add_error_handler(error_handler.handle_error)
+    application.add_error_handler(services.handle_error)
     
-    # Запускаємо сервіс напоминаний
-    reminder_service.start()
-
     # Запускаємо бота
-    logger.info("Бот запущено...")
-    
     try:
-        application.run_polling()
+        if bot_mode == 'webhook':
+            webhook_url = os.getenv('WEBHOOK_URL')
+            if not webhook_url:
+                raise ValueError("WEBHOOK_URL не встановлено в змінних оточення")
+            from .services.webhook_server import run_webhook, derive_secret_token
+            asyncio.run(run_webhook(
+                application,
+                webhook_url=webhook_url,
+                secret_token=os.getenv('WEBHOOK_SECRET') or derive_secret_token(token),
+                webhook_path=os.getenv('WEBHOOK_PATH', '/telegram'),
+                port=int(os.getenv('PORT', '8080'))
+            ))
+        else:
+            logger.info("Бот запущено...")
+            application.run_polling()
     except KeyboardInterrupt:
         logger.info("Остановка бота...")
     finally:
-        # Останавливаем сервисы
-        reminder_service.stop()
         logger.info("Бот остановлен")
+        stop_logging()
 
 
 if __name__ == '__main__':
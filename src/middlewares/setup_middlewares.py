@@ -1,15 +1,28 @@
+import asyncio
 import logging
+import time
 from typing import Any, Awaitable, Callable, Dict
 from aiogram import BaseMiddleware, Dispatcher
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
 from aiogram.types import TelegramObject, Message
 from aiogram.fsm.context import FSMContext
 
 from models.dialog import DialogManager
+from models.storage import MemoryStateStorage
 from models.user import UserManager
-from services.message_service import MessageService
+from services.container import ServiceContainer
+from services.metrics import (
+	HANDLER_ERRORS, HANDLER_LATENCY, TELEGRAM_API_CALLS, TELEGRAM_API_LATENCY, registry,
+	track_state_map
+)
 
 logger = logging.getLogger(__name__)
 
+ACTIVE_DIALOGS = registry.gauge(
+	'bot_active_dialogs',
+	'Діалоги, що зараз тримаються в пам\'яті DialogManager'
+)
+
 class DialogLoggingMiddleware(BaseMiddleware):
 	"""
 	Middleware для логирования этапов диалога с пользователем.
@@ -32,29 +45,47 @@ class DialogLoggingMiddleware(BaseMiddleware):
 		event: Message,
 		data: Dict[str, Any]
 	) -> Any:
+		# Запис на рівні DEBUG: при звичайному рівні INFO не читаємо стан
+		# зі сховища і не формуємо повідомлення. Текст повідомлення маскується
+		# (телефони, email) при записі логу
 		state: FSMContext = data.get('state')
-		if state:
+		if state and logger.isEnabledFor(logging.DEBUG):
 			current_state = await state.get_state()
-			user_id = event.from_user.id
-			state_description = self.STATE_DESCRIPTIONS.get(str(current_state), str(current_state))
-			logger.info(
-				f"User {user_id} | Current step: {state_description} | "
-				f"Message: {event.text if event.text else 'No text'}"
+			logger.debug(
+				"User %s | Current step: %s | Message: %s",
+				event.from_user.id,
+				self.STATE_DESCRIPTIONS.get(str(current_state), current_state),
+				event.text or 'No text',
+				extra={'user_id': event.from_user.id, 'state': str(current_state)}
 			)
 		
 		return await handler(event, data)
 
-class ServicesMiddleware(BaseMiddleware):
-	"""Middleware для внедрения зависимостей"""
-	def __init__(
+class MessageTrackingMiddleware(BaseMiddleware):
+	"""
+	Middleware, що запам'ятовує ID вхідних повідомлень діалогу,
+	щоб після завершення заявки видалити саме їх
+	"""
+	def __init__(self, dialog_manager: DialogManager):
+		self.dialog_manager = dialog_manager
+
+	async def __call__(
 		self,
-		dialog_manager: DialogManager,
-		user_manager: UserManager,
-		message_service: MessageService
-	):
+		handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
+		event: Message,
+		data: Dict[str, Any]
+	) -> Any:
+		self.dialog_manager.track_message(event.chat.id, event.message_id)
+		return await handler(event, data)
+
+class DialogStateMiddleware(BaseMiddleware):
+	"""
+	Middleware, що завантажує діалог і дані користувача зі сховища перед
+	обробником та зберігає їх після нього
+	"""
+	def __init__(self, dialog_manager: DialogManager, user_manager: UserManager):
 		self.dialog_manager = dialog_manager
 		self.user_manager = user_manager
-		self.message_service = message_service
 
 	async def __call__(
 		self,
@@ -62,22 +93,123 @@ class ServicesMiddleware(BaseMiddleware):
 		event: TelegramObject,
 		data: Dict[str, Any]
 	) -> Any:
-		data["dialog_manager"] = self.dialog_manager
-		data["user_manager"] = self.user_manager
-		data["message_service"] = self.message_service
+		user = data.get('event_from_user')
+		if user is None:
+			return await handler(event, data)
+
+		await asyncio.gather(
+			self.dialog_manager.load(user.id),
+			self.user_manager.load(user.id)
+		)
+		try:
+			return await handler(event, data)
+		finally:
+			await asyncio.gather(
+				self.dialog_manager.release(user.id),
+				self.user_manager.release(user.id)
+			)
+
+class ServicesMiddleware(BaseMiddleware):
+	"""
+	Middleware для внедрения зависимостей
+
+	Обработчики получают контейнер целиком (аргумент ``services``) или
+	отдельные сервисы по имени; значения собираются один раз, а не на
+	каждое обновление.
+	"""
+	def __init__(self, services: ServiceContainer):
+		self.services = services
+		self._injected = {
+			"services": services,
+			"dialog_manager": services.dialog_manager,
+			"user_manager": services.user_manager,
+			"message_service": services.message_service,
+		}
+
+	async def __call__(
+		self,
+		handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+		event: TelegramObject,
+		data: Dict[str, Any]
+	) -> Any:
+		data.update(self._injected)
 		return await handler(event, data)
 
-def setup_middlewares(dp: Dispatcher, dialog_manager: DialogManager, 
-					 user_manager: UserManager, message_service: MessageService) -> None:
+class HandlerMetricsMiddleware(BaseMiddleware):
+	"""
+	Middleware, що вимірює час виконання обробників роутерів
+
+	Метрики з міткою обробника створюються один раз для кожної функції
+	обробника і кешуються.
+	"""
+	def __init__(self):
+		self._children: Dict[Callable, tuple] = {}
+
+	async def __call__(
+		self,
+		handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+		event: TelegramObject,
+		data: Dict[str, Any]
+	) -> Any:
+		callback = data['handler'].callback
+		children = self._children.get(callback)
+		if children is None:
+			name = f"{callback.__module__.rsplit('.', 1)[-1]}.{callback.__name__}"
+			children = self._children[callback] = (HANDLER_LATENCY.labels(name), HANDLER_ERRORS.labels(name))
+
+		started = time.perf_counter()
+		try:
+			return await handler(event, data)
+		except Exception:
+			children[1].inc()
+			raise
+		finally:
+			children[0].observe(time.perf_counter() - started)
+
+class RequestMetricsMiddleware(BaseRequestMiddleware):
+	"""Middleware сесії бота: кількість і час запитів до Bot API за методами"""
+	async def __call__(self, make_request, bot, method):
+		api_method = method.__api_method__
+		started = time.perf_counter()
+		outcome = 'error'
+		try:
+			response = await make_request(bot, method)
+			outcome = 'ok'
+			return response
+		finally:
+			TELEGRAM_API_LATENCY.labels(api_method).observe(time.perf_counter() - started)
+			TELEGRAM_API_CALLS.labels(api_method, outcome).inc()
+
+def setup_middlewares(dp: Dispatcher, services: ServiceContainer) -> None:
 	"""Налаштування middleware для бота"""
-	services_middleware = ServicesMiddleware(dialog_manager, user_manager, message_service)
+	dialog_manager = services.dialog_manager
+	user_manager = services.user_manager
+	services_middleware = ServicesMiddleware(services)
+	state_middleware = DialogStateMiddleware(dialog_manager, user_manager)
 	logging_middleware = DialogLoggingMiddleware()
+	tracking_middleware = MessageTrackingMiddleware(dialog_manager)
+	metrics_middleware = HandlerMetricsMiddleware()
 	
 	# Регистрация middleware для обработки сообщений
 	dp.message.middleware.register(services_middleware)
+	dp.message.middleware.register(state_middleware)
 	dp.message.middleware.register(logging_middleware)
+	dp.message.middleware.register(tracking_middleware)
+	dp.message.middleware.register(metrics_middleware)
 	
 	# Регистрация middleware для обработки callback запросов
 	dp.callback_query.middleware.register(services_middleware)
+	dp.callback_query.middleware.register(state_middleware)
+	dp.callback_query.middleware.register(metrics_middleware)
+
+	# Метрики запитів до Bot API; розмір словника діалогів читається лише
+	# при запиті /metrics
+	services.bot.session.middleware(RequestMetricsMiddleware())
+	ACTIVE_DIALOGS.set_function(lambda: len(dialog_manager))
+	# Розмір і витіснення сховищ у пам'яті (без Redis)
+	for name, storage in (('dialogs', dialog_manager.storage), ('users', user_manager.storage)):
+		if isinstance(storage, MemoryStateStorage):
+			for part, mapping in storage.maps().items():
+				track_state_map(f'{name}_{part}', mapping)
 
 
@@ -1,11 +1,46 @@
 from dataclasses import dataclass, field
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 
+from .serialization import pack, unpack, utcnow
+try:
+    from ..utils.templates import Template, render_sections
+except ImportError:
+    # Пакет models імпортовано як верхньорівневий (обробники aiogram)
+    from utils.templates import Template, render_sections
 
-@dataclass
+# Шаблони повідомлення для інженера, по одному на кожну секцію
+_CONTACTS = Template(
+    "📋 <b>Нова заявка на сервісне обслуговування</b>\n\n"
+    "👤 <b>Клієнт:</b> {full_name}\n"
+    "📧 <b>Email:</b> {email}\n"
+    "📱 <b>Телефон:</b> {phone_number}\n"
+)
+_ORDER = Template("🛒 <b>Номер замовлення:</b> {order_number}\n")
+_PRINTER_HEADER = "\n<b>Інформація про принтер:</b>\n"
+_PRINTER_MODEL = Template("🖨️ <b>Модель принтера:</b> {printer_model}\n")
+_FILAMENT_TYPE = Template("🧵 <b>Тип філаменту:</b> {filament_type}\n")
+_FILAMENT_MANUFACTURER = Template("🏭 <b>Виробник філаменту:</b> {filament_manufacturer}\n")
+_DESCRIPTION = Template("\n📝 <b>Опис проблеми:</b>\n{problem_description}\n")
+_CREATED_AT = Template("\n🕐 <b>Час створення:</b> {created_at:%d.%m.%Y %H:%M}\n")
+_PHOTOS = Template("\n📷 <b>Фото/відео:</b> {count} файлів\n")
+_PHOTO = Template("  {index}. {url}\n")
+_PHOTO_PREVIEW = Template('  {index}. {preview_url} ({width}×{height}, <a href="{url}">оригінал</a>)\n')
+_MORE_PHOTOS = Template("  ... та ще {count} файлів\n")
+_MODEL_FILE = Template("\n📦 <b>3D модель:</b> {model_file}\n")
+
+# Скільки посилань на фото показувати в повідомленні
+PHOTOS_PREVIEW = 5
+
+
+@dataclass(slots=True)
 class Application:
-    """Модель заявки на сервісне обслуговування"""
+    """
+    Модель заявки на сервісне обслуговування
+
+    Клас зі ``__slots__`` (без ``__dict__`` у кожного екземпляра), щоб
+    тисячі активних заявок займали менше пам'яті.
+    """
     user_id: int
     full_name: Optional[str] = None
     email: Optional[str] = None
@@ -19,7 +54,20 @@ class Application:
     photo_file_ids: List[str] = field(default_factory=list)  # Временные file_id для сохранения
     model_file: Optional[str] = None  # URL 3D моделі
     model_file_id: Optional[str] = None  # Временный file_id для сохранения
-    created_at: datetime = field(default_factory=datetime.now)
+    # URL оригіналу фото -> [URL превʼю, URL мініатюри, ширина, висота]
+    media_previews: Dict[str, list] = field(default_factory=dict)
+    # URL або file_id з photos -> тип файлу ('photo' або 'video')
+    media_kinds: Dict[str, str] = field(default_factory=dict)
+    created_at: datetime = field(default_factory=utcnow)  # UTC
+
+    def to_bytes(self) -> bytes:
+        """Бінарне представлення заявки для сховищ"""
+        return pack(self)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Application':
+        """Відновлює заявку з to_bytes()"""
+        return unpack(cls, data)
 
     def is_complete(self) -> bool:
         """Перевіряє, чи заповнені всі обов'язкові поля"""
@@ -29,40 +77,39 @@ class Application:
             self.phone_number is not None
         )
 
-    def to_message(self) -> str:
-        """Формує повідомлення для відправки інженеру"""
-        message = f"📋 <b>Нова заявка на сервісне обслуговування</b>\n\n"
-        message += f"👤 <b>Клієнт:</b> {self.full_name}\n"
-        message += f"📧 <b>Email:</b> {self.email}\n"
-        message += f"📱 <b>Телефон:</b> {self.phone_number}\n"
-
-        if self.order_number:
-            message += f"🛒 <b>Номер замовлення:</b> {self.order_number}\n"
+    def media_kind(self, media: str) -> Optional[str]:
+        """Тип файлу з photos ('photo' або 'video') або None, якщо тип не записано"""
+        return self.media_kinds.get(media)
 
-        message += "\n<b>Інформація про принтер:</b>\n"
+    def preview_url(self, url: str) -> str:
+        """URL превʼю фото або сам URL, якщо превʼю немає (відео, обробка вимкнена)"""
+        preview = self.media_previews.get(url)
+        return preview[0] if preview else url
 
-        if self.printer_model:
-            message += f"🖨️ <b>Модель принтера:</b> {self.printer_model}\n"
+    def _render_photo(self, index: int, url: str) -> str:
+        preview = self.media_previews.get(url)
+        if preview is None:
+            return _PHOTO.render(index=index, url=url)
+        preview_url, _, width, height = preview
+        return _PHOTO_PREVIEW.render(index=index, preview_url=preview_url, width=width, height=height, url=url)
 
-        if self.filament_type:
-            message += f"🧵 <b>Тип філаменту:</b> {self.filament_type}\n"
-
-        if self.filament_manufacturer:
-            message += f"🏭 <b>Виробник філаменту:</b> {self.filament_manufacturer}\n"
-
-        if self.problem_description:
-            message += f"\n📝 <b>Опис проблеми:</b>\n{self.problem_description}\n"
-
-        message += f"\n🕐 <b>Час створення:</b> {self.created_at.strftime('%d.%m.%Y %H:%M')}\n"
-
-        if self.photos:
-            message += f"\n📷 <b>Фото/відео:</b> {len(self.photos)} файлів\n"
-            for i, photo_url in enumerate(self.photos[:5], 1):  # Показываем первые 5 ссылок
-                message += f"  {i}. {photo_url}\n"
-            if len(self.photos) > 5:
-                message += f"  ... та ще {len(self.photos) - 5} файлів\n"
-
-        if self.model_file:
-            message += f"\n📦 <b>3D модель:</b> {self.model_file}\n"
-
-        return message
+    def to_message(self) -> str:
+        """Формує повідомлення для відправки інженеру (HTML, значення екрановані)"""
+        photos = self.photos
+        return render_sections((
+            _CONTACTS.render(full_name=self.full_name, email=self.email, phone_number=self.phone_number),
+            self.order_number and _ORDER.render(order_number=self.order_number),
+            _PRINTER_HEADER,
+            self.printer_model and _PRINTER_MODEL.render(printer_model=self.printer_model),
+            self.filament_type and _FILAMENT_TYPE.render(filament_type=self.filament_type),
+            self.filament_manufacturer and _FILAMENT_MANUFACTURER.render(
+                filament_manufacturer=self.filament_manufacturer
+            ),
+            self.problem_description and _DESCRIPTION.render(problem_description=self.problem_description),
+            # Час показується в локальному часовому поясі сервера
+            _CREATED_AT.render(created_at=self.created_at.astimezone()),
+            photos and _PHOTOS.render(count=len(photos)),
+            *(self._render_photo(i, url) for i, url in enumerate(photos[:PHOTOS_PREVIEW], 1)),
+            len(photos) > PHOTOS_PREVIEW and _MORE_PHOTOS.render(count=len(photos) - PHOTOS_PREVIEW),
+            self.model_file and _MODEL_FILE.render(model_file=self.model_file),
+        ))
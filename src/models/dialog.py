@@ -1,8 +1,22 @@
-from dataclasses import dataclass
+import asyncio
+from dataclasses import dataclass, field
 from typing import Optional, List
 from datetime import datetime
 
-@dataclass
+from models.serialization import pack, unpack, utcnow
+from models.storage import StateStorage, MemoryStateStorage, DIALOG_TTL, MEMORY_CAPACITY
+from utils.templates import Template, render_sections
+
+# Шаблони зведення заявки
+_ORDER = Template("📋 Номер замовлення: {order_number}")
+_NO_ORDER = "📑 Замовлення: Купували не у нас"
+_USER_NAME = Template("👤 Контактна особа: {user_name}")
+_PHONE = Template("📱 Телефон: {phone_number}")
+_PRINTER_MODEL = Template("🖨 Модель принтера: {printer_model}")
+_ISSUE = Template("❗️ Опис проблеми:\n{issue_description}")
+_MEDIA = Template("📎 Додано медіафайлів: {count}")
+
+@dataclass(slots=True)
 class DialogState:
 	"""
 	Клас для зберігання стану діалогу
@@ -13,55 +27,81 @@ class DialogState:
 	phone_number: Optional[str] = None
 	issue_description: Optional[str] = None
 	printer_model: Optional[str] = None
-	photo_files: List[str] = None
-	video_files: List[str] = None
+	photo_files: List[str] = field(default_factory=list)
+	video_files: List[str] = field(default_factory=list)
 	current_step: str = "initial"
-	started_at: datetime = datetime.now()
+	started_at: datetime = field(default_factory=utcnow)
 	completed_at: Optional[datetime] = None
-	temp_message_ids: list[int] = None  # Для зберігання тимчасових повідомлень
-	
-	def __post_init__(self):
-		"""Ініціалізація після створення об'єкту"""
-		self.temp_message_ids = [] if self.temp_message_ids is None else self.temp_message_ids
-		self.photo_files = [] if self.photo_files is None else self.photo_files
-		self.video_files = [] if self.video_files is None else self.video_files
+	temp_message_ids: list[int] = field(default_factory=list)  # Для зберігання тимчасових повідомлень
+
+	def to_bytes(self) -> bytes:
+		"""Бінарне представлення діалогу для сховищ"""
+		return pack(self)
+
+	@classmethod
+	def from_bytes(cls, data: bytes) -> 'DialogState':
+		"""Відновлює діалог з to_bytes()"""
+		return unpack(cls, data)
 		
 	def get_summary(self) -> str:
-		"""Формує зведення всіх даних заявки"""
-		summary_parts = []
-		
-		if self.order_number:
-			summary_parts.append(f"📋 Номер замовлення: {self.order_number}")
-		else:
-			summary_parts.append("📑 Замовлення: Купували не у нас")
-			
-		if self.user_name:
-			summary_parts.append(f"👤 Контактна особа: {self.user_name}")
-			
-		if self.phone_number:
-			summary_parts.append(f"📱 Телефон: {self.phone_number}")
-			
-		if self.printer_model:
-			summary_parts.append(f"🖨 Модель принтера: {self.printer_model}")
-			
-		if self.issue_description:
-			summary_parts.append(f"❗️ Опис проблеми:\n{self.issue_description}")
-			
-		# Добавляем информацию о медиафайлах
-		if self.photo_files or self.video_files:
-			media_count = len(self.photo_files) + len(self.video_files)
-			summary_parts.append(f"📎 Додано медіафайлів: {media_count}")
-			
-		return "\n\n".join(summary_parts)
+		"""Формує зведення всіх даних заявки (HTML, значення екрановані)"""
+		media_count = len(self.photo_files) + len(self.video_files)
+		return render_sections((
+			_ORDER.render(order_number=self.order_number) if self.order_number else _NO_ORDER,
+			self.user_name and _USER_NAME.render(user_name=self.user_name),
+			self.phone_number and _PHONE.render(phone_number=self.phone_number),
+			self.printer_model and _PRINTER_MODEL.render(printer_model=self.printer_model),
+			self.issue_description and _ISSUE.render(issue_description=self.issue_description),
+			media_count and _MEDIA.render(count=media_count),
+		), "\n\n")
 
 
-	
 class DialogManager:
 	"""
 	Менеджер для роботи зі станом діалогу
+
+	Діалоги зберігаються в ``storage``; у пам'яті тримаються лише діалоги
+	користувачів, чиї оновлення обробляються зараз. DialogStateMiddleware
+	викликає load() перед обробником і release() після нього.
 	"""
-	def __init__(self):
+	def __init__(self, storage: StateStorage[DialogState] | None = None):
+		self.storage = storage or MemoryStateStorage(DIALOG_TTL, MEMORY_CAPACITY)
 		self._dialogs: dict[int, DialogState] = {}
+		self._refs: dict[int, int] = {}  # Скільки оновлень користувача обробляється
+		self._cleared: set[int] = set()
+		self._background_tasks: set[asyncio.Task] = set()
+
+	def __len__(self) -> int:
+		"""Кількість діалогів, що зараз тримаються в пам'яті"""
+		return len(self._dialogs)
+
+	async def load(self, *user_ids: int) -> None:
+		"""Завантажити діалоги користувачів зі сховища (одним запитом)"""
+		missing = [user_id for user_id in user_ids if user_id not in self._refs]
+		for user_id in user_ids:
+			self._refs[user_id] = self._refs.get(user_id, 0) + 1
+		if missing:
+			for user_id, dialog in (await self.storage.get_many(missing)).items():
+				self._dialogs.setdefault(user_id, dialog)
+
+	async def release(self, user_id: int) -> None:
+		"""Зберегти діалог у сховище; після останнього оновлення - вивантажити з пам'яті"""
+		dialog = self._dialogs.get(user_id)
+		if dialog is not None:
+			self._cleared.discard(user_id)
+			message_ids, dialog.temp_message_ids = dialog.temp_message_ids, []
+			await self.storage.set(user_id, dialog)
+			await self.storage.push_ids(user_id, message_ids)
+		elif user_id in self._cleared:
+			self._cleared.discard(user_id)
+			await self.storage.delete(user_id)
+
+		refs = self._refs.get(user_id, 0) - 1
+		if refs > 0:
+			self._refs[user_id] = refs
+		else:
+			self._refs.pop(user_id, None)
+			self._dialogs.pop(user_id, None)
 		
 	def get_dialog(self, user_id: int) -> DialogState:
 		"""Отримати або створити стан діалогу для користувача"""
@@ -78,9 +118,30 @@ class DialogManager:
 	def complete_dialog(self, user_id: int) -> None:
 		"""Завершити діалог"""
 		dialog = self.get_dialog(user_id)
-		dialog.completed_at = datetime.now()
+		dialog.completed_at = utcnow()
 		
+	def track_message(self, user_id: int, message_id: int) -> None:
+		"""Запам'ятати ID повідомлення діалогу для подальшого видалення"""
+		dialog = self._dialogs.get(user_id)
+		if dialog is not None:
+			dialog.temp_message_ids.append(message_id)
+		elif user_id not in self._refs:
+			# Повідомлення надіслано вже після обробки оновлення:
+			# дописуємо його до збереженого діалогу (якщо він є)
+			task = asyncio.create_task(self.storage.push_ids(user_id, [message_id]))
+			self._background_tasks.add(task)
+			task.add_done_callback(self._background_tasks.discard)
+
+	async def pop_tracked_messages(self, user_id: int) -> list[int]:
+		"""Забрати ID усіх запам'ятованих повідомлень діалогу"""
+		message_ids = await self.storage.pop_ids(user_id)
+		dialog = self._dialogs.get(user_id)
+		if dialog is not None:
+			message_ids += dialog.temp_message_ids
+			dialog.temp_message_ids = []
+		return message_ids
+
 	def clear_dialog(self, user_id: int) -> None:
-		"""Очистити дані діалогу"""
-		if user_id in self._dialogs:
-			del self._dialogs[user_id]
\ No newline at end of file
+		"""Очистити дані діалогу (зі сховища видаляються після обробки оновлення)"""
+		if self._dialogs.pop(user_id, None) is not None:
+			self._cleared.add(user_id)
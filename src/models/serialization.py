@@ -0,0 +1,62 @@
+"""
+Компактна серіалізація записів-dataclass для сховищ
+
+Формат: байт версії + JSON-масив значень полів у порядку оголошення.
+JSON не залежить від версії Python, тож записи в Redis лишаються
+читабельними після оновлення інтерпретатора. Дати зберігаються як
+unix-час і відновлюються як aware datetime в UTC.
+"""
+import json
+from dataclasses import fields
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Tuple, Type, TypeVar, get_args
+
+T = TypeVar('T')
+
+# Версія формату; змінюється разом із кодуванням, набором або порядком полів
+FORMAT_VERSION = 2
+
+
+def utcnow() -> datetime:
+    """Поточний час як aware datetime в UTC (фабрика значень за замовчуванням)"""
+    return datetime.now(timezone.utc)
+
+
+@lru_cache(maxsize=None)
+def _layout(cls: type) -> Tuple[Tuple[str, ...], Tuple[int, ...]]:
+    """Імена полів у порядку оголошення та позиції полів з datetime"""
+    names = []
+    datetimes = []
+    for index, field in enumerate(fields(cls)):
+        names.append(field.name)
+        if field.type is datetime or datetime in get_args(field.type):
+            datetimes.append(index)
+    return tuple(names), tuple(datetimes)
+
+
+def pack(record) -> bytes:
+    """Серіалізує запис у байти: версія формату + JSON-масив значень полів"""
+    names, datetimes = _layout(type(record))
+    values = [getattr(record, name) for name in names]
+    for index in datetimes:
+        if values[index] is not None:
+            # Для naive datetime timestamp() вважає час локальним
+            values[index] = values[index].timestamp()
+    return bytes((FORMAT_VERSION,)) + json.dumps(
+        values, ensure_ascii=False, separators=(',', ':')
+    ).encode()
+
+
+def unpack(cls: Type[T], data: bytes) -> T:
+    """Відновлює запис, серіалізований pack()"""
+    if not data or data[0] != FORMAT_VERSION:
+        raise ValueError(f"Невідомий формат запису {cls.__name__}")
+    names, datetimes = _layout(cls)
+    values = json.loads(data[1:])
+    if len(values) != len(names):
+        raise ValueError(f"Невідповідна кількість полів запису {cls.__name__}")
+    for index in datetimes:
+        if values[index] is not None:
+            values[index] = datetime.fromtimestamp(values[index], timezone.utc)
+    return cls(*values)
@@ -0,0 +1,249 @@
+import asyncio
+import json
+import logging
+import os
+from dataclasses import dataclass, fields
+from datetime import datetime, timedelta
+from typing import Any, Callable, Generic, Iterable, TypeVar
+
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from utils.expiring_map import ExpiringMap
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Незавершений діалог видаляється, якщо користувач не відповідає 2 дні
+DIALOG_TTL = timedelta(days=2)
+USER_TTL = timedelta(days=30)
+# Скільки записів тримати в пам'яті без Redis
+MEMORY_CAPACITY = 10000
+
+
+class StateStorage(Generic[T]):
+	"""
+	Сховище станів користувачів (діалогів, профілів) за user_id.
+
+	Окремо від запису зберігається список ID повідомлень, щоб додавати
+	їх без перезапису всього стану.
+	"""
+	async def get(self, user_id: int) -> T | None:
+		return (await self.get_many([user_id])).get(user_id)
+
+	async def get_many(self, user_ids: Iterable[int]) -> dict[int, T]:
+		"""Завантажує кілька записів за один запит"""
+		raise NotImplementedError
+
+	async def set(self, user_id: int, value: T) -> None:
+		raise NotImplementedError
+
+	async def delete(self, user_id: int) -> None:
+		raise NotImplementedError
+
+	async def push_ids(self, user_id: int, ids: list[int]) -> None:
+		"""Додає ID повідомлень до запису (якщо запис існує)"""
+		raise NotImplementedError
+
+	async def pop_ids(self, user_id: int) -> list[int]:
+		"""Забирає всі ID повідомлень запису"""
+		raise NotImplementedError
+
+	async def close(self) -> None:
+		pass
+
+
+class MemoryStateStorage(StateStorage[T]):
+	"""
+	Сховище в пам'яті процесу
+
+	Як і в Redis, запис видаляється через ``ttl`` після останнього збереження;
+	``capacity`` обмежує кількість записів (витісняються давно не використані).
+	"""
+	def __init__(self, ttl: timedelta | None = None, capacity: int | None = None):
+		seconds = ttl.total_seconds() if ttl is not None else None
+		self._records: ExpiringMap[int, T] = ExpiringMap(capacity=capacity, ttl=seconds)
+		self._ids: ExpiringMap[int, list[int]] = ExpiringMap(capacity=capacity, ttl=seconds)
+
+	def maps(self) -> dict[str, ExpiringMap]:
+		"""Словники записів і ID повідомлень (для метрик розміру та витіснень)"""
+		return {'records': self._records, 'ids': self._ids}
+
+	async def get_many(self, user_ids: Iterable[int]) -> dict[int, T]:
+		return {user_id: self._records[user_id] for user_id in user_ids if user_id in self._records}
+
+	async def set(self, user_id: int, value: T) -> None:
+		self._records[user_id] = value
+		ids = self._ids.pop(user_id)
+		if ids is not None:
+			self._ids[user_id] = ids
+
+	async def delete(self, user_id: int) -> None:
+		self._records.pop(user_id, None)
+		self._ids.pop(user_id, None)
+
+	async def push_ids(self, user_id: int, ids: list[int]) -> None:
+		if ids and user_id in self._records:
+			self._ids.setdefault(user_id, []).extend(ids)
+
+	async def pop_ids(self, user_id: int) -> list[int]:
+		return self._ids.pop(user_id, [])
+
+
+class RedisStateStorage(StateStorage[T]):
+	"""
+	Сховище в Redis: запис - hash ``<prefix><user_id>`` без порожніх полів
+	(малі hash Redis зберігає компактно) або, з ``binary=True``, рядок з
+	бінарним представленням запису. ID повідомлень - список
+	``<prefix><user_id>:ids``. Обидва ключі мають TTL, який оновлюється
+	при кожному збереженні.
+	"""
+	def __init__(
+		self,
+		redis,
+		key_prefix: str,
+		encode: Callable[[T], dict[str, str] | bytes],
+		decode: Callable[[int, dict[str, str] | bytes], T],
+		ttl: timedelta,
+		binary: bool = False
+	):
+		self.redis = redis
+		self.key_prefix = key_prefix
+		self.encode = encode
+		self.decode = decode
+		self.ttl = int(ttl.total_seconds())
+		self.binary = binary
+
+	def _key(self, user_id: int) -> str:
+		return f"{self.key_prefix}{user_id}"
+
+	def _ids_key(self, user_id: int) -> str:
+		return f"{self.key_prefix}{user_id}:ids"
+
+	async def get_many(self, user_ids: Iterable[int]) -> dict[int, T]:
+		user_ids = list(user_ids)
+		if not user_ids:
+			return {}
+		if self.binary:
+			results = await self.redis.mget([self._key(user_id) for user_id in user_ids])
+			return {
+				user_id: self.decode(user_id, data)
+				for user_id, data in zip(user_ids, results)
+				if data is not None
+			}
+		# Hash не читаються через MGET, тому HGETALL відправляються одним пайплайном
+		pipe = self.redis.pipeline(transaction=False)
+		for user_id in user_ids:
+			pipe.hgetall(self._key(user_id))
+		results = await pipe.execute()
+		return {
+			user_id: self.decode(user_id, {k.decode(): v.decode() for k, v in raw.items()})
+			for user_id, raw in zip(user_ids, results)
+			if raw
+		}
+
+	async def set(self, user_id: int, value: T) -> None:
+		key = self._key(user_id)
+		pipe = self.redis.pipeline(transaction=True)
+		if self.binary:
+			pipe.set(key, self.encode(value), ex=self.ttl)
+		else:
+			pipe.delete(key)
+			# Порожній запис все одно має існувати, тому зберігаємо хоча б одне поле
+			pipe.hset(key, mapping=self.encode(value) or {'_': ''})
+			pipe.expire(key, self.ttl)
+		pipe.expire(self._ids_key(user_id), self.ttl)
+		await pipe.execute()
+
+	async def delete(self, user_id: int) -> None:
+		await self.redis.delete(self._key(user_id), self._ids_key(user_id))
+
+	async def push_ids(self, user_id: int, ids: list[int]) -> None:
+		if not ids or not await self.redis.exists(self._key(user_id)):
+			return
+		ids_key = self._ids_key(user_id)
+		pipe = self.redis.pipeline(transaction=True)
+		pipe.rpush(ids_key, *ids)
+		pipe.expire(ids_key, self.ttl)
+		await pipe.execute()
+
+	async def pop_ids(self, user_id: int) -> list[int]:
+		ids_key = self._ids_key(user_id)
+		pipe = self.redis.pipeline(transaction=True)
+		pipe.lrange(ids_key, 0, -1)
+		pipe.delete(ids_key)
+		ids, _ = await pipe.execute()
+		return [int(message_id) for message_id in ids]
+
+	async def close(self) -> None:
+		await self.redis.aclose()
+
+
+def encode_fields(value: Any, skip: tuple[str, ...]) -> dict[str, str]:
+	"""Кодує поля dataclass у hash, пропускаючи порожні значення"""
+	encoded = {}
+	for field in fields(value):
+		item = getattr(value, field.name)
+		if field.name in skip or item is None or item == []:
+			continue
+		if isinstance(item, list):
+			item = json.dumps(item)
+		elif isinstance(item, datetime):
+			item = item.isoformat()
+		encoded[field.name] = str(item)
+	return encoded
+
+
+@dataclass
+class StateStorages:
+	"""Сховища стану бота: FSM aiogram, діалоги та користувачі"""
+	fsm: BaseStorage
+	dialogs: StateStorage
+	users: StateStorage
+
+	async def close(self) -> None:
+		await asyncio.gather(self.fsm.close(), self.dialogs.close(), self.users.close())
+
+
+def create_state_storages() -> StateStorages:
+	"""
+	Створює сховища стану за змінними оточення
+
+	Якщо задано REDIS_HOST, стан зберігається в Redis і переживає
+	перезапуск та спільний для кількох реплік, інакше - у пам'яті.
+	"""
+	redis_host = os.getenv('REDIS_HOST')
+	if not redis_host:
+		logger.info("REDIS_HOST не задано, стан діалогів зберігається в пам'яті")
+		return StateStorages(
+			fsm=MemoryStorage(),
+			dialogs=MemoryStateStorage(DIALOG_TTL, MEMORY_CAPACITY),
+			users=MemoryStateStorage(USER_TTL, MEMORY_CAPACITY)
+		)
+
+	from redis.asyncio import Redis
+	from aiogram.fsm.storage.redis import RedisStorage
+	from models.dialog import DialogState
+	from models.user import encode_user, decode_user
+
+	def connect() -> Redis:
+		return Redis(
+			host=redis_host,
+			port=int(os.getenv('REDIS_PORT', '6379')),
+			db=int(os.getenv('REDIS_DB', '0'))
+		)
+
+	logger.info("Стан діалогів зберігається в Redis: %s", redis_host)
+	return StateStorages(
+		fsm=RedisStorage(connect(), state_ttl=DIALOG_TTL, data_ttl=DIALOG_TTL),
+		dialogs=RedisStateStorage(
+			connect(),
+			'bambu:dialog:',
+			DialogState.to_bytes,
+			lambda user_id, data: DialogState.from_bytes(data),
+			DIALOG_TTL,
+			binary=True
+		),
+		users=RedisStateStorage(connect(), 'bambu:user:', encode_user, decode_user, USER_TTL)
+	)
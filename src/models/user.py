@@ -1,6 +1,8 @@
 from dataclasses import dataclass
 from typing import Optional
 
+from models.storage import StateStorage, MemoryStateStorage, encode_fields, USER_TTL, MEMORY_CAPACITY
+
 @dataclass
 class User:
 	"""
@@ -12,12 +14,55 @@ class User:
 	phone_number: Optional[str] = None
 	order_number: Optional[str] = None
 
+def encode_user(user: User) -> dict[str, str]:
+	"""Кодує користувача у hash"""
+	return encode_fields(user, skip=('user_id',))
+
+
+def decode_user(user_id: int, raw: dict[str, str]) -> User:
+	"""Відновлює користувача з hash"""
+	return User(
+		user_id=user_id,
+		first_name=raw.get('first_name', ''),
+		last_name=raw.get('last_name', ''),
+		phone_number=raw.get('phone_number'),
+		order_number=raw.get('order_number')
+	)
+
+
 class UserManager:
 	"""
 	Менеджер для роботи з користувачами
+
+	Як і DialogManager, тримає в пам'яті лише користувачів, чиї оновлення
+	обробляються зараз; решта - у ``storage``.
 	"""
-	def __init__(self):
+	def __init__(self, storage: StateStorage[User] | None = None):
+		self.storage = storage or MemoryStateStorage(USER_TTL, MEMORY_CAPACITY)
 		self._users: dict[int, User] = {}
+		self._refs: dict[int, int] = {}
+
+	async def load(self, *user_ids: int) -> None:
+		"""Завантажити користувачів зі сховища (одним запитом)"""
+		missing = [user_id for user_id in user_ids if user_id not in self._refs]
+		for user_id in user_ids:
+			self._refs[user_id] = self._refs.get(user_id, 0) + 1
+		if missing:
+			for user_id, user in (await self.storage.get_many(missing)).items():
+				self._users.setdefault(user_id, user)
+
+	async def release(self, user_id: int) -> None:
+		"""Зберегти користувача; після останнього оновлення - вивантажити з пам'яті"""
+		user = self._users.get(user_id)
+		if user is not None:
+			await self.storage.set(user_id, user)
+
+		refs = self._refs.get(user_id, 0) - 1
+		if refs > 0:
+			self._refs[user_id] = refs
+		else:
+			self._refs.pop(user_id, None)
+			self._users.pop(user_id, None)
 	
 	def get_user(self, user_id: int, first_name: str, last_name: str) -> User:
 		"""Отримати або створити користувача"""
@@ -11,12 +11,14 @@ from components.photo_upload import PhotoUploadComponent
 from models.dialog import DialogManager
 from models.user import UserManager
 from services.message_service import MessageService
+from services.delivery import DeliveryItem, plan_delivery
 from states.breakdown import BreakdownStates
-from utils.validators import validate_phone
+from utils.validators import PhoneValidator
 from utils.messages import (
     REQUEST_NAME, REQUEST_PRINTER_MODEL, REQUEST_ISSUE_DESCRIPTION,
-    REQUEST_PHOTO, ISSUE_CONFIRMED, PHOTO_ADDED, REQUEST_COMPLETED,
-    REVIEW_REQUEST, REQUEST_PHONE, WELCOME_MESSAGE  # Добавим импорт WELCOME_MESSAGE
+    REQUEST_PHOTO, ISSUE_DESCRIPTION_CONFIRMED, PHOTO_ADDED, REQUEST_COMPLETED,
+    REVIEW_REQUEST, REQUEST_PHONE, WELCOME_MESSAGE,  # Добавим импорт WELCOME_MESSAGE
+    ORDER_CONFIRMED, ORDER_NOT_FOUND, FULL_NAME_CONFIRMED, PHONE_CONFIRMED, MODEL_CONFIRMED
 )
 from utils.keyboards import (
     remove_keyboard, get_profile_name_keyboard,
@@ -28,13 +30,14 @@ from utils.keyboards import (
 router = Router(name="breakdown")
 
 @router.message(Command("start"))
-async def cmd_start(message: Message):
+async def cmd_start(message: Message, message_service: MessageService):
     """
     Обработчик команды /start
     """
-    await message.answer(
-        WELCOME_MESSAGE,
-        reply_markup=get_main_keyboard()
+    await message_service.send_message(
+        chat_id=message.chat.id,
+        text=WELCOME_MESSAGE,
+        keyboard=get_main_keyboard()
     )
 
 @router.message(F.text == "🔧 Поломка")
@@ -89,7 +92,8 @@ async def process_order(
 
 		await message_service.send_message(
 			chat_id=message.chat.id,
-			text="✅ Зафіксували, що ви купували не у нас"
+			text=ORDER_NOT_FOUND,
+			wait=False
 		)
 
 		# Перехід до введення імені
@@ -109,7 +113,8 @@ async def process_order(
 
 		await message_service.send_message(
 			chat_id=message.chat.id,
-			text=f"✅ Зафіксували номер замовлення: {order_number}"
+			text=ORDER_CONFIRMED.render(order_number=order_number),
+			wait=False
 		)
 
 		# Перехід до вибору моделі принтера
@@ -147,7 +152,8 @@ async def use_profile_name(
 	# Отправляем подтверждение
 	await message_service.send_message(
 		chat_id=message.chat.id,
-		text=f"✅ Зафіксували ваше ім'я: {full_name}"
+		text=FULL_NAME_CONFIRMED.render(full_name=full_name),
+		wait=False
 	)
 
 	# Переходим к вводу телефона
@@ -179,7 +185,8 @@ async def process_name(
 	# Отправляем подтверждение и переходим к телефону
 	await message_service.send_message(
 		chat_id=message.chat.id,
-		text=f"✅ Зафіксували ваше ім'я: {name}"
+		text=FULL_NAME_CONFIRMED.render(full_name=name),
+		wait=False
 	)
 
 	await state.set_state(BreakdownStates.waiting_phone)
@@ -209,7 +216,7 @@ async def process_phone_from_profile(
 		return
 
 	phone = f"+{contact.phone_number}" if not contact.phone_number.startswith('+') else contact.phone_number
-	is_valid, validated_phone = validate_phone(phone)
+	is_valid, validated_phone = PhoneValidator.validate(phone)
 
 	if not is_valid:
 		await message_service.send_message(
@@ -228,7 +235,8 @@ async def process_phone_from_profile(
 
 	await message_service.send_message(
 		chat_id=message.chat.id,
-		text=f"✅ Зафіксували номер телефону: {validated_phone}"
+		text=PHONE_CONFIRMED.render(phone=validated_phone),
+		wait=False
 	)
 
 	await state.set_state(BreakdownStates.waiting_printer_model)
@@ -249,7 +257,7 @@ async def process_phone(
 	user_id = message.from_user.id
 	phone = message.text
 
-	is_valid, result = validate_phone(phone)
+	is_valid, result = PhoneValidator.validate(phone)
 	if not is_valid:
 		await message_service.send_message(
 			chat_id=message.chat.id,
@@ -267,7 +275,8 @@ async def process_phone(
 
 	await message_service.send_message(
 		chat_id=message.chat.id,
-		text=f"✅ Зафіксували номер телефону: {result}"
+		text=PHONE_CONFIRMED.render(phone=result),
+		wait=False
 	)
 
 	await state.set_state(BreakdownStates.waiting_printer_model)
@@ -298,8 +307,9 @@ async def process_printer_model(
 	# Отправляем подтверждение и убираем клавиатуру
 	await message_service.send_message(
 		chat_id=message.chat.id,
-		text=f"✅ Зафіксували модель принтеру: {model}",
-		keyboard=remove_keyboard  # Используем remove_keyboard вместо get_main_keyboard
+		text=MODEL_CONFIRMED.render(model=model),
+		keyboard=remove_keyboard,  # Используем remove_keyboard вместо get_main_keyboard
+		wait=False
 	)
 
 	# Переходим к следующему этапу
@@ -331,7 +341,8 @@ async def process_description(
 	# Отправляем подтверждение
 	await message_service.send_message(
 		chat_id=message.chat.id,
-		text=f"{ISSUE_CONFIRMED}:\n{description}"
+		text=ISSUE_DESCRIPTION_CONFIRMED.render(description=description),
+		wait=False
 	)
 
 	# Переходим к этапу фотографий
@@ -375,44 +386,20 @@ async def confirm_request(
     user_id = message.from_user.id
     dialog = dialog_manager.get_dialog(user_id)
 
-    # Сначала отправляем заявку инженеру
+    # Отправляем заявку инженеру: текст как подпись к первому альбому,
+    # фото и видео упакованы в альбомы до 10 файлов
     engineer_id = config.ENGINEER_TELEGRAM_ID
-    await message_service.send_message(
-        chat_id=engineer_id,
-        text=f"🆕 Нова заявка!\n\n{dialog.get_summary()}"
-    )
+    items = [DeliveryItem('photo', file_id) for file_id in dialog.photo_files]
+    items += [DeliveryItem('video', file_id) for file_id in dialog.video_files]
+    plan = plan_delivery(f"🆕 Нова заявка!\n\n{dialog.get_summary()}", items)
+
+    # Заявка надсилається у фоні: черга чату інженера не затримує відповідь
+    message_service.schedule_plan(chat_id=engineer_id, plan=plan)
 
-    # Отправляем медиафайлы инженеру
-    if hasattr(dialog, 'photo_files') and dialog.photo_files:
-        for photo_id in dialog.photo_files:
-            try:
-                await message_service.send_photo(
-                    chat_id=engineer_id,
-                    photo=photo_id
-                )
-            except Exception as e:
-                logger.error(f"Error sending photo to engineer: {e}")
-
-    if hasattr(dialog, 'video_files') and dialog.video_files:
-        for video_id in dialog.video_files:
-            try:
-                await message_service.send_video(
-                    chat_id=engineer_id,
-                    video=video_id
-                )
-            except Exception as e:
-                logger.error(f"Error sending video to engineer: {e}")
-
-    # Очищаем историю сообщений
-    try:
-        last_message_id = message.message_id
-        for i in range(last_message_id - 100, last_message_id + 1):
-            try:
-                await message.bot.delete_message(chat_id=message.chat.id, message_id=i)
-            except Exception:
-                continue
-    except Exception as e:
-        logger.error(f"Error clearing chat history: {e}")
+    # Очищаем историю сообщений диалога в фоне
+    message_ids = await dialog_manager.pop_tracked_messages(user_id)
+    message_ids.append(message.message_id)
+    message_service.schedule_delete_messages(message.chat.id, message_ids)
 
     # Очищаем состояние и диалог
     await state.clear()
@@ -421,7 +408,8 @@ async def confirm_request(
     # Отправляем только два финальных сообщения
     await message_service.send_message(
         chat_id=message.chat.id,
-        text="✅ Дякуємо!\nВашу заявку прийнято.\n\nПриблизний термін оброки заявки - 2 робочих дні."
+        text="✅ Дякуємо!\nВашу заявку прийнято.\n\nПриблизний термін оброки заявки - 2 робочих дні.",
+        wait=False
     )
 
     # Показываем главное меню
@@ -441,16 +429,10 @@ async def cancel_request(
     """Отмена заявки"""
     user_id = message.from_user.id
 
-    # Очищаем историю сообщений
-    try:
-        last_message_id = message.message_id
-        for i in range(last_message_id - 100, last_message_id + 1):
-            try:
-                await message.bot.delete_message(chat_id=message.chat.id, message_id=i)
-            except Exception:
-                continue
-    except Exception as e:
-        logger.error(f"Error clearing chat history: {e}")
+    # Очищаем историю сообщений диалога в фоне
+    message_ids = await dialog_manager.pop_tracked_messages(user_id)
+    message_ids.append(message.message_id)
+    message_service.schedule_delete_messages(message.chat.id, message_ids)
 
     # Очищаем состояние и диалог
     await state.clear()
@@ -463,7 +445,7 @@ async def cancel_request(
     )
 
     # Вызываем команду /start
-    await cmd_start(message)
+    await cmd_start(message, message_service)
 
 @router.message(BreakdownStates.waiting_media, F.photo | F.video)
 async def process_media(
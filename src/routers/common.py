@@ -3,31 +3,41 @@ from aiogram.filters import Command
 from aiogram.types import Message
 from aiogram.utils.markdown import hbold
 
+from services.message_service import MessageService
 from utils.messages import WELCOME_MESSAGE, QUALITY_START, FAQ_START
 from keyboards.reply import get_main_keyboard, remove_keyboard
 
 router = Router(name="common")
 
 @router.message(Command("start"))
-async def cmd_start(message: Message):
+async def cmd_start(message: Message, message_service: MessageService):
 	"""
 	Обробник команди /start
 	"""
-	await message.answer(
-		WELCOME_MESSAGE.format(name=hbold(message.from_user.full_name)),
-		reply_markup=get_main_keyboard()
+	await message_service.send_message(
+		chat_id=message.chat.id,
+		text=WELCOME_MESSAGE.format(name=hbold(message.from_user.full_name)),
+		keyboard=get_main_keyboard()
 	)
 
 @router.message(F.text == "🖨 Якість друку")
-async def handle_quality(message: Message):
+async def handle_quality(message: Message, message_service: MessageService):
 	"""
 	Обробник розділу якості друку
 	"""
-	await message.answer(QUALITY_START, reply_markup=remove_keyboard())
+	await message_service.send_message(
+		chat_id=message.chat.id,
+		text=QUALITY_START,
+		keyboard=remove_keyboard()
+	)
 
 @router.message(F.text == "❓ Питання / Відповідь")
-async def handle_faq(message: Message):
+async def handle_faq(message: Message, message_service: MessageService):
 	"""
 	Обробник розділу питань
 	"""
-	await message.answer(FAQ_START, reply_markup=remove_keyboard())
\ No newline at end of file
+	await message_service.send_message(
+		chat_id=message.chat.id,
+		text=FAQ_START,
+		keyboard=remove_keyboard()
+	)
\ No newline at end of file
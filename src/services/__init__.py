@@ -1,6 +1,26 @@
-from .media_storage import MediaStorage
-from .error_handler import ErrorHandler
-from .reminder_service import ReminderService
+"""
+Сервисы бота
 
-__all__ = ['MediaStorage', 'ErrorHandler', 'ReminderService']
+Модули импортируются при первом обращении к имени из пакета, а не при
+импорте ``services``: импорт одного сервиса (например, services.metrics)
+не тянет за собой остальные.
+"""
+from importlib import import_module
 
+_EXPORTS = {
+    'MediaStorage': '.media_storage',
+    'ErrorHandler': '.error_handler',
+    'ReminderService': '.reminder_service',
+    'ServiceContainer': '.container',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,485 @@
+"""
+Хранилище активных (незавершенных) заявок
+"""
+import os
+import json
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from ..models.application import Application
+from ..utils.expiring_map import ExpiringMap
+from .metrics import registry, track_state_map
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_APPLICATIONS = registry.gauge(
+    'bot_active_applications',
+    'Активные заявки, известные текущему процессу'
+)
+
+# Поля заявки со списками и словарями; в Redis хранятся как JSON
+_JSON_FIELDS = ('photos', 'photo_file_ids', 'media_previews', 'media_kinds')
+
+
+class ApplicationStore:
+    """Базовый интерфейс хранилища заявок"""
+
+    async def get(self, user_id: int) -> Optional[Application]:
+        """Возвращает активную заявку пользователя или None"""
+        raise NotImplementedError
+
+    async def create(self, user_id: int) -> Application:
+        """Создает новую заявку, заменяя существующую"""
+        raise NotImplementedError
+
+    async def update(self, user_id: int, **fields: Any) -> Optional[Application]:
+        """
+        Обновляет поля заявки
+
+        Returns:
+            Обновленная заявка или None, если заявки нет
+        """
+        raise NotImplementedError
+
+    async def append(self, user_id: int, field_name: str, value: str) -> Optional[Application]:
+        """
+        Добавляет значение в списковое поле заявки (photos, photo_file_ids)
+
+        Returns:
+            Обновленная заявка или None, если заявки нет
+        """
+        raise NotImplementedError
+
+    async def delete(self, user_id: int) -> None:
+        """Удаляет заявку пользователя"""
+        raise NotImplementedError
+
+    async def flush(self) -> None:
+        """Сбрасывает отложенные изменения в хранилище"""
+
+    async def close(self) -> None:
+        """Сбрасывает изменения и освобождает ресурсы"""
+        await self.flush()
+
+    def __len__(self) -> int:
+        """Количество заявок, известных текущему процессу"""
+        raise NotImplementedError
+
+
+class MemoryApplicationStore(ApplicationStore):
+    """
+    Хранилище заявок в памяти процесса
+
+    Брошенные заявки удаляются через ``ttl`` секунд после последнего
+    изменения, при превышении ``capacity`` вытесняются самые старые.
+    Для удаленных так заявок вызывается ``on_expire(user_id)``
+    (например, чтобы отменить напоминания).
+    """
+
+    def __init__(
+        self,
+        ttl: float = 2 * 24 * 3600,
+        capacity: Optional[int] = 10000,
+        on_expire: Optional[Callable[[int], Awaitable[Any]]] = None
+    ):
+        self.on_expire = on_expire
+        self._applications: ExpiringMap[int, Application] = ExpiringMap(
+            capacity=capacity,
+            ttl=ttl,
+            on_evict=self._on_evict
+        )
+        track_state_map('applications', self._applications)
+        self._background_tasks: Set[asyncio.Task] = set()
+
+    def _on_evict(self, user_id: int, application: Application, reason: str) -> None:
+        logger.info("Заявка user_id=%s удалена из памяти (%s)", user_id, reason)
+        if self.on_expire is None:
+            return
+        task = asyncio.ensure_future(self.on_expire(user_id))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def get(self, user_id: int) -> Optional[Application]:
+        return self._applications.get(user_id)
+
+    async def create(self, user_id: int) -> Application:
+        application = Application(user_id=user_id)
+        self._applications.set(user_id, application)
+        return application
+
+    async def update(self, user_id: int, **fields: Any) -> Optional[Application]:
+        application = self._applications.get(user_id)
+        if application is None:
+            return None
+        for name, value in fields.items():
+            setattr(application, name, value)
+        # Время жизни отсчитывается от последнего изменения
+        self._applications.set(user_id, application)
+        return application
+
+    async def append(self, user_id: int, field_name: str, value: str) -> Optional[Application]:
+        application = self._applications.get(user_id)
+        if application is None:
+            return None
+        getattr(application, field_name).append(value)
+        self._applications.set(user_id, application)
+        return application
+
+    async def delete(self, user_id: int) -> None:
+        self._applications.pop(user_id, None)
+
+    def __len__(self) -> int:
+        return len(self._applications)
+
+
+# Чтение с проверкой кэша: если ревизия заявки совпадает с ревизией
+# закэшированной копии, возвращается только ревизия, иначе - весь hash
+_READ_SCRIPT = """
+local rev = redis.call('HGET', KEYS[1], 'rev') or '0'
+if rev == ARGV[1] then
+    return {rev}
+end
+return {rev, redis.call('HGETALL', KEYS[1])}
+"""
+
+# Запись изменений одной заявки: ARGV = ttl, replace, JSON значений для HSET,
+# JSON полей для HDEL, JSON значений для добавления в списковые поля.
+# Возвращает ревизию до и после записи
+_WRITE_SCRIPT = """
+local prev = tonumber(redis.call('HGET', KEYS[1], 'rev') or '0')
+if ARGV[2] == '1' then
+    redis.call('DEL', KEYS[1])
+end
+for name, value in pairs(cjson.decode(ARGV[3])) do
+    redis.call('HSET', KEYS[1], name, value)
+end
+for _, name in ipairs(cjson.decode(ARGV[4])) do
+    redis.call('HDEL', KEYS[1], name)
+end
+for name, values in pairs(cjson.decode(ARGV[5])) do
+    local current = redis.call('HGET', KEYS[1], name)
+    local items = current and cjson.decode(current) or {}
+    for _, value in ipairs(values) do
+        table.insert(items, value)
+    end
+    redis.call('HSET', KEYS[1], name, cjson.encode(items))
+end
+local rev = redis.call('HINCRBY', KEYS[1], 'rev', 1)
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return {prev, rev}
+"""
+
+
+class _PendingWrite:
+    """Отложенная запись одной заявки"""
+    __slots__ = ('application', 'fields', 'appends', 'replace')
+
+    def __init__(self, application: Optional[Application], replace: bool = False):
+        self.application = application  # None означает удаление
+        self.fields: Set[str] = set()
+        # Значения, добавленные в списковые поля: в Redis дописываются к
+        # текущему списку, а не перезаписывают его
+        self.appends: Dict[str, List[str]] = {}
+        self.replace = replace
+
+    def set_fields(self, fields) -> None:
+        for name in fields:
+            self.fields.add(name)
+            self.appends.pop(name, None)
+
+    def append(self, field_name: str, value: str) -> None:
+        # Поле, записываемое целиком, уже содержит добавленное значение
+        if field_name not in self.fields:
+            self.appends.setdefault(field_name, []).append(value)
+
+    def merge_newer(self, newer: '_PendingWrite') -> None:
+        """Объединяет с более новой записью той же заявки (в self)"""
+        self.application = newer.application
+        self.replace = self.replace or newer.replace
+        self.set_fields(newer.fields)
+        for name, values in newer.appends.items():
+            for value in values:
+                self.append(name, value)
+
+
+class RedisApplicationStore(ApplicationStore):
+    """
+    Хранилище заявок в Redis с локальным LRU-кэшем и отложенной записью.
+
+    Каждая заявка хранится как hash ``{prefix}{user_id}`` с ревизией в поле
+    ``rev``. Изменения полей не отправляются сразу: они накапливаются и
+    через ``flush_delay`` секунд сбрасываются одним pipeline (по скрипту на
+    заявку), каждая запись увеличивает ревизию. Добавления в списки
+    дописываются к списку в Redis, поэтому не перетирают значения,
+    добавленные другой репликой.
+
+    Чтение из кэша сверяет ревизию с Redis: совпала - заявка не
+    передается и не декодируется, иначе тем же запросом читается весь hash.
+    Так шаг диалога обходится максимум в одно обращение к Redis, а
+    изменения и удаления с других реплик видны сразу.
+    """
+
+    def __init__(
+        self,
+        redis,
+        key_prefix: str = 'bambu:app:',
+        ttl: int = 2 * 24 * 3600,
+        cache_size: int = 1024,
+        flush_delay: float = 0.05
+    ):
+        """
+        Args:
+            redis: Асинхронный клиент redis.asyncio.Redis
+            key_prefix: Префикс ключей заявок
+            ttl: Время жизни незавершенной заявки в секундах
+            cache_size: Размер локального LRU-кэша (записи в нем живут не дольше ttl)
+            flush_delay: Задержка перед сбросом накопленных изменений
+        """
+        self.redis = redis
+        self.key_prefix = key_prefix
+        self.ttl = ttl
+        self.flush_delay = flush_delay
+        # user_id -> (ревизия в Redis или None до первой записи, заявка)
+        self._cache: ExpiringMap[int, Tuple[Optional[int], Application]] = ExpiringMap(
+            capacity=cache_size,
+            ttl=ttl
+        )
+        track_state_map('application_cache', self._cache)
+        self._pending: Dict[int, _PendingWrite] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._read = redis.register_script(_READ_SCRIPT)
+        self._write = redis.register_script(_WRITE_SCRIPT)
+
+    def _key(self, user_id: int) -> str:
+        return f"{self.key_prefix}{user_id}"
+
+    async def get(self, user_id: int) -> Optional[Application]:
+        pending = self._pending.get(user_id)
+        if pending is not None:
+            return pending.application
+
+        cached = self._cache.get(user_id)
+        cached_rev = cached[0] if cached is not None else None
+        reply = await self._read(
+            keys=[self._key(user_id)],
+            args=['' if cached_rev is None else cached_rev]
+        )
+        # Пока шел запрос, заявку могли изменить в этом процессе
+        pending = self._pending.get(user_id)
+        if pending is not None:
+            return pending.application
+
+        rev = int(reply[0])
+        if len(reply) == 1:
+            return cached[1]
+        if not reply[1]:
+            self._cache.pop(user_id)
+            return None
+
+        raw = reply[1]
+        application = _decode_application(user_id, dict(zip(raw[::2], raw[1::2])))
+        self._cache.set(user_id, (rev, application))
+        return application
+
+    async def create(self, user_id: int) -> Application:
+        application = Application(user_id=user_id)
+        self._cache.set(user_id, (None, application))
+        self._pending[user_id] = _PendingWrite(application, replace=True)
+        self._schedule_flush()
+        return application
+
+    async def update(self, user_id: int, **fields: Any) -> Optional[Application]:
+        application = await self.get(user_id)
+        if application is None:
+            return None
+        for name, value in fields.items():
+            setattr(application, name, value)
+        self._pending_write(application).set_fields(fields.keys())
+        self._schedule_flush()
+        return application
+
+    async def append(self, user_id: int, field_name: str, value: str) -> Optional[Application]:
+        application = await self.get(user_id)
+        if application is None:
+            return None
+        getattr(application, field_name).append(value)
+        self._pending_write(application).append(field_name, value)
+        self._schedule_flush()
+        return application
+
+    async def delete(self, user_id: int) -> None:
+        self._cache.pop(user_id)
+        self._pending[user_id] = _PendingWrite(None)
+        self._schedule_flush()
+
+    def _pending_write(self, application: Application) -> _PendingWrite:
+        """Отложенная запись заявки (создается при первом изменении)"""
+        pending = self._pending.get(application.user_id)
+        if pending is None:
+            pending = self._pending[application.user_id] = _PendingWrite(application)
+        return pending
+
+    def _schedule_flush(self) -> None:
+        """Планирует отложенный сброс изменений, если он еще не запланирован"""
+        if self._flush_handle is not None:
+            return
+        loop = asyncio.get_running_loop()
+        self._flush_handle = loop.call_later(self.flush_delay, self._start_flush)
+
+    def _start_flush(self) -> None:
+        self._flush_handle = None
+        self._flush_task = asyncio.ensure_future(self.flush())
+
+    async def flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, {}
+        pipe = self.redis.pipeline(transaction=False)
+
+        for user_id, write in pending.items():
+            key = self._key(user_id)
+            if write.application is None:
+                pipe.delete(key)
+                continue
+
+            if write.replace:
+                values = _encode_application(write.application)
+                removed, appends = [], {}
+            else:
+                values, removed = _encode_fields(write.application, write.fields)
+                appends = write.appends
+            await self._write(
+                keys=[key],
+                args=[
+                    self.ttl,
+                    '1' if write.replace else '0',
+                    json.dumps(values, ensure_ascii=False),
+                    json.dumps(removed),
+                    json.dumps(appends, ensure_ascii=False)
+                ],
+                client=pipe
+            )
+
+        try:
+            results = await pipe.execute()
+        except Exception as e:
+            logger.error("Ошибка при сохранении заявок в Redis: %s", e)
+            # Возвращаем изменения в очередь, не теряя более новые
+            for user_id, write in pending.items():
+                newer = self._pending.get(user_id)
+                if newer is not None and newer.application is not None and not newer.replace:
+                    write.merge_newer(newer)
+                    self._pending[user_id] = write
+                elif newer is None:
+                    self._pending[user_id] = write
+            self._schedule_flush()
+            return
+
+        for (user_id, write), result in zip(pending.items(), results):
+            if write.application is None:
+                continue
+            self._refresh_revision(user_id, write, int(result[0]), int(result[1]))
+
+    def _refresh_revision(self, user_id: int, write: _PendingWrite, prev: int, rev: int) -> None:
+        """
+        Обновляет ревизию закэшированной заявки после записи
+
+        Если до записи ревизия в Redis отличалась от закэшированной, заявку
+        меняла другая реплика: копия в кэше устарела и удаляется.
+        """
+        cached = self._cache.get(user_id)
+        if cached is None or cached[1] is not write.application:
+            return
+        if write.replace or cached[0] == prev:
+            self._cache.set(user_id, (rev, write.application))
+        else:
+            self._cache.pop(user_id)
+
+    async def close(self) -> None:
+        await self.flush()
+        await self.redis.aclose()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+def _encode_value(name: str, value: Any) -> str:
+    """Кодирует значение поля заявки для хранения в Redis"""
+    if name in _JSON_FIELDS:
+        return json.dumps(value, ensure_ascii=False)
+    if name == 'created_at':
+        return value.isoformat()
+    return str(value)
+
+
+def _encode_application(application: Application) -> Dict[str, str]:
+    """Кодирует все заполненные поля заявки"""
+    values, _ = _encode_fields(application, application.__dataclass_fields__.keys())
+    return values
+
+
+def _encode_fields(application: Application, fields) -> tuple:
+    """
+    Кодирует указанные поля заявки
+
+    Returns:
+        Tuple[значения_для_HSET, поля_для_HDEL]
+    """
+    values: Dict[str, str] = {}
+    removed = []
+    for name in fields:
+        if name == 'user_id':
+            continue
+        value = getattr(application, name)
+        if value is None:
+            removed.append(name)
+        else:
+            values[name] = _encode_value(name, value)
+    return values, removed
+
+
+def _decode_application(user_id: int, raw: Dict[bytes, bytes]) -> Application:
+    """Восстанавливает заявку из hash Redis"""
+    application = Application(user_id=user_id)
+    known_fields = application.__dataclass_fields__
+    for raw_name, raw_value in raw.items():
+        name = raw_name.decode() if isinstance(raw_name, bytes) else raw_name
+        value = raw_value.decode() if isinstance(raw_value, bytes) else raw_value
+        if name not in known_fields or name == 'user_id':
+            continue
+        if name in _JSON_FIELDS:
+            setattr(application, name, json.loads(value))
+        elif name == 'created_at':
+            application.created_at = datetime.fromisoformat(value)
+        else:
+            setattr(application, name, value)
+    return application
+
+
+def create_application_store() -> ApplicationStore:
+    """
+    Создает хранилище заявок по переменным окружения.
+
+    Если задан REDIS_HOST, используется Redis, иначе хранилище в памяти.
+    """
+    redis_host = os.getenv('REDIS_HOST')
+    if not redis_host:
+        logger.info("REDIS_HOST не задан, заявки хранятся в памяти")
+        return MemoryApplicationStore()
+
+    from redis.asyncio import Redis
+
+    redis = Redis(
+        host=redis_host,
+        port=int(os.getenv('REDIS_PORT', '6379')),
+        db=int(os.getenv('REDIS_DB', '0'))
+    )
+    logger.info("Заявки хранятся в Redis: %s", redis_host)
+    return RedisApplicationStore(redis)
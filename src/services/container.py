@@ -0,0 +1,213 @@
+"""
+Контейнер сервисов с ленивым созданием
+"""
+import os
+import logging
+from functools import cached_property
+from typing import TYPE_CHECKING, Any, Optional
+
+if TYPE_CHECKING:
+    from telegram import Bot
+
+    from .application_store import ApplicationStore
+    from .error_handler import ErrorHandler
+    from .image_processing import ImageProcessor
+    from .media_group import MediaGroupCollector
+    from .media_storage import MediaStorage
+    from .message_service import MessageService
+    from .reminder_service import ReminderService
+    from .retention import RetentionSweeper
+    from .send_scheduler import SendScheduler
+    from .video_processing import VideoTranscoder
+
+    # Модели бота на aiogram импортируются от корня src
+    from models.dialog import DialogManager
+    from models.user import UserManager
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceContainer:
+    """
+    Сервисы бота, создаваемые при первом обращении
+
+    Модуль сервиса импортируется и сервис создается только тогда, когда он
+    впервые нужен обработчику, поэтому запуск бота не платит за сервисы,
+    которые до первого обновления не используются (хранилище медиафайлов,
+    обработчик ошибок). Настройки читаются из переменных окружения в момент
+    создания сервиса.
+
+    Готовые сервисы (например, заглушки в тестах) передаются именованными
+    аргументами и заменяют создаваемые по умолчанию::
+
+        services = ServiceContainer(application_store=MemoryApplicationStore())
+
+    Args:
+        bot: Бот, через который отправляются напоминания
+        **services: Готовые экземпляры сервисов по имени атрибута
+    """
+
+    # Сервисы бота на aiogram создаются вместе с ботом и передаются в конструктор
+    dialog_manager: 'DialogManager'
+    user_manager: 'UserManager'
+    message_service: 'MessageService'
+
+    def __init__(self, bot: Optional['Bot'] = None, **services: Any):
+        self.bot = bot
+        for name, service in services.items():
+            if not hasattr(type(self), name) and name not in type(self).__annotations__:
+                raise TypeError(f"Неизвестный сервис: {name}")
+            # Значение в __dict__ экземпляра заменяет cached_property
+            self.__dict__[name] = service
+
+    @cached_property
+    def application_store(self) -> 'ApplicationStore':
+        """Хранилище активных заявок (Redis, если настроен)"""
+        from .application_store import create_application_store
+        return create_application_store()
+
+    @cached_property
+    def reminder_service(self) -> 'ReminderService':
+        """Напоминания о незавершенных заявках"""
+        from .application_store import MemoryApplicationStore
+        from .reminder_service import ReminderService
+        from .reminder_store import create_reminder_store
+
+        if self.bot is None:
+            raise RuntimeError("ReminderService требует bot")
+        service = ReminderService(
+            bot=self.bot,
+            application_store=self.application_store,
+            reminder_store=create_reminder_store(),
+            scheduler=self.send_scheduler
+        )
+        # Заявка, вытесненная из памяти, не должна напоминать о себе
+        if isinstance(self.application_store, MemoryApplicationStore):
+            self.application_store.on_expire = service.cancel_reminders
+        return service
+
+    @cached_property
+    def send_scheduler(self) -> 'SendScheduler':
+        """Планировщик исходящих запросов к Telegram; чат инженера обслуживается первым"""
+        from .send_scheduler import SendScheduler
+        try:
+            from ..config import config
+        except ImportError:
+            # Пакет services импортирован как верхнеуровневый (бот на aiogram)
+            from config import config
+
+        engineer_id = config.ENGINEER_TELEGRAM_ID
+        return SendScheduler(priority_chat_ids=[engineer_id] if engineer_id else ())
+
+    @cached_property
+    def media_storage(self) -> 'MediaStorage':
+        """Хранилище медиафайлов"""
+        from .media_storage import MediaStorage
+        return MediaStorage(
+            storage_path=os.getenv('MEDIA_STORAGE_PATH', './media'),
+            base_url=os.getenv('BASE_URL', 'http://localhost:8000')
+        )
+
+    @cached_property
+    def media_group_collector(self) -> 'MediaGroupCollector':
+        """Сборщик альбомов"""
+        from .media_group import MediaGroupCollector
+        return MediaGroupCollector(
+            self.media_storage,
+            max_concurrency=int(os.getenv('MEDIA_DOWNLOAD_CONCURRENCY', '4'))
+        )
+
+    @cached_property
+    def image_processor(self) -> Optional['ImageProcessor']:
+        """Превью и миниатюры фотографий (None, если Pillow не установлен или IMAGE_WORKERS=0)"""
+        from .image_processing import ImageProcessor, pillow_available
+
+        workers = int(os.getenv('IMAGE_WORKERS', '2'))
+        if workers <= 0:
+            return None
+        if not pillow_available():
+            logger.warning("Pillow не установлен: превью фотографий не создаются")
+            return None
+        return ImageProcessor(self.media_storage, workers=workers)
+
+    @cached_property
+    def video_transcoder(self) -> Optional['VideoTranscoder']:
+        """Превью и обложки видео (None, если ffmpeg не найден или VIDEO_WORKERS=0)"""
+        import shutil
+        from .video_processing import VideoTranscoder
+
+        workers = int(os.getenv('VIDEO_WORKERS', '1'))
+        if workers <= 0:
+            return None
+        ffmpeg = shutil.which(os.getenv('FFMPEG_BINARY', 'ffmpeg'))
+        if ffmpeg is None:
+            logger.warning("ffmpeg не найден: превью видео не создаются")
+            return None
+        return VideoTranscoder(
+            self.media_storage,
+            workers=workers,
+            queue_size=int(os.getenv('VIDEO_QUEUE_SIZE', '100')),
+            max_preview_bytes=int(float(os.getenv('VIDEO_PREVIEW_MB', '15')) * 1024 * 1024),
+            ffmpeg=ffmpeg
+        )
+
+    @cached_property
+    def media_retention(self) -> 'RetentionSweeper':
+        """Очистка медиахранилища: осиротевшие файлы, срок хранения и квоты"""
+        from .retention import DAY, RetentionSweeper
+
+        def megabytes(name: str) -> Optional[int]:
+            value = float(os.getenv(name, '0'))
+            return int(value * 1024 * 1024) if value > 0 else None
+
+        max_age_days = float(os.getenv('RETENTION_DAYS', '180'))
+        return RetentionSweeper(
+            self.media_storage,
+            self.application_store,
+            max_age=max_age_days * DAY if max_age_days > 0 else None,
+            orphan_grace=float(os.getenv('RETENTION_ORPHAN_HOURS', '6')) * 3600,
+            user_quota_bytes=megabytes('RETENTION_USER_QUOTA_MB'),
+            global_quota_bytes=megabytes('RETENTION_TOTAL_QUOTA_MB'),
+            interval=float(os.getenv('RETENTION_INTERVAL', '300')),
+            batch_users=int(os.getenv('RETENTION_BATCH_USERS', '200'))
+        )
+
+    @cached_property
+    def error_handler(self) -> 'ErrorHandler':
+        """Глобальный обработчик ошибок"""
+        from .error_handler import ErrorHandler
+        return ErrorHandler()
+
+    async def handle_error(self, update: object, context: Any) -> None:
+        """Обработчик ошибок для ``Application.add_error_handler``; ErrorHandler создается при первой ошибке"""
+        await self.error_handler.handle_error(update, context)
+
+    def is_created(self, name: str) -> bool:
+        """Создан ли уже сервис"""
+        return name in self.__dict__
+
+    def cancel_media_jobs(self, user_id: int) -> None:
+        """Отменяет фоновую обработку медиафайлов заявки; несозданные сервисы не создаются"""
+        if self.is_created('video_transcoder') and self.video_transcoder is not None:
+            self.video_transcoder.cancel(user_id)
+
+    async def close(self) -> None:
+        """Останавливает созданные сервисы; несозданные не создаются"""
+        if self.is_created('reminder_service'):
+            await self.reminder_service.stop()
+        # Заявки, которые еще отправляются инженеру, дожидаются отправки
+        if self.is_created('message_service'):
+            await self.message_service.close()
+        if self.is_created('send_scheduler'):
+            await self.send_scheduler.close()
+        if self.is_created('media_retention'):
+            await self.media_retention.stop()
+        # Сбрасываем отложенные изменения заявок перед остановкой
+        if self.is_created('application_store'):
+            await self.application_store.close()
+        if self.is_created('video_transcoder') and self.video_transcoder is not None:
+            await self.video_transcoder.close()
+        if self.is_created('image_processor') and self.image_processor is not None:
+            await self.image_processor.close()
+        if self.is_created('media_storage'):
+            await self.media_storage.close()
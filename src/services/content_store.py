@@ -0,0 +1,304 @@
+"""
+Контентно-адресуемое хранилище файлов с подсчетом ссылок
+"""
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, TextIO
+
+logger = logging.getLogger(__name__)
+
+
+class ContentStore:
+    """
+    Хранит каждое уникальное содержимое один раз.
+
+    Файлы лежат в ``root/<aa>/<bb>/<sha256>``, а пользовательские пути
+    (``photos/<user_id>/...``) являются жесткими ссылками на них (или
+    символическими, если жесткие ссылки недоступны). Индекс хранит
+    соответствие пользовательских путей хешам; количество ссылок на
+    содержимое вычисляется по нему, поэтому содержимое удаляется только
+    вместе с последней ссылкой.
+
+    Индекс состоит из снимка ``index.json`` и журнала ``index.log``: каждое
+    изменение дописывается в журнал одной строкой с fsync, поэтому запись
+    не зависит от числа файлов в хранилище и переживает аварийную
+    остановку. Когда журнал становится длиннее индекса, он сворачивается в
+    новый снимок. Записи журнала идемпотентны, так что повторное
+    применение журнала к уже обновленному снимку ничего не меняет.
+
+    Все методы синхронные и потокобезопасные.
+    """
+
+    INDEX_FILE = 'index.json'
+    JOURNAL_FILE = 'index.log'
+    # Журнал сворачивается, когда в нем больше записей, чем путей в индексе
+    # (но не раньше, чем наберется COMPACT_MIN записей)
+    COMPACT_MIN = 1000
+
+    def __init__(self, root: Path):
+        """
+        Args:
+            root: Корневая директория хранилища содержимого
+        """
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self._refs: Optional[Dict[str, int]] = None
+        self._paths: Dict[str, str] = {}
+        self._journal: Optional[TextIO] = None
+        self._journal_entries = 0
+
+    @staticmethod
+    def new_hasher():
+        """Создает объект хеширования для потоковой записи"""
+        return hashlib.sha256()
+
+    def blob_path(self, digest: str) -> Path:
+        """Путь к содержимому по его хешу"""
+        return self.root / digest[:2] / digest[2:4] / digest
+
+    def add_bytes(self, data: bytes, target: Path, relative_path: str) -> str:
+        """
+        Сохраняет содержимое (если его еще нет) и создает ссылку на него
+
+        Args:
+            data: Данные файла
+            target: Пользовательский путь к файлу
+            relative_path: Путь относительно корня медиахранилища (ключ индекса)
+
+        Returns:
+            Хеш содержимого
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        tmp_path = None
+        # Запись вне блокировки; если содержимое удалят до _commit, он
+        # запишет его сам
+        if not self.blob_path(digest).exists():
+            tmp_path = self._write_temp(digest, data)
+        self._commit(digest, tmp_path, target, relative_path, data)
+        return digest
+
+    def add_file(self, tmp_path: str, digest: str, target: Path, relative_path: str) -> None:
+        """
+        Переносит готовый временный файл в хранилище и создает ссылку на него.
+        Если такое содержимое уже есть, временный файл просто удаляется.
+
+        Args:
+            tmp_path: Путь к временному файлу с содержимым
+            digest: Хеш содержимого
+            target: Пользовательский путь к файлу
+            relative_path: Путь относительно корня медиахранилища (ключ индекса)
+        """
+        self._commit(digest, tmp_path, target, relative_path)
+
+    def _write_temp(self, digest: str, data: bytes) -> str:
+        """Записывает данные во временный файл рядом с местом хранения"""
+        directory = self.blob_path(digest).parent
+        directory.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=directory, suffix='.tmp', delete=False) as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(f.name, 0o644)
+        return f.name
+
+    def _commit(
+        self,
+        digest: str,
+        tmp_path: Optional[str],
+        target: Path,
+        relative_path: str,
+        data: Optional[bytes] = None
+    ) -> None:
+        """
+        Размещает содержимое, создает ссылку и увеличивает счетчик ссылок
+
+        Наличие содержимого проверяется под блокировкой: если его нет и
+        временного файла тоже (содержимое удалили после проверки в
+        add_bytes), оно записывается из ``data``.
+        """
+        blob = self.blob_path(digest)
+        with self._lock:
+            if blob.exists():
+                if tmp_path is not None:
+                    os.unlink(tmp_path)
+            else:
+                if tmp_path is None:
+                    if data is None:
+                        raise FileNotFoundError(f"Содержимое {digest} отсутствует в хранилище")
+                    tmp_path = self._write_temp(digest, data)
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp_path, blob)
+
+            if os.path.lexists(target):
+                # Файл с тем же путем сохраняется повторно: ссылка заменяется,
+                # прежнее содержимое освобождается ниже
+                target.unlink()
+            try:
+                os.link(blob, target)
+            except FileExistsError:
+                raise
+            except OSError:
+                # Например, если файловая система не поддерживает жесткие ссылки
+                os.symlink(os.path.relpath(blob, target.parent), target)
+
+            self._load_index()
+            previous = self._paths.get(relative_path)
+            self._apply_add(relative_path, digest)
+            self._append_journal([['+', relative_path, digest]])
+            if previous is not None and previous not in self._refs:
+                try:
+                    self.blob_path(previous).unlink()
+                except FileNotFoundError:
+                    pass
+
+    def release(self, relative_path: str) -> Optional[bool]:
+        """
+        Уменьшает счетчик ссылок для пользовательского пути
+
+        Returns:
+            None, если путь не найден в индексе;
+            True, если содержимое удалено (это была последняя ссылка);
+            False, если на содержимое еще есть ссылки
+        """
+        return self.release_many([relative_path])[relative_path]
+
+    def release_many(self, relative_paths: Iterable[str]) -> Dict[str, Optional[bool]]:
+        """
+        Уменьшает счетчики ссылок для нескольких путей одной записью в журнал
+
+        Returns:
+            Результат release() для каждого пути
+        """
+        results: Dict[str, Optional[bool]] = {}
+        with self._lock:
+            self._load_index()
+            reclaimed_digests = []
+            for relative_path in relative_paths:
+                digest = self._apply_release(relative_path)
+                if digest is None:
+                    results[relative_path] = None
+                    continue
+                reclaimed = digest not in self._refs
+                if reclaimed:
+                    reclaimed_digests.append(digest)
+                results[relative_path] = reclaimed
+
+            released = [['-', path] for path, result in results.items() if result is not None]
+            if released:
+                # Содержимое удаляется после записи в журнал: после сбоя
+                # индекс не ссылается на удаленный файл
+                self._append_journal(released)
+            for digest in reclaimed_digests:
+                try:
+                    self.blob_path(digest).unlink()
+                except FileNotFoundError:
+                    pass
+        return results
+
+    def ref_count(self, digest: str) -> int:
+        """Количество ссылок на содержимое"""
+        with self._lock:
+            return self._load_index().get(digest, 0)
+
+    def _apply_add(self, relative_path: str, digest: str) -> None:
+        """Связывает путь с содержимым (вызывать под блокировкой)"""
+        previous = self._paths.get(relative_path)
+        if previous == digest:
+            return
+        if previous is not None:
+            self._apply_release(relative_path)
+        self._paths[relative_path] = digest
+        self._refs[digest] = self._refs.get(digest, 0) + 1
+
+    def _apply_release(self, relative_path: str) -> Optional[str]:
+        """Удаляет путь из индекса и возвращает его хеш (вызывать под блокировкой)"""
+        digest = self._paths.pop(relative_path, None)
+        if digest is not None:
+            count = self._refs.get(digest, 0) - 1
+            if count > 0:
+                self._refs[digest] = count
+            else:
+                self._refs.pop(digest, None)
+        return digest
+
+    def _load_index(self) -> Dict[str, int]:
+        """Загружает снимок и журнал при первом обращении (вызывать под блокировкой)"""
+        if self._refs is not None:
+            return self._refs
+
+        self._refs = {}
+        self._paths = {}
+        try:
+            with open(self.root / self.INDEX_FILE, 'r', encoding='utf-8') as f:
+                paths = json.load(f).get('paths', {})
+        except FileNotFoundError:
+            paths = {}
+        for relative_path, digest in paths.items():
+            self._apply_add(relative_path, digest)
+
+        self._journal_entries = 0
+        journal_path = self.root / self.JOURNAL_FILE
+        try:
+            with open(journal_path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b''
+        *lines, tail = data.split(b'\n')
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                logger.warning("Поврежденная запись журнала индекса пропущена: %r", line[:200])
+                continue
+            if entry[0] == '+':
+                self._apply_add(entry[1], entry[2])
+            else:
+                self._apply_release(entry[1])
+            self._journal_entries += 1
+        if tail:
+            # Недописанная последняя строка после аварийной остановки: запись
+            # не была подтверждена, отрезаем ее, чтобы не склеить со следующей
+            logger.warning("Недописанная запись журнала индекса отброшена: %r", tail[:200])
+            os.truncate(journal_path, len(data) - len(tail))
+        return self._refs
+
+    def _append_journal(self, entries: List[list]) -> None:
+        """Дописывает изменения в журнал и сворачивает его при необходимости (вызывать под блокировкой)"""
+        if self._journal is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            self._journal = open(self.root / self.JOURNAL_FILE, 'a', encoding='utf-8')
+        self._journal.write(''.join(json.dumps(entry, ensure_ascii=False) + '\n' for entry in entries))
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._journal_entries += len(entries)
+
+        if self._journal_entries > max(self.COMPACT_MIN, len(self._paths)):
+            self._compact()
+
+    def _compact(self) -> None:
+        """Записывает снимок индекса и очищает журнал (вызывать под блокировкой)"""
+        with tempfile.NamedTemporaryFile(
+            'w', dir=self.root, suffix='.tmp', delete=False, encoding='utf-8'
+        ) as f:
+            json.dump({'paths': self._paths}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(f.name, self.root / self.INDEX_FILE)
+        # Журнал очищается только после того, как снимок на диске
+        self._journal.seek(0)
+        self._journal.truncate()
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._journal_entries = 0
+
+    def close(self) -> None:
+        """Закрывает журнал индекса"""
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
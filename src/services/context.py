@@ -1,46 +1,48 @@
 """
-Контекст для доступа к сервисам из обработчиков
+Контекст обработчиков PTB с доступом к сервисам
+
+Контейнер сервисов хранится в ``bot_data`` приложения и копируется в
+контекст при его создании, поэтому обработчик получает сервис одним
+обращением к атрибуту, без импортов и поиска в словаре на каждое
+обновление::
+
+    async def handler(update: Update, context: BotContext) -> int:
+        application = await context.services.application_store.get(user_id)
 """
 from typing import Optional
-from .media_storage import MediaStorage
-from .error_handler import ErrorHandler
-from .reminder_service import ReminderService
-
-# Глобальные экземпляры сервисов
-_media_storage: Optional[MediaStorage] = None
-_error_handler: Optional[ErrorHandler] = None
-_reminder_service: Optional[ReminderService] = None
 
+from telegram.ext import Application, CallbackContext, ContextTypes, ExtBot
 
-def set_media_storage(storage: MediaStorage):
-    """Устанавливает экземпляр MediaStorage"""
-    global _media_storage
-    _media_storage = storage
+from .container import ServiceContainer
 
 
-def get_media_storage() -> Optional[MediaStorage]:
-    """Возвращает экземпляр MediaStorage"""
-    return _media_storage
+class BotData(dict):
+    """bot_data приложения: обычный словарь и контейнер сервисов в атрибуте services"""
+    __slots__ = ('services',)
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.services = ServiceContainer()
 
-def set_error_handler(handler: ErrorHandler):
-    """Устанавливает экземпляр ErrorHandler"""
-    global _error_handler
-    _error_handler = handler
 
+class BotContext(CallbackContext[ExtBot, dict, dict, BotData]):
+    """Контекст обработчика с контейнером сервисов приложения"""
 
-def get_error_handler() -> Optional[ErrorHandler]:
-    """Возвращает экземпляр ErrorHandler"""
-    return _error_handler
+    def __init__(self, application: Application, chat_id: Optional[int] = None, user_id: Optional[int] = None):
+        super().__init__(application, chat_id, user_id)
+        self.services: ServiceContainer = application.bot_data.services
 
 
-def set_reminder_service(service: ReminderService):
-    """Устанавливает экземпляр ReminderService"""
-    global _reminder_service
-    _reminder_service = service
+# Передаются в Application.builder().context_types(...)
+CONTEXT_TYPES = ContextTypes(context=BotContext, bot_data=BotData)
 
 
-def get_reminder_service() -> Optional[ReminderService]:
-    """Возвращает экземпляр ReminderService"""
-    return _reminder_service
+def set_services(application: Application, services: ServiceContainer) -> None:
+    """
+    Устанавливает контейнер сервисов приложения
 
+    Если у контейнера нет бота, напоминания отправляются через бота приложения.
+    """
+    if services.bot is None:
+        services.bot = application.bot
+    application.bot_data.services = services
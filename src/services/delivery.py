@@ -0,0 +1,89 @@
+"""
+Упаковка медиафайлов заявки в альбомы для отправки инженеру
+"""
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+from urllib.parse import urlsplit
+
+try:
+    from ..utils.templates import html_text_length
+except ImportError:
+    # Пакет services импортирован как верхнеуровневый (бот на aiogram)
+    from utils.templates import html_text_length
+
+# Telegram принимает в одном альбоме от 2 до 10 файлов
+MEDIA_GROUP_LIMIT = 10
+# Максимальная длина подписи к фото/видео
+CAPTION_LIMIT = 1024
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mkv', '.webm')
+
+
+@dataclass
+class DeliveryItem:
+    """Один медиафайл для отправки"""
+    kind: str  # 'photo' или 'video'
+    media: str  # URL или file_id
+    caption: Optional[str] = None
+
+
+@dataclass
+class DeliveryPlan:
+    """
+    План отправки заявки: альбомы и, если текст не помещается в подпись,
+    отдельное текстовое сообщение перед ними
+    """
+    groups: List[List[DeliveryItem]]
+    text: Optional[str] = None
+
+
+def guess_media_kind(media: str) -> str:
+    """
+    Определяет тип файла по расширению в URL
+
+    Returns:
+        'video' для видеофайлов, иначе 'photo'
+    """
+    path = urlsplit(media).path.lower()
+    return 'video' if path.endswith(VIDEO_EXTENSIONS) else 'photo'
+
+
+def pack_media_groups(items: Iterable[DeliveryItem], limit: int = MEDIA_GROUP_LIMIT) -> List[List[DeliveryItem]]:
+    """
+    Разбивает файлы на альбомы не более ``limit`` штук.
+
+    Альбом из одного файла Telegram не принимает, поэтому последний альбом
+    дополняется файлом из предыдущего (например, 11 файлов -> 9 + 2).
+    Одиночный файл возвращается отдельной группой из одного элемента.
+    """
+    items = list(items)
+    groups = [items[i:i + limit] for i in range(0, len(items), limit)]
+    if len(groups) > 1 and len(groups[-1]) == 1:
+        groups[-1].insert(0, groups[-2].pop())
+    return groups
+
+
+def plan_delivery(text: str, items: Iterable[DeliveryItem]) -> DeliveryPlan:
+    """
+    Формирует план отправки заявки
+
+    Текст заявки становится подписью первого файла, если помещается в
+    ограничение Telegram на подпись (длина видимого текста в единицах
+    UTF-16); иначе отправляется отдельным сообщением.
+
+    Args:
+        text: Текст заявки (HTML)
+        items: Медиафайлы заявки
+
+    Returns:
+        План отправки
+    """
+    groups = pack_media_groups(items)
+    if not groups:
+        return DeliveryPlan(groups=[], text=text)
+
+    if html_text_length(text) <= CAPTION_LIMIT:
+        groups[0][0].caption = text
+        return DeliveryPlan(groups=groups)
+
+    return DeliveryPlan(groups=groups, text=text)
@@ -4,10 +4,13 @@
 import os
 import logging
 import traceback
-from typing import Optional, Dict, Any
+from typing import Optional, Any
 from telegram import Update
 from telegram.ext import ContextTypes
 
+from ..utils.expiring_map import ExpiringMap
+from .metrics import track_state_map
+
 logger = logging.getLogger(__name__)
 
 
@@ -15,7 +18,10 @@ class ErrorHandler:
     """Класс для обработки ошибок и восстановления состояния"""
     
     def __init__(self):
-        self.error_count: Dict[int, int] = {}  # Счетчик ошибок по user_id
+        # Счетчик ошибок по user_id; счетчик пользователя, у которого час
+        # не было ошибок, удаляется
+        self.error_count: ExpiringMap[int, int] = ExpiringMap(capacity=10000, ttl=3600)
+        track_state_map('error_counts', self.error_count)
         self.max_errors = 3  # Максимальное количество ошибок подряд
     
     async def handle_error(self, update: Optional[Update], context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -33,10 +39,7 @@ class ErrorHandler:
             user_id = update.effective_user.id
         
         # Логируем ошибку
-        logger.error(
-            f"Ошибка в боте (user_id={user_id}): {error}",
-            exc_info=error
-        )
+        logger.error("Ошибка в боте (user_id=%s): %s", user_id, error, exc_info=error)
         
         # Отправляем сообщение пользователю
         if update and update.effective_chat:
@@ -67,7 +70,7 @@ class ErrorHandler:
                 await start(update, context)
                 
             except Exception as e:
-                logger.error(f"Ошибка при отправке сообщения об ошибке: {e}")
+                logger.error("Ошибка при отправке сообщения об ошибке: %s", e)
     
     async def _handle_max_errors(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """
@@ -105,7 +108,7 @@ class ErrorHandler:
                 )
                 
         except Exception as e:
-            logger.error(f"Ошибка при обработке максимального количества ошибок: {e}")
+            logger.error("Ошибка при обработке максимального количества ошибок: %s", e)
     
     def reset_error_count(self, user_id: int) -> None:
         """Сбрасывает счетчик ошибок для пользователя"""
@@ -131,7 +134,7 @@ class ErrorHandler:
         from telegram.ext import ConversationHandler
         
         user_id = update.effective_user.id
-        logger.error(f"Ошибка в разговоре (user_id={user_id}): {error}")
+        logger.error("Ошибка в разговоре (user_id=%s): %s", user_id, error)
         
         try:
             error_message = (
@@ -151,6 +154,6 @@ class ErrorHandler:
             return ConversationHandler.END
             
         except Exception as e:
-            logger.error(f"Критическая ошибка при обработке ошибки разговора: {e}")
+            logger.error("Критическая ошибка при обработке ошибки разговора: %s", e)
             return ConversationHandler.END
 
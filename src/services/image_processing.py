@@ -0,0 +1,254 @@
+"""
+Обработка фотографий после сохранения: превью, миниатюра и размеры
+
+Оригинал остается в хранилище без изменений, рядом с ним создаются:
+
+- ``previews/<user_id>/<имя>.jpg`` - пережатое превью не больше
+  ``preview_size`` по длинной стороне; его получает инженер;
+- ``thumbnails/<user_id>/<имя>.webp`` - миниатюра WebP.
+
+Обе копии записываются без EXIF (координаты GPS, модель телефона и т.п.)
+с уже примененным поворотом из EXIF. Декодирование и кодирование
+изображений нагружают процессор и держат GIL, поэтому выполняются в пуле
+процессов, а не в потоках и не в event loop.
+
+Pillow - необязательная зависимость: без нее обработка отключена, а
+инженер получает оригиналы, как раньше.
+"""
+import os
+import asyncio
+import logging
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from importlib.util import find_spec
+from multiprocessing import get_context
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from .metrics import registry
+
+if TYPE_CHECKING:
+    from .media_storage import MediaStorage
+
+logger = logging.getLogger(__name__)
+
+IMAGES_PROCESSED = registry.counter(
+    'media_images_processed',
+    'Обработанные фотографии по результату (ok, failed)',
+    ['outcome']
+)
+IMAGE_PROCESSING_LATENCY = registry.histogram(
+    'media_image_processing_seconds',
+    'Время обработки фотографии, включая ожидание в пуле процессов'
+)
+IMAGE_BYTES = registry.counter(
+    'media_image_bytes',
+    'Размер оригиналов и созданных копий фотографий в байтах',
+    ['variant']
+)
+
+# Код тега EXIF Orientation; значения 5-8 означают поворот на 90 градусов
+_ORIENTATION = 0x0112
+
+
+@dataclass
+class ImageInfo:
+    """Результат обработки фотографии"""
+    width: int  # Размеры оригинала с учетом поворота из EXIF
+    height: int
+    preview_url: str  # URL оригинала, если превью получилось не меньше него
+    thumbnail_url: str
+
+    def to_list(self) -> list:
+        """Представление для хранения в заявке (Application.media_previews)"""
+        return [self.preview_url, self.thumbnail_url, self.width, self.height]
+
+
+def pillow_available() -> bool:
+    """Установлен ли Pillow"""
+    return find_spec('PIL') is not None
+
+
+def _save_atomic(image, target: str, format: str, **options) -> int:
+    """Сохраняет изображение через временный файл и возвращает размер файла"""
+    directory = os.path.dirname(target)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.image_', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            image.save(tmp_file, format, **options)
+        # mkstemp создает файл с правами 0600, а файлы раздает nginx
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, target)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    return os.path.getsize(target)
+
+
+def process_image(
+    source: str,
+    preview_path: str,
+    thumbnail_path: str,
+    preview_size: int,
+    preview_quality: int,
+    thumbnail_size: int,
+    thumbnail_quality: int
+) -> Tuple[int, int, int, int, int]:
+    """
+    Создает превью и миниатюру фотографии (выполняется в процессе пула)
+
+    Returns:
+        Tuple[ширина, высота, байт_оригинала, байт_превью, байт_миниатюры]
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as image:
+        width, height = image.size
+        if image.getexif().get(_ORIENTATION, 1) in (5, 6, 7, 8):
+            width, height = height, width
+
+        # JPEG декодируется сразу в уменьшенном масштабе (1/2, 1/4, 1/8),
+        # если превью заметно меньше оригинала
+        image.draft('RGB', (preview_size, preview_size))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        # Метаданные не передаются в save(), поэтому копии сохраняются без EXIF
+        image.thumbnail((preview_size, preview_size), Image.Resampling.LANCZOS)
+        preview_bytes = _save_atomic(
+            image, preview_path, 'JPEG',
+            quality=preview_quality, optimize=True, progressive=True
+        )
+        image.thumbnail((thumbnail_size, thumbnail_size), Image.Resampling.LANCZOS)
+        thumbnail_bytes = _save_atomic(
+            image, thumbnail_path, 'WEBP',
+            quality=thumbnail_quality, method=4
+        )
+
+    return width, height, os.path.getsize(source), preview_bytes, thumbnail_bytes
+
+
+class ImageProcessor:
+    """
+    Создает превью и миниатюры сохраненных фотографий в пуле процессов
+
+    Пул создается при первой обработке. Количество одновременно
+    обрабатываемых фотографий ограничено числом процессов: остальные ждут
+    в очереди пула, не занимая event loop.
+    """
+
+    PREVIEW_SIZE = 1280
+    PREVIEW_QUALITY = 82
+    THUMBNAIL_SIZE = 320
+    THUMBNAIL_QUALITY = 70
+
+    def __init__(
+        self,
+        media_storage: 'MediaStorage',
+        workers: int = 2,
+        preview_size: int = PREVIEW_SIZE,
+        thumbnail_size: int = THUMBNAIL_SIZE
+    ):
+        """
+        Args:
+            media_storage: Хранилище, в котором лежат оригиналы
+            workers: Количество процессов обработки
+            preview_size: Максимальный размер превью по длинной стороне
+            thumbnail_size: Максимальный размер миниатюры по длинной стороне
+        """
+        self.media_storage = media_storage
+        self.workers = workers
+        self.preview_size = preview_size
+        self.thumbnail_size = thumbnail_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: процессы не наследуют потоки бота (пул ввода-вывода, логирование)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=get_context('spawn')
+            )
+        return self._executor
+
+    async def process(self, file_path: str) -> Optional[ImageInfo]:
+        """
+        Обрабатывает сохраненную фотографию
+
+        Args:
+            file_path: Путь к оригиналу, возвращенный MediaStorage
+
+        Returns:
+            Размеры и URL копий или None, если фотографию не удалось обработать
+        """
+        storage = self.media_storage
+        try:
+            relative = Path(file_path).relative_to(storage.storage_path)
+        except ValueError:
+            logger.warning("Файл %s не принадлежит хранилищу, обработка пропущена", file_path)
+            return None
+
+        # photos/<user_id>/<имя>.jpg -> previews/<user_id>/<имя>.jpg, thumbnails/<user_id>/<имя>.webp
+        name = Path(*relative.parts[1:]).with_suffix('').as_posix()
+        preview_relative = f"previews/{name}.jpg"
+        thumbnail_relative = f"thumbnails/{name}.webp"
+
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            width, height, original_bytes, preview_bytes, thumbnail_bytes = await loop.run_in_executor(
+                self._get_executor(),
+                process_image,
+                file_path,
+                str(storage.storage_path / preview_relative),
+                str(storage.storage_path / thumbnail_relative),
+                self.preview_size,
+                self.PREVIEW_QUALITY,
+                self.thumbnail_size,
+                self.THUMBNAIL_QUALITY
+            )
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                # Процесс пула завершился аварийно (например, нехватка памяти):
+                # следующая фотография обрабатывается новым пулом
+                self._executor = None
+            IMAGES_PROCESSED.labels('failed').inc()
+            logger.error("Ошибка при обработке фотографии %s: %s", file_path, e)
+            return None
+        finally:
+            IMAGE_PROCESSING_LATENCY.observe(time.perf_counter() - started)
+
+        IMAGES_PROCESSED.labels('ok').inc()
+        IMAGE_BYTES.labels('original').inc(original_bytes)
+        IMAGE_BYTES.labels('preview').inc(preview_bytes)
+        IMAGE_BYTES.labels('thumbnail').inc(thumbnail_bytes)
+
+        # Маленький или уже сильно сжатый оригинал не заменяем более тяжелой копией
+        if preview_bytes >= original_bytes:
+            preview_url = storage.get_file_url(file_path)
+        else:
+            preview_url = storage.get_file_url(str(storage.storage_path / preview_relative))
+        return ImageInfo(
+            width=width,
+            height=height,
+            preview_url=preview_url,
+            thumbnail_url=storage.get_file_url(str(storage.storage_path / thumbnail_relative))
+        )
+
+    async def process_many(self, file_paths: List[str]) -> List[Optional[ImageInfo]]:
+        """Обрабатывает несколько фотографий параллельно (в пределах пула)"""
+        return list(await asyncio.gather(*(self.process(path) for path in file_paths)))
+
+    async def close(self) -> None:
+        """Останавливает пул процессов, дождавшись текущих задач"""
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown, True)
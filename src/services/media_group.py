@@ -0,0 +1,151 @@
+"""
+Сборка альбомов (media group) и параллельная загрузка их файлов
+"""
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from .media_storage import MediaStorage
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class MediaGroupItem:
+    """Один файл альбома"""
+    message_id: int
+    file_id: str
+    file_type: str  # 'photo' или 'video'
+
+
+@dataclass
+class SavedMediaItem:
+    """Результат сохранения файла альбома"""
+    item: MediaGroupItem
+    url: Optional[str] = None  # None, если файл не удалось сохранить
+    path: Optional[str] = None  # Путь в хранилище (None, если сохранен только file_id)
+
+
+# Вызывается один раз для всего альбома после загрузки всех файлов
+OnGroupComplete = Callable[[List[SavedMediaItem]], Awaitable[None]]
+
+
+@dataclass
+class _PendingGroup:
+    user_id: int
+    bot: object
+    on_complete: OnGroupComplete
+    limit: Optional[int] = None
+    items: List[MediaGroupItem] = field(default_factory=list)
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class MediaGroupCollector:
+    """
+    Собирает обновления одного альбома по ``media_group_id``.
+
+    Telegram присылает каждый файл альбома отдельным обновлением. Коллектор
+    ждет ``collect_delay`` секунд после последнего файла альбома, затем
+    скачивает все файлы параллельно (не более ``max_concurrency`` загрузок
+    одновременно на весь процесс) и один раз вызывает ``on_complete``.
+    Файлы сверх ``limit`` (свободных мест в заявке) не скачиваются.
+    """
+
+    def __init__(
+        self,
+        media_storage: Optional['MediaStorage'],
+        max_concurrency: int = 4,
+        collect_delay: float = 1.0
+    ):
+        """
+        Args:
+            media_storage: Хранилище медиафайлов (None - сохраняются только file_id)
+            max_concurrency: Максимум одновременных загрузок
+            collect_delay: Время ожидания следующего файла альбома в секундах
+        """
+        self.media_storage = media_storage
+        self.collect_delay = collect_delay
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._groups: Dict[str, _PendingGroup] = {}
+        self._tasks: set = set()
+
+    def add(
+        self,
+        media_group_id: str,
+        user_id: int,
+        bot,
+        item: MediaGroupItem,
+        on_complete: OnGroupComplete,
+        limit: Optional[int] = None
+    ) -> None:
+        """
+        Добавляет файл в альбом
+
+        Args:
+            media_group_id: ID альбома из сообщения
+            user_id: ID пользователя
+            bot: Бот для получения файлов
+            item: Файл альбома
+            on_complete: Обработчик результата; используется обработчик первого файла
+            limit: Сколько первых файлов альбома скачать (None - все);
+                используется значение первого файла
+        """
+        group = self._groups.get(media_group_id)
+        if group is None:
+            group = self._groups[media_group_id] = _PendingGroup(user_id, bot, on_complete, limit)
+        group.items.append(item)
+
+        # Откладываем обработку, пока приходят новые файлы альбома
+        if group.timer is not None:
+            group.timer.cancel()
+        loop = asyncio.get_running_loop()
+        group.timer = loop.call_later(self.collect_delay, self._start_group, media_group_id)
+
+    def _start_group(self, media_group_id: str) -> None:
+        group = self._groups.pop(media_group_id, None)
+        if group is None:
+            return
+        task = asyncio.ensure_future(self._process_group(media_group_id, group))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _process_group(self, media_group_id: str, group: _PendingGroup) -> None:
+        items = sorted(group.items, key=lambda item: item.message_id)
+        if group.limit is not None and len(items) > group.limit:
+            logger.info(
+                "Альбом %s user_id=%s: пропущено %d файлов сверх лимита",
+                media_group_id, group.user_id, len(items) - group.limit
+            )
+            items = items[:group.limit]
+        results = await asyncio.gather(
+            *(self._save_item(group, item) for item in items)
+        )
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Альбом %s user_id=%s: сохранено %d/%d файлов",
+                media_group_id, group.user_id, sum(1 for r in results if r.url), len(results)
+            )
+        try:
+            await group.on_complete(list(results))
+        except Exception as e:
+            logger.error("Ошибка при обработке альбома %s: %s", media_group_id, e)
+
+    async def _save_item(self, group: _PendingGroup, item: MediaGroupItem) -> SavedMediaItem:
+        if self.media_storage is None:
+            # Если хранилище не настроено, используем file_id
+            return SavedMediaItem(item, item.file_id)
+
+        async with self._semaphore:
+            try:
+                file = await group.bot.get_file(item.file_id)
+                file_path, file_url = await self.media_storage.save_from_url(
+                    file.file_path,
+                    item.file_type,
+                    group.user_id
+                )
+                return SavedMediaItem(item, file_url, file_path)
+            except Exception as e:
+                logger.error("Ошибка при сохранении файла альбома %s: %s", item.file_id, e)
+                return SavedMediaItem(item)
@@ -3,35 +3,80 @@
 """
 import os
 import uuid
+import asyncio
 import logging
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Any, AsyncIterator, BinaryIO, Callable, Dict, Iterable, Optional, Tuple
 from datetime import datetime
 
+import httpx
+
+from .content_store import ContentStore
+from .metrics import registry
+
 logger = logging.getLogger(__name__)
 
+IO_QUEUE_DEPTH = registry.gauge(
+    'media_io_queue_depth',
+    'Количество операций MediaStorage, ожидающих или выполняющихся в пуле ввода-вывода'
+)
+IO_LATENCY = registry.histogram(
+    'media_io_seconds',
+    'Время выполнения операций MediaStorage в пуле ввода-вывода, включая ожидание в очереди',
+    ['operation']
+)
+DOWNLOAD_BYTES = registry.counter(
+    'media_download_bytes',
+    'Объем медиафайлов, скачанных из Telegram, в байтах',
+    ['file_type']
+)
+DOWNLOAD_LATENCY = registry.histogram(
+    'media_download_seconds',
+    'Время скачивания и сохранения медиафайла',
+    ['file_type']
+)
+
 
 class MediaStorage:
     """Класс для работы с медиафайлами"""
     
-    def __init__(self, storage_path: Optional[str] = None, base_url: Optional[str] = None):
+    # Размер буфера при потоковой загрузке файлов
+    CHUNK_SIZE = 64 * 1024
+    
+    def __init__(
+        self,
+        storage_path: Optional[str] = None,
+        base_url: Optional[str] = None,
+        chunk_size: int = CHUNK_SIZE,
+        io_workers: int = 4
+    ):
         """
         Инициализация хранилища медиафайлов
         
         Args:
             storage_path: Путь к директории для хранения файлов
             base_url: Базовый URL для доступа к файлам (например, http://your-server.com/media)
+            chunk_size: Размер буфера при потоковой загрузке
+            io_workers: Количество потоков для операций с файловой системой
         """
         self.storage_path = Path(storage_path or os.getenv('MEDIA_STORAGE_PATH', './media'))
         self.base_url = base_url or os.getenv('BASE_URL', 'http://localhost:8000')
+        self.chunk_size = chunk_size
+        self._http_client: Optional[httpx.AsyncClient] = None
+        # Отдельный пул, чтобы медленный диск не занимал общий executor event loop
+        self._io_executor = ThreadPoolExecutor(
+            max_workers=io_workers,
+            thread_name_prefix='media-io'
+        )
+        # Содержимое файлов хранится один раз, пользовательские пути - ссылки на него
+        self.content_store = ContentStore(self.storage_path / 'cas')
         
-        # Создаем директории если их нет
-        self.storage_path.mkdir(parents=True, exist_ok=True)
-        (self.storage_path / 'photos').mkdir(exist_ok=True)
-        (self.storage_path / 'videos').mkdir(exist_ok=True)
-        (self.storage_path / 'models').mkdir(exist_ok=True)
-        
-        logger.info(f"MediaStorage инициализирован: {self.storage_path}")
+        # Директории создаются при записи первого файла (_new_file_path),
+        # а не при запуске
+        logger.info("MediaStorage инициализирован: %s", self.storage_path)
     
     def save_file(self, file_data: bytes, file_type: str, user_id: int) -> Tuple[str, str]:
         """
@@ -45,6 +90,146 @@ class MediaStorage:
         Returns:
             Tuple[путь_к_файлу, URL_для_доступа]
         """
+        file_path, relative_path = self._new_file_path(file_type, user_id)
+        
+        # Повторная загрузка того же содержимого не пишет данные второй раз
+        self.content_store.add_bytes(file_data, file_path, relative_path)
+        
+        file_url = self._build_url(relative_path)
+        logger.debug("Файл сохранен: %s -> %s", file_path, file_url)
+        
+        return str(file_path), file_url
+    
+    async def asave_file(self, file_data: bytes, file_type: str, user_id: int) -> Tuple[str, str]:
+        """
+        Асинхронная версия save_file: запись выполняется в пуле ввода-вывода
+        
+        Returns:
+            Tuple[путь_к_файлу, URL_для_доступа]
+        """
+        return await self._run_io('save_file', self.save_file, file_data, file_type, user_id)
+    
+    async def adelete_file(self, file_path: str) -> bool:
+        """Асинхронная версия delete_file"""
+        return await self._run_io('delete_file', self.delete_file, file_path)
+    
+    async def aget_file_url(self, file_path: str) -> str:
+        """Асинхронная версия get_file_url"""
+        return await self._run_io('get_file_url', self.get_file_url, file_path)
+    
+    async def save_stream(
+        self,
+        chunks: AsyncIterator[bytes],
+        file_type: str,
+        user_id: int
+    ) -> Tuple[str, str]:
+        """
+        Потоково сохраняет файл, не собирая его целиком в памяти
+        
+        Данные пишутся во временный файл с одновременным подсчетом хеша, после
+        чего файл синхронизируется на диск и атомарно переносится в
+        контентно-адресуемое хранилище (или удаляется, если такое содержимое
+        уже есть). Запись, fsync и переименование выполняются вне event loop.
+        
+        Args:
+            chunks: Асинхронный итератор с частями файла
+            file_type: Тип файла ('photo', 'video', 'model')
+            user_id: ID пользователя
+            
+        Returns:
+            Tuple[путь_к_файлу, URL_для_доступа]
+        """
+        file_path, relative_path = await self._run_io(
+            'new_file_path', self._new_file_path, file_type, user_id
+        )
+        tmp_file = await self._run_io('open_temp', self._open_temp_file, file_path.parent)
+        hasher = self.content_store.new_hasher()
+        
+        try:
+            async for chunk in chunks:
+                await self._run_io('write_chunk', self._write_chunk, tmp_file, hasher, chunk)
+            await self._run_io(
+                'commit', self._commit_temp_file,
+                tmp_file, hasher.hexdigest(), file_path, relative_path
+            )
+        except BaseException:
+            await self._run_io('discard_temp', self._discard_temp_file, tmp_file)
+            raise
+        
+        file_url = self._build_url(relative_path)
+        logger.debug("Файл сохранен: %s -> %s", file_path, file_url)
+        
+        return str(file_path), file_url
+    
+    async def save_from_url(self, url: str, file_type: str, user_id: int) -> Tuple[str, str]:
+        """
+        Скачивает файл по URL (например, File.file_path от Telegram) и
+        потоково сохраняет его. Пиковое потребление памяти ограничено
+        размером буфера ``chunk_size`` независимо от размера файла.
+        
+        Args:
+            url: URL файла
+            file_type: Тип файла ('photo', 'video', 'model')
+            user_id: ID пользователя
+            
+        Returns:
+            Tuple[путь_к_файлу, URL_для_доступа]
+        """
+        if self._http_client is None:
+            self._http_client = httpx.AsyncClient(timeout=httpx.Timeout(30.0, read=60.0))
+        
+        started = time.perf_counter()
+        async with self._http_client.stream('GET', url) as response:
+            response.raise_for_status()
+            try:
+                return await self.save_stream(
+                    response.aiter_bytes(self.chunk_size),
+                    file_type,
+                    user_id
+                )
+            finally:
+                DOWNLOAD_BYTES.labels(file_type).inc(response.num_bytes_downloaded)
+                DOWNLOAD_LATENCY.labels(file_type).observe(time.perf_counter() - started)
+    
+    async def close(self) -> None:
+        """Закрывает HTTP-клиент и дожидается завершения операций ввода-вывода"""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+        await asyncio.get_running_loop().run_in_executor(
+            None, self._io_executor.shutdown, True
+        )
+        self.content_store.close()
+    
+    async def run_io(self, operation: str, func: Callable[..., Any], *args: Any) -> Any:
+        """Выполняет операцию другого сервиса с файлами хранилища в пуле ввода-вывода"""
+        return await self._run_io(operation, func, *args)
+    
+    async def _run_io(self, operation: str, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Выполняет блокирующую операцию в пуле ввода-вывода
+        
+        Args:
+            operation: Название операции для метрик
+            func: Блокирующая функция
+            *args: Аргументы функции
+        """
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        IO_QUEUE_DEPTH.inc()
+        try:
+            return await loop.run_in_executor(self._io_executor, func, *args)
+        finally:
+            IO_QUEUE_DEPTH.dec()
+            IO_LATENCY.labels(operation).observe(time.perf_counter() - started)
+    
+    def _new_file_path(self, file_type: str, user_id: int) -> Tuple[Path, str]:
+        """
+        Генерирует уникальный путь для нового файла и создает директорию пользователя
+        
+        Returns:
+            Tuple[путь_к_файлу, относительный_путь]
+        """
         # Генерируем уникальное имя файла
         file_id = str(uuid.uuid4())
         timestamp = datetime.now().strftime('%Y%m%d')
@@ -67,20 +252,51 @@ class MediaStorage:
         user_dir = self.storage_path / subdir / str(user_id)
         user_dir.mkdir(parents=True, exist_ok=True)
         
-        # Сохраняем файл
         filename = f"{timestamp}_{file_id}{ext}"
-        file_path = user_dir / filename
-        
-        with open(file_path, 'wb') as f:
-            f.write(file_data)
-        
-        # Генерируем URL
         relative_path = f"{subdir}/{user_id}/{filename}"
-        file_url = f"{self.base_url}/media/{relative_path}"
-        
-        logger.info(f"Файл сохранен: {file_path} -> {file_url}")
         
-        return str(file_path), file_url
+        return user_dir / filename, relative_path
+    
+    def _build_url(self, relative_path: str) -> str:
+        """Генерирует URL по относительному пути файла"""
+        return f"{self.base_url}/media/{relative_path}"
+    
+    @staticmethod
+    def _open_temp_file(directory: Path) -> BinaryIO:
+        """Открывает временный файл в директории назначения"""
+        return tempfile.NamedTemporaryFile(
+            dir=directory, prefix='.upload_', suffix='.tmp', delete=False
+        )
+    
+    @staticmethod
+    def _write_chunk(tmp_file: BinaryIO, hasher, chunk: bytes) -> None:
+        """Пишет часть файла и обновляет хеш содержимого"""
+        hasher.update(chunk)
+        tmp_file.write(chunk)
+    
+    def _commit_temp_file(
+        self,
+        tmp_file: BinaryIO,
+        digest: str,
+        file_path: Path,
+        relative_path: str
+    ) -> None:
+        """Синхронизирует временный файл на диск и переносит его в хранилище содержимого"""
+        tmp_file.flush()
+        os.fsync(tmp_file.fileno())
+        tmp_file.close()
+        # NamedTemporaryFile создается с правами 0600, а файлы раздает nginx
+        os.chmod(tmp_file.name, 0o644)
+        self.content_store.add_file(tmp_file.name, digest, file_path, relative_path)
+    
+    @staticmethod
+    def _discard_temp_file(tmp_file: BinaryIO) -> None:
+        """Закрывает и удаляет временный файл после ошибки"""
+        tmp_file.close()
+        try:
+            os.unlink(tmp_file.name)
+        except FileNotFoundError:
+            pass
     
     def get_file_url(self, file_path: str) -> str:
         """
@@ -99,9 +315,60 @@ class MediaStorage:
             return f"{self.base_url}/media/{relative_path}"
         except ValueError:
             # Если путь не относительный, возвращаем как есть
-            logger.warning(f"Не удалось создать относительный путь для {file_path}")
+            logger.warning("Не удалось создать относительный путь для %s", file_path)
             return file_path
     
+    def relative_path(self, file_url: str) -> Optional[str]:
+        """
+        Путь файла относительно хранилища по его URL
+
+        Returns:
+            Относительный путь или None, если URL не из этого хранилища (например, file_id)
+        """
+        prefix = f"{self.base_url}/media/"
+        if not file_url or not file_url.startswith(prefix):
+            return None
+        return file_url[len(prefix):]
+
+    def delete_files(self, file_paths: Iterable[str]) -> int:
+        """
+        Удаляет несколько файлов; индекс содержимого сохраняется один раз
+
+        Args:
+            file_paths: Пути к файлам
+
+        Returns:
+            Освобожденный объем в байтах: содержимое, на которое остались
+            другие ссылки, не учитывается
+        """
+        sizes: Dict[str, Tuple[int, int]] = {}
+        for file_path in file_paths:
+            path = Path(file_path)
+            try:
+                stat = path.stat()
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logger.error("Ошибка при удалении файла %s: %s", file_path, e)
+                continue
+            try:
+                relative_path = path.relative_to(self.storage_path).as_posix()
+            except ValueError:
+                relative_path = file_path
+            sizes[relative_path] = (stat.st_size, stat.st_nlink)
+
+        freed = 0
+        released = self.content_store.release_many(sizes)
+        for relative_path, (size, links) in sizes.items():
+            reclaimed = released[relative_path]
+            # Файл вне хранилища содержимого (превью, миниатюры) освобождает
+            # место, если на него не было других жестких ссылок
+            if reclaimed or (reclaimed is None and links <= 1):
+                freed += size
+        logger.debug("Удалено файлов: %d, освобождено байт: %d", len(sizes), freed)
+        return freed
+
     def delete_file(self, file_path: str) -> bool:
         """
         Удаляет файл
@@ -114,12 +381,23 @@ class MediaStorage:
         """
         try:
             path = Path(file_path)
-            if path.exists():
-                path.unlink()
-                logger.info(f"Файл удален: {file_path}")
-                return True
-            return False
+            if not path.exists() and not path.is_symlink():
+                return False
+            path.unlink()
+            
+            # Содержимое удаляется только вместе с последней ссылкой на него
+            try:
+                relative_path = path.relative_to(self.storage_path).as_posix()
+            except ValueError:
+                relative_path = None
+            if relative_path is not None:
+                reclaimed = self.content_store.release(relative_path)
+                if reclaimed:
+                    logger.debug("Содержимое файла %s удалено (последняя ссылка)", file_path)
+            
+            logger.debug("Файл удален: %s", file_path)
+            return True
         except Exception as e:
-            logger.error(f"Ошибка при удалении файла {file_path}: {e}")
+            logger.error("Ошибка при удалении файла %s: %s", file_path, e)
             return False
 
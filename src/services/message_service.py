@@ -1,27 +1,95 @@
+import asyncio
+import logging
+
 from aiogram import Bot
-from aiogram.types import Message, ReplyKeyboardMarkup, ReplyKeyboardRemove
+from aiogram.enums import ParseMode
+from aiogram.types import (
+	Message, ReplyKeyboardMarkup, ReplyKeyboardRemove, InputMediaPhoto, InputMediaVideo
+)
+
+from config import config
+from models.dialog import DialogManager
+from services.delivery import DeliveryItem, DeliveryPlan
+from services.send_scheduler import SendScheduler
+from utils.templates import split_message
+
+logger = logging.getLogger(__name__)
+
+# Bot API дозволяє видалити до 100 повідомлень одним запитом deleteMessages
+DELETE_BATCH_SIZE = 100
 
 class MessageService:
 	"""
 	Сервіс для роботи з повідомленнями
+
+	Тексти та підписи надсилаються з parse_mode HTML: значення від
+	користувачів екрануються шаблонами з utils.templates.
+
+	Без переданого планувальника створюється планувальник, у якому чат
+	інженера (ENGINEER_TELEGRAM_ID) обслуговується першим.
 	"""
-	def __init__(self, bot: Bot):
+	def __init__(
+		self,
+		bot: Bot,
+		dialog_manager: DialogManager | None = None,
+		scheduler: SendScheduler | None = None
+	):
 		self.bot = bot
+		# Якщо задано, ID надісланих повідомлень запам'ятовуються в діалозі
+		self.dialog_manager = dialog_manager
+		# Усі запити до Telegram проходять через планувальник з лімітами швидкості
+		self.scheduler = scheduler or SendScheduler(
+			priority_chat_ids=[config.ENGINEER_TELEGRAM_ID] if config.ENGINEER_TELEGRAM_ID else ()
+		)
+		self._background_tasks: set[asyncio.Task] = set()
+
+	def _track(self, chat_id: int, *messages: Message) -> None:
+		"""Запам'ятовує ID надісланих повідомлень у діалозі користувача"""
+		if self.dialog_manager is None:
+			return
+		for sent in messages:
+			self.dialog_manager.track_message(chat_id, sent.message_id)
+
+	async def _call(self, chat_id: int, method, **kwargs):
+		"""Ставить виклик методу бота в чергу чату та чекає на результат"""
+		async def call():
+			sent = await method(chat_id=chat_id, **kwargs)
+			self._track(chat_id, *(sent if isinstance(sent, list) else [sent]))
+			return sent
+		return await self.scheduler.submit(chat_id, call)
 
 	async def send_message(
 		self,
 		chat_id: int,
 		text: str,
-		keyboard: ReplyKeyboardMarkup | ReplyKeyboardRemove | None = None
-	) -> Message:
+		keyboard: ReplyKeyboardMarkup | ReplyKeyboardRemove | None = None,
+		wait: bool = True
+	) -> Message | None:
 		"""
 		Надсилає повідомлення користувачу
+
+		З wait=False повідомлення лише ставиться в чергу: тоді кілька таких
+		повідомлень підряд можуть бути об'єднані з наступним в одне.
+		Довший за ліміт Telegram текст надсилається кількома повідомленнями,
+		клавіатура додається до останнього.
 		"""
-		return await self.bot.send_message(
-			chat_id=chat_id,
-			text=text,
-			reply_markup=keyboard
-		)
+		async def send(text, keyboard):
+			sent = await self.bot.send_message(
+				chat_id=chat_id,
+				text=text,
+				reply_markup=keyboard,
+				parse_mode=ParseMode.HTML
+			)
+			self._track(chat_id, sent)
+			return sent
+
+		*head, last = split_message(text)
+		for chunk in head:
+			self.scheduler.submit(chat_id, send, text=chunk)
+		future = self.scheduler.submit(chat_id, send, text=last, keyboard=keyboard)
+		if not wait:
+			return None
+		return await future
 
 	async def send_photo(
 		self,
@@ -32,10 +100,8 @@ class MessageService:
 		"""
 		Надсилає фото користувачу
 		"""
-		return await self.bot.send_photo(
-			chat_id=chat_id,
-			photo=photo,
-			caption=caption
+		return await self._call(
+			chat_id, self.bot.send_photo, photo=photo, caption=caption, parse_mode=ParseMode.HTML
 		)
 
 	async def send_video(
@@ -47,18 +113,109 @@ class MessageService:
 		"""
 		Надсилає відео користувачу
 		"""
-		return await self.bot.send_video(
-			chat_id=chat_id,
-			video=video,
-			caption=caption
+		return await self._call(
+			chat_id, self.bot.send_video, video=video, caption=caption, parse_mode=ParseMode.HTML
+		)
+
+	async def send_document(
+		self,
+		chat_id: int,
+		document: str,
+		caption: str = None
+	) -> Message:
+		"""
+		Надсилає документ користувачу
+		"""
+		return await self._call(
+			chat_id, self.bot.send_document, document=document, caption=caption, parse_mode=ParseMode.HTML
 		)
 
+	async def send_media_group(self, chat_id: int, items: list[DeliveryItem]) -> list[Message]:
+		"""
+		Надсилає альбом з фото та відео (один файл надсилається окремим повідомленням)
+		"""
+		if len(items) == 1:
+			item = items[0]
+			if item.kind == 'video':
+				return [await self.send_video(chat_id=chat_id, video=item.media, caption=item.caption)]
+			return [await self.send_photo(chat_id=chat_id, photo=item.media, caption=item.caption)]
+
+		media = [
+			(InputMediaVideo if item.kind == 'video' else InputMediaPhoto)(
+				media=item.media,
+				caption=item.caption,
+				parse_mode=ParseMode.HTML
+			)
+			for item in items
+		]
+		return await self._call(chat_id, self.bot.send_media_group, media=media)
+
+	async def send_plan(self, chat_id: int, plan: DeliveryPlan) -> None:
+		"""
+		Надсилає заявку за планом доставки: текст (якщо не вміщується в підпис) та альбоми
+		"""
+		if plan.text:
+			await self.send_message(chat_id=chat_id, text=plan.text)
+		for group in plan.groups:
+			await self.send_media_group(chat_id=chat_id, items=group)
+
+	def schedule_plan(self, chat_id: int, plan: DeliveryPlan) -> None:
+		"""
+		Надсилає заявку за планом доставки у фоні, не блокуючи обробник
+
+		Черга чату інженера обмежена 1 повідомленням на секунду, тож
+		користувач не чекає, доки надійдуть заявки інших користувачів.
+		"""
+		self._run_background(self._send_plan_safe(chat_id, plan))
+
+	async def _send_plan_safe(self, chat_id: int, plan: DeliveryPlan) -> None:
+		try:
+			await self.send_plan(chat_id, plan)
+		except Exception as e:
+			logger.error("Error sending request to engineer: %s", e)
+
 	async def delete_messages(self, chat_id: int, message_ids: list[int]) -> None:
 		"""
-		Видаляє повідомлення за їх ідентифікаторами
+		Видаляє повідомлення за їх ідентифікаторами пакетами через deleteMessages
+		"""
+		message_ids = sorted(set(message_ids))
+		for start in range(0, len(message_ids), DELETE_BATCH_SIZE):
+			batch = message_ids[start:start + DELETE_BATCH_SIZE]
+			await self.scheduler.submit(chat_id, lambda batch=batch: self._delete_batch(chat_id, batch))
+
+	async def _delete_batch(self, chat_id: int, message_ids: list[int]) -> None:
+		try:
+			await self.bot.delete_messages(chat_id=chat_id, message_ids=message_ids)
+		except Exception:
+			# Якщо пакетне видалення недоступне, видаляємо паралельно по одному
+			await asyncio.gather(
+				*(self.bot.delete_message(chat_id=chat_id, message_id=message_id) for message_id in message_ids),
+				return_exceptions=True
+			)
+
+	def schedule_delete_messages(self, chat_id: int, message_ids: list[int]) -> None:
+		"""
+		Запускає видалення повідомлень у фоні, не блокуючи обробник
+		"""
+		if not message_ids:
+			return
+		self._run_background(self._delete_messages_safe(chat_id, message_ids))
+
+	def _run_background(self, coroutine) -> None:
+		task = asyncio.create_task(coroutine)
+		self._background_tasks.add(task)
+		task.add_done_callback(self._background_tasks.discard)
+
+	async def _delete_messages_safe(self, chat_id: int, message_ids: list[int]) -> None:
+		try:
+			await self.delete_messages(chat_id, message_ids)
+		except Exception as e:
+			logger.error("Error clearing chat history: %s", e)
+
+	async def close(self, timeout: float = 30.0) -> None:
+		"""
+		Чекає на фонові надсилання (не довше timeout секунд) і зупиняє планувальник
 		"""
-		for message_id in message_ids:
-			try:
-				await self.bot.delete_message(chat_id=chat_id, message_id=message_id)
-			except Exception:
-				pass  # Ігноруємо помилки при видаленні повідомлень
\ No newline at end of file
+		if self._background_tasks:
+			await asyncio.wait(self._background_tasks, timeout=timeout)
+		await self.scheduler.close()
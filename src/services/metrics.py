@@ -0,0 +1,317 @@
+"""
+Минимальные метрики в формате Prometheus (без внешних зависимостей)
+"""
+import bisect
+import functools
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Границы корзин гистограмм по умолчанию, в секундах
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Базовый класс метрики с поддержкой меток"""
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], '_Metric'] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str, **kwargs: str):
+        """Возвращает дочернюю метрику для набора значений меток"""
+        if kwargs:
+            values = tuple(str(kwargs[name]) for name in self.labelnames)
+        else:
+            values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._new_child()
+                    self._children[values] = child
+        return child
+
+    def _new_child(self) -> '_Metric':
+        raise NotImplementedError
+
+    def _samples(self) -> Iterable[Tuple[Tuple[str, ...], '_Metric']]:
+        if self.labelnames:
+            return list(self._children.items())
+        return [((), self)]
+
+    @property
+    def exposed_name(self) -> str:
+        """Имя метрики в выводе /metrics"""
+        return self.name
+
+    def render(self) -> List[str]:
+        """Возвращает строки метрики в текстовом формате Prometheus"""
+        name = self.exposed_name
+        lines = [f'# HELP {name} {self.documentation}', f'# TYPE {name} {self.kind}']
+        for values, metric in self._samples():
+            lines.extend(metric._render_values(name, self.labelnames, values))
+        return lines
+
+    def _render_values(self, name: str, labelnames, values) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """
+    Монотонно растущий счетчик
+
+    Выводится с суффиксом ``_total`` (как в prometheus_client): под этим же
+    именем идут строки HELP и TYPE, иначе Prometheus считает счетчик
+    нетипизированной метрикой.
+    """
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def _new_child(self) -> 'Counter':
+        return Counter(self.name, self.documentation)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Значение читается из счетчика другого объекта при каждом чтении метрик"""
+        self._function = function
+
+    @property
+    def exposed_name(self) -> str:
+        return self.name if self.name.endswith('_total') else f'{self.name}_total'
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def _render_values(self, name, labelnames, values):
+        if self._function is not None:
+            self.value = self._function()
+        return [f'{name}{_format_labels(labelnames, values)} {_format_value(self.value)}']
+
+
+class Gauge(_Metric):
+    """Значение, которое может расти и уменьшаться"""
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def _new_child(self) -> 'Gauge':
+        return Gauge(self.name, self.documentation)
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """
+        Значение вычисляется функцией при каждом чтении метрик, а не
+        обновляется на каждую операцию (например, размер словаря состояний)
+        """
+        self._function = function
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def _render_values(self, name, labelnames, values):
+        if self._function is not None:
+            self.value = self._function()
+        return [f'{name}{_format_labels(labelnames, values)} {_format_value(self.value)}']
+
+
+class Histogram(_Metric):
+    """Гистограмма распределения значений (например, задержек)"""
+    kind = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def _new_child(self) -> 'Histogram':
+        return Histogram(self.name, self.documentation, buckets=self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def _render_values(self, name, labelnames, values):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            cumulative += count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f'{name}_bucket{_format_labels(labelnames, values, le)} {cumulative}')
+        labels = _format_labels(labelnames, values)
+        lines.append(f'{name}_sum{labels} {_format_value(self.sum)}')
+        lines.append(f'{name}_count{labels} {self.count}')
+        return lines
+
+
+class Registry:
+    """Реестр метрик процесса"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, documentation, labelnames, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Метрика {name} уже зарегистрирована с другим типом")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Optional[Sequence[float]] = None
+    ) -> Histogram:
+        return self._get_or_create(
+            Histogram, name, documentation, labelnames, buckets=buckets or DEFAULT_BUCKETS
+        )
+
+    def render(self) -> str:
+        """Возвращает все метрики в текстовом формате Prometheus"""
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+# Общий реестр метрик процесса
+registry = Registry()
+
+HANDLER_LATENCY = registry.histogram(
+    'bot_handler_seconds',
+    'Время выполнения обработчиков обновлений',
+    ('handler',)
+)
+HANDLER_ERRORS = registry.counter(
+    'bot_handler_errors',
+    'Исключения, выброшенные обработчиками обновлений',
+    ('handler',)
+)
+TELEGRAM_API_CALLS = registry.counter(
+    'telegram_api_calls',
+    'Запросы к Telegram Bot API по методам',
+    ('method', 'outcome')
+)
+TELEGRAM_API_LATENCY = registry.histogram(
+    'telegram_api_seconds',
+    'Время выполнения запросов к Telegram Bot API по методам',
+    ('method',)
+)
+STATE_MAP_ENTRIES = registry.gauge(
+    'bot_state_map_entries',
+    'Записи в словарях состояния пользователей (ExpiringMap)',
+    ('map',)
+)
+STATE_MAP_EVICTIONS = registry.counter(
+    'bot_state_map_evictions',
+    'Вытесненные записи словарей состояния по причине (expired, capacity)',
+    ('map', 'reason')
+)
+
+
+def track_state_map(name: str, mapping) -> None:
+    """
+    Показывает размер и счетчики вытеснений ExpiringMap в /metrics
+
+    Значения читаются из словаря при запросе метрик, а не обновляются на
+    каждую операцию. Повторная регистрация имени заменяет словарь.
+
+    Args:
+        name: Значение метки map
+        mapping: ExpiringMap
+    """
+    STATE_MAP_ENTRIES.labels(name).set_function(mapping.__len__)
+    for reason in mapping.evictions:
+        STATE_MAP_EVICTIONS.labels(name, reason).set_function(
+            lambda reason=reason: mapping.evictions[reason]
+        )
+
+
+def instrument_callback(
+    callback: Callable[..., Awaitable[Any]],
+    name: Optional[str] = None
+) -> Callable[..., Awaitable[Any]]:
+    """
+    Оборачивает асинхронный обработчик замером времени и счетчиком ошибок
+
+    Дочерние метрики с меткой обработчика создаются один раз при обертке,
+    поэтому на каждый вызов приходится только два чтения часов и
+    observe() гистограммы.
+
+    Args:
+        callback: Обработчик
+        name: Значение метки handler (по умолчанию - module.function)
+    """
+    if getattr(callback, '__instrumented__', False):
+        return callback
+    name = name or f"{callback.__module__.rsplit('.', 1)[-1]}.{callback.__name__}"
+    latency = HANDLER_LATENCY.labels(name)
+    errors = HANDLER_ERRORS.labels(name)
+
+    @functools.wraps(callback)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await callback(*args, **kwargs)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            latency.observe(time.perf_counter() - started)
+
+    wrapper.__instrumented__ = True
+    return wrapper
@@ -1,83 +1,164 @@
 """
 Сервис для напоминаний о брошенных заявках
 """
-import os
+import asyncio
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, Optional
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.interval import IntervalTrigger
+import time
+from typing import Dict, List, Optional, Tuple
 from telegram import Bot
-from telegram.ext import ContextTypes
 
 from ..models.application import Application
-from ..handlers.commands import active_applications
+from ..utils.templates import Template
+from .application_store import ApplicationStore
+from .metrics import registry
+from .reminder_store import ReminderStore, MemoryReminderStore
+from .send_scheduler import SendScheduler
 
 logger = logging.getLogger(__name__)
 
+# Напоминания: (задержка в минутах, текст времени)
+REMINDERS = (
+    (30, "30 хвилин"),   # Через 30 минут
+    (90, "1.5 години"),  # Через 1.5 часа
+    (1440, "1 день")     # Через день
+)
+
+REMINDERS_SENT = registry.counter(
+    'bot_reminders',
+    'Напоминания о незавершенных заявках по результату отправки',
+    ('outcome',)
+)
+
+REMINDER_TEMPLATE = Template(
+    "👋 <b>Нагадування про незавершену заявку</b>\n\n"
+    "Ви почали оформлення заявки {time_text} тому, але не завершили її.\n\n"
+    "{stage}\n\n"
+    "Продовжити оформлення заявки? Натисніть /new_application"
+)
+
 
 class ReminderService:
-    """Сервис для управления напоминаниями о незавершенных заявках"""
+    """
+    Сервис для управления напоминаниями о незавершенных заявках.
+
+    Напоминания хранятся в ``ReminderStore``; один цикл таймера спит до
+    ближайшего срока и извлекает сработавшие напоминания пакетами. После
+    перезапуска напоминания, срок которых прошел во время простоя,
+    отправляются сразу (по одному на пользователя - самое позднее).
+    Напоминания отправляются через ``SendScheduler``, поэтому пакет
+    сработавших напоминаний не превышает лимиты Telegram.
+    """
     
-    def __init__(self, bot: Bot):
+    def __init__(
+        self,
+        bot: Bot,
+        application_store: ApplicationStore,
+        reminder_store: Optional[ReminderStore] = None,
+        batch_size: int = 100,
+        poll_interval: float = 60.0,
+        scheduler: Optional[SendScheduler] = None
+    ):
         """
         Инициализация сервиса напоминаний
         
         Args:
             bot: Экземпляр бота Telegram
+            application_store: Хранилище активных заявок
+            reminder_store: Хранилище напоминаний (по умолчанию в памяти)
+            batch_size: Сколько напоминаний извлекать за один раз
+            poll_interval: Максимальная пауза цикла (для напоминаний,
+                добавленных другими экземплярами бота)
+            scheduler: Планировщик исходящих запросов к Telegram
         """
         self.bot = bot
-        self.scheduler = AsyncIOScheduler()
-        self.pending_reminders: Dict[int, Dict] = {}  # user_id -> {application, reminders}
-        
-    def start(self):
-        """Запускает планировщик напоминаний"""
-        self.scheduler.start()
+        self.application_store = application_store
+        self.reminder_store = reminder_store or MemoryReminderStore()
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.scheduler = scheduler or SendScheduler()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        
+    async def start(self) -> None:
+        """Запускает цикл таймера напоминаний"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
         logger.info("ReminderService запущен")
     
-    def stop(self):
-        """Останавливает планировщик"""
-        self.scheduler.shutdown()
+    async def stop(self) -> None:
+        """Останавливает цикл таймера и закрывает хранилище"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.reminder_store.close()
         logger.info("ReminderService остановлен")
     
-    def schedule_reminders(self, user_id: int, application: Application) -> None:
+    async def schedule_reminders(self, user_id: int, application: Application) -> None:
         """
-        Планирует напоминания для незавершенной заявки
+        Планирует напоминания для незавершенной заявки (заменяя прежние)
         
         Args:
             user_id: ID пользователя
             application: Объект заявки
         """
-        # Удаляем старые напоминания если есть
-        self.cancel_reminders(user_id)
-        
-        # Сохраняем информацию о заявке
-        self.pending_reminders[user_id] = {
-            'application': application,
-            'created_at': datetime.now(),
-            'reminder_count': 0
-        }
-        
-        # Планируем напоминания
-        reminders = [
-            (30, "30 хвилин"),   # Через 30 минут
-            (90, "1.5 години"),  # Через 1.5 часа
-            (1440, "1 день")      # Через день
-        ]
-        
-        for minutes, text in reminders:
-            trigger_time = datetime.now() + timedelta(minutes=minutes)
-            
-            self.scheduler.add_job(
-                self._send_reminder,
-                'date',
-                run_date=trigger_time,
-                args=[user_id, text],
-                id=f"reminder_{user_id}_{minutes}",
-                replace_existing=True
-            )
-        
-        logger.info(f"Напоминания запланированы для user_id={user_id}")
+        now = time.time()
+        await self.reminder_store.schedule(user_id, [
+            (str(minutes), text, now + minutes * 60)
+            for minutes, text in REMINDERS
+        ])
+        # Будим цикл: новое напоминание может быть раньше текущего ожидания
+        self._wakeup.set()
+        
+        logger.debug("Напоминания запланированы для user_id=%s", user_id)
+
+    async def _run(self) -> None:
+        """Цикл таймера: спит до ближайшего срока и отправляет сработавшие напоминания"""
+        while True:
+            try:
+                await self._process_due()
+                next_due = await self.reminder_store.next_due()
+            except Exception as e:
+                logger.error("Ошибка обработки напоминаний: %s", e)
+                next_due = None
+
+            timeout = self.poll_interval
+            if next_due is not None:
+                timeout = min(timeout, max(0.0, next_due - time.time()))
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _process_due(self) -> None:
+        """Извлекает и отправляет все сработавшие напоминания пакетами"""
+        while True:
+            due = await self.reminder_store.pop_due(time.time(), self.batch_size)
+            if not due:
+                return
+
+            # Если за время простоя сработало несколько напоминаний пользователя,
+            # отправляем только самое позднее
+            latest: Dict[int, tuple] = {}
+            slots: Dict[int, List[Tuple[str, float]]] = {}
+            for user_id, slot, time_text, due_at in due:
+                slots.setdefault(user_id, []).append((slot, due_at))
+                if user_id not in latest or int(slot) > int(latest[user_id][0]):
+                    latest[user_id] = (slot, time_text)
+
+            await asyncio.gather(*(
+                self._send_reminder(user_id, time_text)
+                for user_id, (_, time_text) in latest.items()
+            ))
+            await asyncio.gather(*(
+                self.reminder_store.complete(user_id, user_slots)
+                for user_id, user_slots in slots.items()
+            ))
+
+            if len(due) < self.batch_size:
+                return
     
     async def _send_reminder(self, user_id: int, time_text: str) -> None:
         """
@@ -88,50 +169,35 @@ class ReminderService:
             time_text: Текст времени (например, "30 хвилин")
         """
         # Проверяем, существует ли еще незавершенная заявка
-        if user_id not in self.pending_reminders:
-            logger.info(f"Заявка для user_id={user_id} уже завершена, напоминание отменено")
+        application = await self.application_store.get(user_id)
+        if application is None:
+            logger.info("Активная заявка для user_id=%s не найдена, напоминание отменено", user_id)
+            REMINDERS_SENT.labels('skipped').inc()
+            await self.reminder_store.cancel(user_id)
             return
         
-        if user_id not in active_applications:
-            logger.info(f"Активная заявка для user_id={user_id} не найдена, напоминание отменено")
-            self.pending_reminders.pop(user_id, None)
-            return
-        
-        application = active_applications[user_id]
-        
         # Определяем, на каком этапе остановился пользователь
         stage_message = self._get_stage_message(application)
         
-        reminder_text = (
-            f"👋 <b>Нагадування про незавершену заявку</b>\n\n"
-            f"Ви почали оформлення заявки {time_text} тому, але не завершили її.\n\n"
-            f"{stage_message}\n\n"
-            f"Продовжити оформлення заявки? Натисніть /new_application"
-        )
+        reminder_text = REMINDER_TEMPLATE.render(time_text=time_text, stage=stage_message)
         
         try:
-            await self.bot.send_message(
+            await self.scheduler.submit(user_id, lambda: self.bot.send_message(
                 chat_id=user_id,
                 text=reminder_text,
                 parse_mode='HTML'
-            )
-            
-            # Увеличиваем счетчик напоминаний
-            if user_id in self.pending_reminders:
-                self.pending_reminders[user_id]['reminder_count'] += 1
-                
-                # После третьего напоминания удаляем из списка
-                if self.pending_reminders[user_id]['reminder_count'] >= 3:
-                    logger.info(f"Достигнуто максимальное количество напоминаний для user_id={user_id}")
-                    self.pending_reminders.pop(user_id, None)
-            
-            logger.info(f"Напоминание отправлено user_id={user_id}")
+            ))
+            logger.info("Напоминание отправлено user_id=%s", user_id)
+            REMINDERS_SENT.labels('sent').inc()
             
         except Exception as e:
-            logger.error(f"Ошибка при отправке напоминания user_id={user_id}: {e}")
-            # Если пользователь заблокировал бота, удаляем из списка
+            logger.error("Ошибка при отправке напоминания user_id=%s: %s", user_id, e)
+            # Если пользователь заблокировал бота, отменяем остальные напоминания
             if "chat not found" in str(e).lower() or "blocked" in str(e).lower():
-                self.pending_reminders.pop(user_id, None)
+                REMINDERS_SENT.labels('blocked').inc()
+                await self.reminder_store.cancel(user_id)
+            else:
+                REMINDERS_SENT.labels('failed').inc()
     
     def _get_stage_message(self, application: Application) -> str:
         """
@@ -156,37 +222,12 @@ class ReminderService:
         else:
             return "Ви майже завершили заявку. Залишилось тільки підтвердити відправку."
     
-    def cancel_reminders(self, user_id: int) -> None:
+    async def cancel_reminders(self, user_id: int) -> None:
         """
         Отменяет все напоминания для пользователя
         
         Args:
             user_id: ID пользователя
         """
-        # Удаляем задачи из планировщика
-        for minutes in [30, 90, 1440]:
-            job_id = f"reminder_{user_id}_{minutes}"
-            try:
-                self.scheduler.remove_job(job_id)
-            except Exception:
-                pass  # Задача может не существовать
-        
-        # Удаляем из списка ожидающих
-        self.pending_reminders.pop(user_id, None)
-        logger.info(f"Напоминания отменены для user_id={user_id}")
-    
-    def check_and_cleanup(self) -> None:
-        """Проверяет и очищает устаревшие напоминания"""
-        now = datetime.now()
-        to_remove = []
-        
-        for user_id, reminder_data in self.pending_reminders.items():
-            created_at = reminder_data['created_at']
-            # Удаляем напоминания старше 2 дней
-            if (now - created_at).days > 2:
-                to_remove.append(user_id)
-        
-        for user_id in to_remove:
-            self.cancel_reminders(user_id)
-            logger.info(f"Удалено устаревшее напоминание для user_id={user_id}")
-
+        await self.reminder_store.cancel(user_id)
+        logger.debug("Напоминания отменены для user_id=%s", user_id)
@@ -0,0 +1,242 @@
+"""
+Хранилище запланированных напоминаний о незавершенных заявках
+"""
+import os
+import heapq
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ..utils.expiring_map import ExpiringMap
+from .metrics import track_state_map
+
+logger = logging.getLogger(__name__)
+
+# Напоминание: (user_id, slot, текст времени, момент срабатывания),
+# где slot - задержка в минутах
+DueReminder = Tuple[int, str, str, float]
+
+# Удаляет слоты, только если они не были перепланированы после извлечения:
+# значение поля - "<момент срабатывания>|<текст>"
+_COMPLETE_SCRIPT = """
+local removed = 0
+for i = 1, #ARGV, 2 do
+    local value = redis.call('HGET', KEYS[1], ARGV[i])
+    local prefix = ARGV[i + 1] .. '|'
+    if value and string.sub(value, 1, #prefix) == prefix then
+        redis.call('HDEL', KEYS[1], ARGV[i])
+        removed = removed + 1
+    end
+end
+return removed
+"""
+
+
+class ReminderStore:
+    """
+    Базовый интерфейс хранилища напоминаний.
+
+    Напоминания пользователя - это набор слотов (задержка в минутах -> текст
+    времени) с моментами срабатывания в виде unix-времени. Отмена удаляет
+    слоты пользователя целиком; сработавшие слоты извлекаются пакетами и
+    после отправки отмечаются выполненными по моменту срабатывания, чтобы
+    не удалить слот с тем же именем, запланированный заново для новой заявки.
+    """
+
+    async def schedule(self, user_id: int, reminders: Sequence[Tuple[str, str, float]]) -> None:
+        """
+        Заменяет напоминания пользователя
+
+        Args:
+            user_id: ID пользователя
+            reminders: Список (slot, текст времени, момент срабатывания)
+        """
+        raise NotImplementedError
+
+    async def cancel(self, user_id: int) -> None:
+        """Отменяет все напоминания пользователя"""
+        raise NotImplementedError
+
+    async def pop_due(self, now: float, limit: int) -> List[DueReminder]:
+        """Извлекает до ``limit`` напоминаний, срок которых наступил"""
+        raise NotImplementedError
+
+    async def complete(self, user_id: int, slots: Sequence[Tuple[str, float]]) -> None:
+        """
+        Отмечает слоты пользователя как выполненные
+
+        Args:
+            user_id: ID пользователя
+            slots: Список (slot, момент срабатывания из pop_due); слот,
+                перепланированный после извлечения, не удаляется
+        """
+        raise NotImplementedError
+
+    async def next_due(self) -> Optional[float]:
+        """Ближайший момент срабатывания или None, если напоминаний нет"""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Освобождает ресурсы"""
+
+
+class MemoryReminderStore(ReminderStore):
+    """
+    Напоминания в памяти процесса (теряются при перезапуске).
+
+    Куча хранит моменты срабатывания, словарь - актуальные слоты. Отмена
+    удаляет запись словаря, устаревшие элементы кучи пропускаются при извлечении.
+    """
+
+    def __init__(self, ttl: float = 2 * 24 * 3600):
+        """
+        Args:
+            ttl: Время жизни напоминаний пользователя в секундах
+        """
+        self._heap: List[Tuple[float, int, str]] = []
+        self._slots: ExpiringMap[int, Dict[str, Tuple[float, str]]] = ExpiringMap(ttl=ttl)
+        track_state_map('reminders', self._slots)
+
+    async def schedule(self, user_id: int, reminders: Sequence[Tuple[str, str, float]]) -> None:
+        self._slots[user_id] = {slot: (due, text) for slot, text, due in reminders}
+        for slot, _, due in reminders:
+            heapq.heappush(self._heap, (due, user_id, slot))
+
+    async def cancel(self, user_id: int) -> None:
+        self._slots.pop(user_id, None)
+
+    def _is_live(self, due: float, user_id: int, slot: str) -> bool:
+        entry = self._slots.get(user_id, {}).get(slot)
+        return entry is not None and entry[0] == due
+
+    async def pop_due(self, now: float, limit: int) -> List[DueReminder]:
+        result = []
+        while self._heap and self._heap[0][0] <= now and len(result) < limit:
+            due, user_id, slot = heapq.heappop(self._heap)
+            if self._is_live(due, user_id, slot):
+                result.append((user_id, slot, self._slots[user_id][slot][1], due))
+        return result
+
+    async def complete(self, user_id: int, slots: Sequence[Tuple[str, float]]) -> None:
+        user_slots = self._slots.get(user_id)
+        if user_slots is None:
+            return
+        for slot, due in slots:
+            if self._is_live(due, user_id, slot):
+                del user_slots[slot]
+        if not user_slots:
+            del self._slots[user_id]
+
+    async def next_due(self) -> Optional[float]:
+        while self._heap and not self._is_live(*self._heap[0]):
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+
+class RedisReminderStore(ReminderStore):
+    """
+    Напоминания в Redis, переживают перезапуск бота.
+
+    - ``<prefix>due`` - sorted set элементов ``<user_id>:<slot>`` с моментом
+      срабатывания в качестве score;
+    - ``<prefix>user:<user_id>`` - hash slot -> ``<момент срабатывания>|<текст
+      времени>`` с TTL.
+
+    Отмена - удаление одного ключа пользователя: элементы sorted set без
+    соответствующего слота в hash просто отбрасываются при извлечении.
+    Выполненные слоты удаляются скриптом Lua, только если момент
+    срабатывания в hash не изменился.
+    """
+
+    def __init__(self, redis, key_prefix: str = 'bambu:reminders:', ttl: int = 2 * 24 * 3600):
+        """
+        Args:
+            redis: Асинхронный клиент redis.asyncio.Redis
+            key_prefix: Префикс ключей
+            ttl: Время жизни напоминаний пользователя в секундах
+        """
+        self.redis = redis
+        self.key_prefix = key_prefix
+        self.ttl = ttl
+        self._due_key = f"{key_prefix}due"
+        self._complete = redis.register_script(_COMPLETE_SCRIPT)
+
+    def _user_key(self, user_id: int) -> str:
+        return f"{self.key_prefix}user:{user_id}"
+
+    async def schedule(self, user_id: int, reminders: Sequence[Tuple[str, str, float]]) -> None:
+        key = self._user_key(user_id)
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.delete(key)
+        if reminders:
+            pipe.hset(key, mapping={slot: f"{due!r}|{text}" for slot, text, due in reminders})
+            pipe.expire(key, self.ttl)
+            pipe.zadd(self._due_key, {f"{user_id}:{slot}": due for slot, _, due in reminders})
+        await pipe.execute()
+
+    async def cancel(self, user_id: int) -> None:
+        await self.redis.delete(self._user_key(user_id))
+
+    async def pop_due(self, now: float, limit: int) -> List[DueReminder]:
+        members = await self.redis.zrangebyscore(self._due_key, '-inf', now, start=0, num=limit)
+        if not members:
+            return []
+
+        # Элемент обрабатывает тот, чей ZREM его удалил: так несколько
+        # экземпляров бота не отправят одно напоминание дважды
+        pipe = self.redis.pipeline(transaction=False)
+        for member in members:
+            pipe.zrem(self._due_key, member)
+        removed = await pipe.execute()
+        members = [member for member, ok in zip(members, removed) if ok]
+
+        entries = []
+        pipe = self.redis.pipeline(transaction=False)
+        for member in members:
+            user_id, slot = member.decode().split(':', 1)
+            entries.append((int(user_id), slot))
+            pipe.hget(self._user_key(int(user_id)), slot)
+        values = await pipe.execute()
+
+        # Без слота в hash напоминание отменено или устарело
+        result = []
+        for (user_id, slot), value in zip(entries, values):
+            if value is None:
+                continue
+            due, _, text = value.decode().partition('|')
+            result.append((user_id, slot, text, float(due)))
+        return result
+
+    async def complete(self, user_id: int, slots: Sequence[Tuple[str, float]]) -> None:
+        if slots:
+            # Удаление последнего поля удаляет и сам ключ
+            args = [value for slot, due in slots for value in (slot, repr(due))]
+            await self._complete(keys=[self._user_key(user_id)], args=args)
+
+    async def next_due(self) -> Optional[float]:
+        head = await self.redis.zrange(self._due_key, 0, 0, withscores=True)
+        return head[0][1] if head else None
+
+    async def close(self) -> None:
+        await self.redis.aclose()
+
+
+def create_reminder_store() -> ReminderStore:
+    """
+    Создает хранилище напоминаний по переменным окружения.
+
+    Если задан REDIS_HOST, используется Redis, иначе хранилище в памяти.
+    """
+    redis_host = os.getenv('REDIS_HOST')
+    if not redis_host:
+        logger.info("REDIS_HOST не задан, напоминания хранятся в памяти")
+        return MemoryReminderStore()
+
+    from redis.asyncio import Redis
+
+    redis = Redis(
+        host=redis_host,
+        port=int(os.getenv('REDIS_PORT', '6379')),
+        db=int(os.getenv('REDIS_DB', '0'))
+    )
+    logger.info("Напоминания хранятся в Redis: %s", redis_host)
+    return RedisReminderStore(redis)
@@ -0,0 +1,450 @@
+"""
+Очистка медиахранилища: осиротевшие файлы и квоты по возрасту и объему
+
+Файлы пользователя лежат в ``<раздел>/<user_id>/<дата>_<uuid>.<расширение>``.
+Оригинал и его копии (превью, миниатюра, обложка) имеют одно имя без
+расширения и удаляются вместе. Файлы пользователя:
+
+- активной заявки не удаляются никогда;
+- отправленной заявки (записаны mark_submitted) хранятся ``max_age`` и
+  удаляются раньше только при превышении квоты пользователя или общей;
+- остальные (отмененные и брошенные заявки) - осиротевшие: удаляются,
+  если старше ``orphan_grace``.
+
+Файлы, созданные до первого запуска очистки, считаются отправленными,
+чтобы не удалить файлы заявок, отправленных до ее появления.
+
+Обход инкрементальный: за один проход очистки обрабатывается не больше
+``batch_users`` пользователей и ``batch_entries`` файлов, позиция (ID
+последнего пользователя) сохраняется на диске между проходами и
+перезапусками. Общая квота применяется по итогам полного обхода: из
+распределения объема по дням вычисляется дата, файлы старше которой
+удаляются при следующем обходе.
+"""
+import os
+import json
+import asyncio
+import logging
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from .metrics import registry
+
+if TYPE_CHECKING:
+    from ..models.application import Application
+    from .application_store import ApplicationStore
+    from .media_storage import MediaStorage
+
+logger = logging.getLogger(__name__)
+
+RECLAIMED_BYTES = registry.counter(
+    'media_retention_reclaimed_bytes',
+    'Освобожденный очисткой объем в байтах по причине (orphan, age, user_quota, global_quota, temp)',
+    ['reason']
+)
+RECLAIMED_FILES = registry.counter(
+    'media_retention_files',
+    'Удаленные очисткой файлы по причине',
+    ['reason']
+)
+SWEEP_LATENCY = registry.histogram(
+    'media_retention_sweep_seconds',
+    'Время одного прохода очистки'
+)
+STORAGE_BYTES = registry.gauge(
+    'media_storage_bytes',
+    'Объем файлов пользователей по итогам последнего полного обхода'
+)
+
+# Разделы с файлами пользователей; копии оригиналов - в последних трех
+USER_SECTIONS = ('photos', 'videos', 'models', 'previews', 'thumbnails', 'posters')
+
+DAY = 24 * 3600
+
+
+class _Group:
+    """Оригинал и его копии: файлы пользователя с одним именем без расширения"""
+    __slots__ = ('paths', 'size', 'created', 'touched')
+
+    def __init__(self, created: float):
+        self.paths: List[str] = []
+        self.size = 0
+        self.created = created  # Дата загрузки из имени файла
+        self.touched = created  # Последнее создание ссылки на файл (для orphan_grace)
+
+
+def _created_at(name: str, stat: os.stat_result, cache: Dict[str, float]) -> float:
+    """
+    Время загрузки файла по дате в имени (``20240131_...``)
+
+    mtime и ctime жесткой ссылки общие для всех ссылок на одно содержимое,
+    поэтому для возраста используется дата из имени, а не время файла.
+    """
+    prefix = name[:8]
+    created = cache.get(prefix)
+    if created is None:
+        try:
+            created = datetime.strptime(prefix, '%Y%m%d').timestamp()
+        except ValueError:
+            return stat.st_mtime
+        cache[prefix] = created
+    return created
+
+
+class RetentionSweeper:
+    """Инкрементальная очистка медиахранилища по расписанию"""
+
+    STATE_DIR = '.retention'
+
+    def __init__(
+        self,
+        media_storage: 'MediaStorage',
+        application_store: 'ApplicationStore',
+        max_age: Optional[float] = 180 * DAY,
+        orphan_grace: float = 6 * 3600,
+        user_quota_bytes: Optional[int] = None,
+        global_quota_bytes: Optional[int] = None,
+        interval: float = 300.0,
+        batch_users: int = 200,
+        batch_entries: int = 5000
+    ):
+        """
+        Args:
+            media_storage: Хранилище медиафайлов
+            application_store: Хранилище активных заявок
+            max_age: Срок хранения файлов отправленных заявок в секундах (None - бессрочно)
+            orphan_grace: Через сколько секунд удаляются осиротевшие файлы
+            user_quota_bytes: Максимальный объем файлов одного пользователя (None - без ограничения)
+            global_quota_bytes: Максимальный объем всех файлов (None - без ограничения)
+            interval: Пауза между проходами очистки в секундах
+            batch_users: Максимум пользователей за один проход
+            batch_entries: Максимум файлов за один проход
+        """
+        self.media_storage = media_storage
+        self.application_store = application_store
+        self.max_age = max_age
+        self.orphan_grace = orphan_grace
+        self.user_quota_bytes = user_quota_bytes
+        self.global_quota_bytes = global_quota_bytes
+        self.interval = interval
+        self.batch_users = batch_users
+        self.batch_entries = batch_entries
+
+        self.state_dir = media_storage.storage_path / self.STATE_DIR
+        self._state: Optional[Dict[str, Any]] = None
+        # Пользователи текущего обхода, еще не обработанные
+        self._pending: Deque[int] = deque()
+        self._manifest_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Запускает очистку по расписанию"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        logger.info("RetentionSweeper запущен")
+
+    async def stop(self) -> None:
+        """Останавливает очистку (текущий проход прерывается, позиция уже сохранена)"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            logger.info("RetentionSweeper остановлен")
+
+    async def mark_submitted(self, application: 'Application') -> None:
+        """
+        Отмечает файлы заявки как отправленные инженеру: они больше не осиротевшие
+
+        Args:
+            application: Отправляемая заявка
+        """
+        relative_paths = [
+            relative
+            for url in (*application.photos, application.model_file)
+            if url and (relative := self.media_storage.relative_path(url)) is not None
+        ]
+        if relative_paths:
+            await self.media_storage.run_io(
+                'retention_manifest', self._add_to_manifest, application.user_id, relative_paths
+            )
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error("Ошибка очистки медиахранилища: %s", e)
+
+    async def sweep(self) -> Dict[str, int]:
+        """
+        Один проход очистки
+
+        Returns:
+            Освобожденный объем в байтах по причинам
+        """
+        started = time.perf_counter()
+        run_io = self.media_storage.run_io
+        reclaimed: Dict[str, int] = defaultdict(int)
+        try:
+            state = await run_io('retention_state', self._load_state)
+            if not self._pending:
+                users = await run_io('retention_list', self._list_users)
+                cursor = state['cursor']
+                self._pending.extend(user_id for user_id in users if cursor is None or user_id > cursor)
+                if not self._pending:
+                    # Обход завершен: пересчитываем общую квоту и начинаем заново
+                    self._finish_pass(state)
+                    self._pending.extend(users)
+
+            users_done = 0
+            entries = 0
+            while self._pending and users_done < self.batch_users and entries < self.batch_entries:
+                user_id = self._pending.popleft()
+                groups, temp_files = await run_io('retention_scan', self._scan_user, user_id)
+                entries += len(temp_files) + sum(len(group.paths) for group in groups.values())
+                application = await self.application_store.get(user_id)
+                freed = await run_io(
+                    'retention_sweep_user', self._sweep_user,
+                    user_id, groups, temp_files, self._active_names(application), state
+                )
+                for reason, size in freed.items():
+                    reclaimed[reason] += size
+                state['cursor'] = user_id
+                users_done += 1
+
+            await run_io('retention_state', self._save_state, state)
+        finally:
+            SWEEP_LATENCY.observe(time.perf_counter() - started)
+
+        if reclaimed:
+            logger.info("Очистка медиахранилища: освобождено %s", dict(reclaimed))
+        return dict(reclaimed)
+
+    def _active_names(self, application: Optional['Application']) -> Set[str]:
+        """Имена (без расширения) файлов активной заявки"""
+        if application is None:
+            return set()
+        urls = [*application.photos, application.model_file]
+        for preview in application.media_previews.values():
+            urls.extend(preview[:2])
+        names = set()
+        for url in urls:
+            relative = url and self.media_storage.relative_path(url)
+            if relative:
+                names.add(Path(relative).stem)
+        return names
+
+    def _finish_pass(self, state: Dict[str, Any]) -> None:
+        """Итоги полного обхода: общий объем и дата отсечения для общей квоты"""
+        days = {int(day): size for day, size in state['days'].items()}
+        total = sum(days.values())
+        STORAGE_BYTES.set(total)
+
+        cutoff = None
+        if self.global_quota_bytes is not None and total > self.global_quota_bytes:
+            # Оставляем самые новые дни, пока они помещаются в квоту
+            kept = 0
+            for day in sorted(days, reverse=True):
+                kept += days[day]
+                if kept > self.global_quota_bytes:
+                    cutoff = (day + 1) * DAY
+                    break
+            logger.warning(
+                "Объем медиахранилища %d байт превышает квоту %d: удаляются файлы до %s",
+                total, self.global_quota_bytes, datetime.fromtimestamp(cutoff)
+            )
+        state.update(cursor=None, days={}, global_cutoff=cutoff)
+
+    # --- Блокирующие операции (выполняются в пуле ввода-вывода MediaStorage) ---
+
+    def _list_users(self) -> List[int]:
+        """ID пользователей, у которых есть файлы, по возрастанию"""
+        users = set()
+        for section in USER_SECTIONS:
+            try:
+                with os.scandir(self.media_storage.storage_path / section) as entries:
+                    for entry in entries:
+                        if entry.name.isdigit() and entry.is_dir(follow_symlinks=False):
+                            users.add(int(entry.name))
+            except FileNotFoundError:
+                continue
+        return sorted(users)
+
+    def _scan_user(self, user_id: int) -> Tuple[Dict[str, _Group], List[Tuple[str, float]]]:
+        """
+        Файлы пользователя, сгруппированные по имени без расширения
+
+        Returns:
+            Tuple[группы_по_имени, незавершенные_временные_файлы_с_временем]
+        """
+        groups: Dict[str, _Group] = {}
+        temp_files: List[Tuple[str, float]] = []
+        dates: Dict[str, float] = {}
+        for section in USER_SECTIONS:
+            try:
+                iterator = os.scandir(self.media_storage.storage_path / section / str(user_id))
+            except FileNotFoundError:
+                continue
+            with iterator as entries:
+                for entry in entries:
+                    try:
+                        link = entry.stat(follow_symlinks=False)
+                        if entry.name.startswith('.'):
+                            # Временные файлы прерванных загрузок и обработки
+                            if entry.name.endswith('.tmp'):
+                                temp_files.append((entry.path, link.st_mtime))
+                            continue
+                        if not entry.is_file():
+                            continue
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+
+                    name = entry.name.rsplit('.', 1)[0]
+                    group = groups.get(name)
+                    if group is None:
+                        group = groups[name] = _Group(_created_at(entry.name, stat, dates))
+                    group.paths.append(entry.path)
+                    group.size += stat.st_size
+                    # ctime ссылки меняется при ее создании: свежая загрузка
+                    # уже существующего содержимого не считается старой
+                    group.touched = max(group.touched, link.st_ctime)
+        return groups, temp_files
+
+    def _sweep_user(
+        self,
+        user_id: int,
+        groups: Dict[str, _Group],
+        temp_files: List[Tuple[str, float]],
+        active: Set[str],
+        state: Dict[str, Any]
+    ) -> Dict[str, int]:
+        """Удаляет файлы пользователя по правилам хранения и учитывает оставшиеся"""
+        now = time.time()
+        submitted = self._load_manifest(user_id)
+        submitted_names = {Path(relative).stem for relative in submitted}
+        installed_at = state['installed_at']
+        global_cutoff = state.get('global_cutoff')
+
+        victims: Dict[str, List[str]] = defaultdict(list)
+        victim_names: Set[str] = set()
+        for path, modified in temp_files:
+            if now - modified > self.orphan_grace:
+                victims['temp'].append(path)
+
+        kept: List[Tuple[str, _Group]] = []
+        for name, group in groups.items():
+            if name in active:
+                kept.append((name, group))
+                continue
+            reason = None
+            if name not in submitted_names and group.created >= installed_at:
+                if now - group.touched > self.orphan_grace:
+                    reason = 'orphan'
+            elif self.max_age is not None and now - group.created > self.max_age:
+                reason = 'age'
+            elif global_cutoff is not None and group.created < global_cutoff:
+                reason = 'global_quota'
+            if reason is None:
+                kept.append((name, group))
+            else:
+                victims[reason].extend(group.paths)
+                victim_names.add(name)
+
+        # Квота пользователя: удаляем самые старые файлы неактивных заявок
+        if self.user_quota_bytes is not None:
+            total = sum(group.size for _, group in kept)
+            for name, group in sorted(kept, key=lambda item: item[1].created):
+                if total <= self.user_quota_bytes:
+                    break
+                if name in active:
+                    continue
+                victims['user_quota'].extend(group.paths)
+                victim_names.add(name)
+                total -= group.size
+            kept = [(name, group) for name, group in kept if name not in victim_names]
+
+        freed = {}
+        for reason, paths in victims.items():
+            freed[reason] = self.media_storage.delete_files(paths)
+            RECLAIMED_BYTES.labels(reason).inc(freed[reason])
+            RECLAIMED_FILES.labels(reason).inc(len(paths))
+
+        # Распределение оставшегося объема по дням - для общей квоты
+        days = state['days']
+        for _, group in kept:
+            day = str(int(group.created // DAY))
+            days[day] = days.get(day, 0) + group.size
+
+        # Записи об удаленных файлах больше не нужны
+        remaining = set(name for name, _ in kept)
+        stale = [relative for relative in submitted if Path(relative).stem not in remaining]
+        if stale:
+            self._remove_from_manifest(user_id, stale)
+        return freed
+
+    def _manifest_path(self, user_id: int) -> Path:
+        return self.state_dir / 'submitted' / f'{user_id}.json'
+
+    def _load_manifest(self, user_id: int) -> Dict[str, float]:
+        """Отправленные файлы пользователя: относительный путь -> время отправки"""
+        try:
+            with open(self._manifest_path(user_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _add_to_manifest(self, user_id: int, relative_paths: Iterable[str]) -> None:
+        with self._manifest_lock:
+            manifest = self._load_manifest(user_id)
+            now = time.time()
+            manifest.update((relative, now) for relative in relative_paths)
+            self._write_json(self._manifest_path(user_id), manifest)
+
+    def _remove_from_manifest(self, user_id: int, relative_paths: Iterable[str]) -> None:
+        with self._manifest_lock:
+            manifest = self._load_manifest(user_id)
+            for relative in relative_paths:
+                manifest.pop(relative, None)
+            if manifest:
+                self._write_json(self._manifest_path(user_id), manifest)
+            else:
+                try:
+                    self._manifest_path(user_id).unlink()
+                except FileNotFoundError:
+                    pass
+
+    def _load_state(self) -> Dict[str, Any]:
+        """Позиция обхода и итоги текущего обхода; создается при первом запуске"""
+        if self._state is None:
+            try:
+                with open(self.state_dir / 'state.json', 'r', encoding='utf-8') as f:
+                    self._state = json.load(f)
+            except FileNotFoundError:
+                self._state = {
+                    'installed_at': time.time(),
+                    'cursor': None,
+                    'days': {},
+                    'global_cutoff': None,
+                }
+                self._write_json(self.state_dir / 'state.json', self._state)
+        return self._state
+
+    def _save_state(self, state: Dict[str, Any]) -> None:
+        self._write_json(self.state_dir / 'state.json', state)
+
+    @staticmethod
+    def _write_json(path: Path, data: Any) -> None:
+        """Атомарно записывает JSON"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            'w', dir=path.parent, suffix='.tmp', delete=False, encoding='utf-8'
+        ) as f:
+            json.dump(data, f)
+        os.replace(f.name, path)
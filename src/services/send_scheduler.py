@@ -0,0 +1,245 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Iterable
+
+try:
+	from ..utils.templates import MESSAGE_LIMIT, message_length
+except ImportError:
+	# Пакет services імпортовано як верхньорівневий (бот на aiogram)
+	from utils.templates import MESSAGE_LIMIT, message_length
+
+logger = logging.getLogger(__name__)
+
+
+def retry_after(error: Exception) -> float | None:
+	"""
+	Пауза з відповіді 429 в секундах або None для інших помилок
+
+	TelegramRetryAfter (aiogram) і RetryAfter (python-telegram-bot) мають
+	атрибут retry_after, тож планувальник працює з ботами обох бібліотек.
+	"""
+	value = getattr(error, 'retry_after', None)
+	if hasattr(value, 'total_seconds'):
+		return value.total_seconds()
+	return float(value) if isinstance(value, (int, float)) else None
+
+
+class TokenBucket:
+	"""
+	Відро токенів з резервуванням: reserve() одразу забирає токен
+	і повертає, скільки секунд потрібно почекати до його появи
+	"""
+	def __init__(self, rate: float, capacity: float):
+		self.rate = rate
+		self.capacity = capacity
+		self._tokens = capacity
+		self._updated = time.monotonic()
+
+	def reserve(self) -> float:
+		now = time.monotonic()
+		self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+		self._updated = now
+		self._tokens -= 1
+		if self._tokens >= 0:
+			return 0.0
+		return -self._tokens / self.rate
+
+	def is_full(self) -> bool:
+		"""Чи відновилося відро до повної ємності"""
+		elapsed = time.monotonic() - self._updated
+		return self._tokens + elapsed * self.rate >= self.capacity
+
+
+class _PriorityLimiter:
+	"""
+	Глобальний ліміт швидкості з пріоритетною чергою:
+	очікувачі з priority=True отримують токени першими
+	"""
+	def __init__(self, rate: float, capacity: float):
+		self._bucket = TokenBucket(rate, capacity)
+		self._waiters: tuple[deque, deque] = (deque(), deque())
+		self._dispatcher: asyncio.Task | None = None
+
+	async def acquire(self, priority: bool = False) -> None:
+		future = asyncio.get_running_loop().create_future()
+		self._waiters[0 if priority else 1].append(future)
+		if self._dispatcher is None or self._dispatcher.done():
+			self._dispatcher = asyncio.create_task(self._dispatch())
+		await future
+
+	def _next_waiter(self) -> asyncio.Future | None:
+		for waiters in self._waiters:
+			while waiters:
+				future = waiters.popleft()
+				if not future.done():
+					return future
+		return None
+
+	async def _dispatch(self) -> None:
+		while any(self._waiters):
+			delay = self._bucket.reserve()
+			if delay:
+				await asyncio.sleep(delay)
+			# Обираємо очікувача після паузи, щоб пріоритетні запити, що прийшли
+			# під час очікування, пройшли першими
+			future = self._next_waiter()
+			if future is not None:
+				future.set_result(None)
+
+	def cancel(self) -> None:
+		if self._dispatcher is not None:
+			self._dispatcher.cancel()
+
+
+class _Job:
+	"""Запит до Telegram у черзі чату"""
+	__slots__ = ('factory', 'text', 'keyboard', 'future')
+
+	def __init__(self, factory: Callable[..., Awaitable[Any]], text: str | None, keyboard: Any):
+		self.factory = factory
+		self.text = text  # Для текстових повідомлень, які можна об'єднувати
+		self.keyboard = keyboard
+		self.future = asyncio.get_running_loop().create_future()
+		# Помилку отримує той, хто чекає; якщо ніхто не чекає - не попереджаємо
+		self.future.add_done_callback(_consume_exception)
+
+
+def _consume_exception(future: asyncio.Future) -> None:
+	if not future.cancelled():
+		future.exception()
+
+
+class SendScheduler:
+	"""
+	Планувальник вихідних запитів до Telegram.
+
+	- запити одного чату виконуються по черзі, не частіше ``per_chat_rate`` на секунду;
+	- загальна швидкість обмежена ``global_rate`` запитами на секунду,
+	  чати з ``priority_chat_ids`` (інженер) обслуговуються першими;
+	- при 429 (TelegramRetryAfter, RetryAfter) чат чекає вказаний час і повторює запит;
+	- кілька текстових повідомлень підряд в один чат без клавіатури
+	  (крім останнього) об'єднуються в одне.
+	"""
+	def __init__(
+		self,
+		global_rate: float = 25,
+		per_chat_rate: float = 1,
+		per_chat_burst: float = 3,
+		priority_chat_ids: Iterable[int] = (),
+		max_retries: int = 3,
+		coalesce: bool = True
+	):
+		self.per_chat_rate = per_chat_rate
+		self.per_chat_burst = per_chat_burst
+		self.priority_chat_ids = set(priority_chat_ids)
+		self.max_retries = max_retries
+		self.coalesce = coalesce
+		self._global = _PriorityLimiter(global_rate, global_rate)
+		self._queues: dict[int, deque[_Job]] = {}
+		self._buckets: dict[int, TokenBucket] = {}
+		self._workers: dict[int, asyncio.Task] = {}
+
+	def submit(
+		self,
+		chat_id: int,
+		factory: Callable[..., Awaitable[Any]],
+		text: str | None = None,
+		keyboard: Any = None
+	) -> asyncio.Future:
+		"""
+		Ставить запит у чергу чату.
+
+		Для текстових повідомлень (text задано) factory викликається як
+		factory(text, keyboard), інакше - factory() без аргументів.
+		"""
+		job = _Job(factory, text, keyboard)
+		self._queues.setdefault(chat_id, deque()).append(job)
+		worker = self._workers.get(chat_id)
+		if worker is None or worker.done():
+			self._workers[chat_id] = asyncio.create_task(self._chat_worker(chat_id))
+		return job.future
+
+	async def _chat_worker(self, chat_id: int) -> None:
+		queue = self._queues[chat_id]
+		bucket = self._buckets.get(chat_id)
+		if bucket is None:
+			bucket = self._buckets[chat_id] = TokenBucket(self.per_chat_rate, self.per_chat_burst)
+		priority = chat_id in self.priority_chat_ids
+
+		try:
+			while queue:
+				batch = self._take_batch(queue)
+				delay = bucket.reserve()
+				if delay:
+					await asyncio.sleep(delay)
+				await self._global.acquire(priority)
+				await self._execute(chat_id, batch)
+		finally:
+			if not queue:
+				self._queues.pop(chat_id, None)
+				self._workers.pop(chat_id, None)
+				# Повне відро можна не зберігати: нове буде таким самим
+				if bucket.is_full():
+					self._buckets.pop(chat_id, None)
+
+	def _take_batch(self, queue: deque) -> list[_Job]:
+		"""Забирає з черги запит і текстові повідомлення, які можна з ним об'єднати"""
+		batch = [queue.popleft()]
+		if not self.coalesce or batch[0].text is None:
+			return batch
+
+		length = message_length(batch[0].text)
+		while (
+			queue
+			and queue[0].text is not None
+			and batch[-1].keyboard is None
+			and length + 2 + message_length(queue[0].text) <= MESSAGE_LIMIT
+		):
+			length += 2 + message_length(queue[0].text)
+			batch.append(queue.popleft())
+		return batch
+
+	async def _execute(self, chat_id: int, batch: list[_Job]) -> None:
+		head = batch[0]
+		if head.text is not None:
+			text = "\n\n".join(job.text for job in batch)
+			call = lambda: head.factory(text, batch[-1].keyboard)
+		else:
+			call = head.factory
+
+		for attempt in range(self.max_retries + 1):
+			try:
+				result = await call()
+				break
+			except Exception as e:
+				delay = retry_after(e)
+				if delay is None or attempt >= self.max_retries:
+					self._fail(batch, e)
+					return
+				logger.warning("Flood control for chat %s, retry in %ss", chat_id, delay)
+				await asyncio.sleep(delay)
+
+		for job in batch:
+			if not job.future.done():
+				job.future.set_result(result)
+
+	@staticmethod
+	def _fail(batch: list[_Job], error: Exception) -> None:
+		logger.error("Error sending to Telegram: %s", error)
+		for job in batch:
+			if not job.future.done():
+				job.future.set_exception(error)
+
+	async def close(self) -> None:
+		"""Зупиняє обробку черг"""
+		self._global.cancel()
+		for worker in list(self._workers.values()):
+			worker.cancel()
+		await asyncio.gather(*self._workers.values(), return_exceptions=True)
+		for queue in self._queues.values():
+			for job in queue:
+				job.future.cancel()
+		self._workers.clear()
+		self._queues.clear()
@@ -0,0 +1,58 @@
+"""
+Метрики обработчиков и запросов к Bot API для приложения PTB
+"""
+import time
+from typing import Any, Tuple
+
+from telegram.ext import Application, BaseHandler, ConversationHandler
+from telegram.request import HTTPXRequest
+
+from .metrics import TELEGRAM_API_CALLS, TELEGRAM_API_LATENCY, instrument_callback
+
+
+class InstrumentedRequest(HTTPXRequest):
+    """
+    HTTPXRequest, который считает запросы к Bot API и их время по методам
+
+    Передается в ``Application.builder().request(...)`` и
+    ``.get_updates_request(...)`` вместо запроса по умолчанию.
+    """
+
+    __slots__ = ()
+
+    async def do_request(self, url: str, method: str, *args: Any, **kwargs: Any) -> Tuple[int, bytes]:
+        api_method = url.rsplit('/', 1)[-1]
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            status, payload = await super().do_request(url, method, *args, **kwargs)
+            outcome = 'ok' if status == 200 else str(status)
+            return status, payload
+        finally:
+            TELEGRAM_API_LATENCY.labels(api_method).observe(time.perf_counter() - started)
+            TELEGRAM_API_CALLS.labels(api_method, outcome).inc()
+
+
+def _instrument(handler: BaseHandler) -> None:
+    if isinstance(handler, ConversationHandler):
+        for nested in handler.entry_points:
+            _instrument(nested)
+        for state_handlers in handler.states.values():
+            for nested in state_handlers:
+                _instrument(nested)
+        for nested in handler.fallbacks:
+            _instrument(nested)
+        return
+    handler.callback = instrument_callback(handler.callback)
+
+
+def instrument_handlers(application: Application) -> None:
+    """
+    Добавляет замер времени ко всем зарегистрированным обработчикам,
+    включая обработчики состояний ConversationHandler
+
+    Вызывается после регистрации обработчиков.
+    """
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            _instrument(handler)
@@ -0,0 +1,121 @@
+"""
+Параллельная обработка обновлений с сохранением порядка для каждого пользователя
+"""
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Deque, Dict, Hashable, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+
+def _user_key(update: object) -> Optional[Hashable]:
+    """Ключ очереди: пользователь, иначе чат; None - обновление без порядка"""
+    if not isinstance(update, Update):
+        return None
+    if update.effective_user is not None:
+        return update.effective_user.id
+    if update.effective_chat is not None:
+        return ('chat', update.effective_chat.id)
+    return None
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Обрабатывает обновления разных пользователей параллельно, а обновления
+    одного пользователя - строго по очереди.
+
+    Первое обновление пользователя обрабатывается сразу; пока оно
+    обрабатывается, следующие обновления этого пользователя ставятся в его
+    очередь и выполняются той же задачей одно за другим. Поэтому состояние
+    диалога и заявка пользователя не изменяются двумя обработчиками
+    одновременно, а медленное скачивание фото одного пользователя не
+    задерживает остальных.
+
+    Число обновлений, взятых из ``application.update_queue`` и еще не
+    обработанных, ограничено ``max_pending_updates``: очередь, созданная
+    create_update_queue(), не отдает новые обновления, пока оно достигнуто.
+    Тогда заполняется сама очередь, и вебхук отвечает 503, а polling
+    приостанавливается.
+
+    Args:
+        max_concurrent_updates: Сколько пользователей обрабатывается одновременно
+        max_pending_updates: Сколько обновлений может находиться в обработке
+            или в очередях пользователей
+    """
+
+    __slots__ = ('max_pending_updates', '_pending', '_queues')
+
+    def __init__(self, max_concurrent_updates: int = 64, max_pending_updates: int = 1000):
+        super().__init__(max_concurrent_updates)
+        if max_pending_updates < max_concurrent_updates:
+            raise ValueError("max_pending_updates не может быть меньше max_concurrent_updates")
+        self.max_pending_updates = max_pending_updates
+        self._pending = asyncio.Semaphore(max_pending_updates)
+        self._queues: Dict[Hashable, Deque[Awaitable[Any]]] = {}
+
+    def create_update_queue(self, maxsize: int = 0) -> asyncio.Queue:
+        """Очередь обновлений для ``ApplicationBuilder.update_queue()`` с учетом лимита"""
+        return _BoundedUpdateQueue(self._pending, maxsize)
+
+    @property
+    def active_users(self) -> int:
+        """Количество пользователей, чьи обновления сейчас обрабатываются"""
+        return len(self._queues)
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = _user_key(update)
+        queue = self._queues.get(key) if key is not None else None
+        if queue is not None:
+            # Обновление пользователя уже обрабатывается: выполнит та же задача
+            queue.append(coroutine)
+            return
+
+        if key is not None:
+            self._queues[key] = queue = deque()
+        try:
+            while True:
+                try:
+                    await coroutine
+                except Exception:
+                    logger.exception("Ошибка обработки обновления")
+                finally:
+                    self._pending.release()
+                if not queue:
+                    break
+                coroutine = queue.popleft()
+        finally:
+            if key is not None:
+                del self._queues[key]
+            # Задача отменена при остановке: оставшиеся обновления не выполнятся
+            while queue:
+                queue.popleft().close()
+                self._pending.release()
+
+
+class _BoundedUpdateQueue(asyncio.Queue):
+    """
+    asyncio.Queue, которая отдает элемент только при свободном месте в
+    обработке; место освобождает PerUserUpdateProcessor
+    """
+
+    def __init__(self, pending: asyncio.Semaphore, maxsize: int = 0):
+        super().__init__(maxsize)
+        self._pending_slots = pending
+
+    async def get(self) -> Any:
+        await self._pending_slots.acquire()
+        try:
+            return await super().get()
+        except BaseException:
+            self._pending_slots.release()
+            raise
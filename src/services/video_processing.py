@@ -0,0 +1,395 @@
+"""
+Фоновое перекодирование видео: превью H.264 и кадр-обложка
+
+Оригинал остается в хранилище без изменений, рядом с ним создаются:
+
+- ``previews/<user_id>/<имя>.mp4`` - H.264/AAC не больше ``max_side`` по
+  длинной стороне, битрейт подобран по длительности так, чтобы файл
+  уместился в ``max_preview_bytes`` (Telegram скачивает видео по URL
+  размером до 20 МБ);
+- ``posters/<user_id>/<имя>.jpg`` - кадр-обложка.
+
+Задания ставятся в очередь и выполняются ограниченным числом процессов
+ffmpeg; отправка заявки их не ждет. Если превью готово к отправке заявки,
+инженер получает его, иначе - оригинал.
+"""
+import os
+import re
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from .metrics import registry
+
+if TYPE_CHECKING:
+    from .media_storage import MediaStorage
+
+logger = logging.getLogger(__name__)
+
+VIDEO_JOBS = registry.counter(
+    'media_video_jobs',
+    'Задания перекодирования видео по результату (ok, failed, timeout, cancelled, rejected)',
+    ['outcome']
+)
+VIDEO_QUEUE_DEPTH = registry.gauge(
+    'media_video_queue_depth',
+    'Задания перекодирования видео, ожидающие свободного процесса ffmpeg'
+)
+VIDEO_PROGRESS = registry.gauge(
+    'media_video_progress',
+    'Средний прогресс незавершенных заданий перекодирования, от 0 до 1'
+)
+VIDEO_TRANSCODE_LATENCY = registry.histogram(
+    'media_video_transcode_seconds',
+    'Время перекодирования видео (без ожидания в очереди)'
+)
+VIDEO_BYTES = registry.counter(
+    'media_video_bytes',
+    'Размер оригиналов и превью видео в байтах',
+    ['variant']
+)
+
+_DURATION = re.compile(r'Duration: (\d+):(\d+):(\d+(?:\.\d+)?)')
+_VIDEO_SIZE = re.compile(r'Stream #.*?Video:.*?(\d{2,5})x(\d{2,5})')
+_ROTATION = re.compile(r'(?:rotate\s*:\s*|rotation of )(-?\d+)')
+
+
+@dataclass
+class VideoInfo:
+    """Результат перекодирования видео"""
+    width: int  # Размеры оригинала с учетом поворота
+    height: int
+    duration: float
+    preview_url: str  # URL оригинала, если превью получилось не меньше него
+    poster_url: str
+
+    def to_list(self) -> list:
+        """Представление для хранения в заявке (Application.media_previews)"""
+        return [self.preview_url, self.poster_url, self.width, self.height]
+
+
+@dataclass
+class VideoJob:
+    """Задание перекодирования одного видео"""
+    user_id: int
+    file_path: str
+    file_url: str
+    on_complete: Optional[Callable[['VideoJob'], Awaitable[None]]] = None
+    progress: float = 0.0  # Доля перекодированной длительности, от 0 до 1
+    info: Optional[VideoInfo] = None  # Заполняется после успешного перекодирования
+    cancelled: bool = False
+    process: Optional[asyncio.subprocess.Process] = field(default=None, repr=False)
+
+
+# Вызывается после успешного перекодирования
+OnVideoReady = Callable[[VideoJob], Awaitable[None]]
+
+
+def parse_probe(output: str) -> Tuple[Optional[float], Optional[int], Optional[int]]:
+    """
+    Извлекает длительность и размеры видео из вывода ``ffmpeg -i``
+
+    Returns:
+        Tuple[длительность_в_секундах, ширина, высота]; неизвестное - None
+    """
+    duration = width = height = None
+    match = _DURATION.search(output)
+    if match:
+        hours, minutes, seconds = match.groups()
+        duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    match = _VIDEO_SIZE.search(output)
+    if match:
+        width, height = int(match.group(1)), int(match.group(2))
+        rotation = _ROTATION.search(output)
+        if rotation and abs(int(rotation.group(1))) % 180 == 90:
+            width, height = height, width
+    return duration, width, height
+
+
+class VideoTranscoder:
+    """
+    Очередь заданий перекодирования видео и пул процессов ffmpeg
+
+    Одновременно работает не больше ``workers`` процессов ffmpeg, в очереди
+    ждет не больше ``queue_size`` заданий: при переполнении submit() сразу
+    отказывает, и инженер получает оригинал. Процессы-обработчики очереди
+    запускаются при первом задании.
+    """
+
+    MAX_PREVIEW_BYTES = 15 * 1024 * 1024
+    MAX_SIDE = 1280
+    # Потолок битрейта видео: короткие ролики не раздуваются до лимита размера
+    MAX_VIDEO_BITRATE = 2_500_000
+    MIN_VIDEO_BITRATE = 150_000
+    AUDIO_BITRATE = 96_000
+    POSTER_SIDE = 640
+
+    def __init__(
+        self,
+        media_storage: 'MediaStorage',
+        workers: int = 1,
+        queue_size: int = 100,
+        max_preview_bytes: int = MAX_PREVIEW_BYTES,
+        max_side: int = MAX_SIDE,
+        timeout: float = 600.0,
+        ffmpeg: str = 'ffmpeg'
+    ):
+        """
+        Args:
+            media_storage: Хранилище, в котором лежат оригиналы
+            workers: Количество одновременно работающих процессов ffmpeg
+            queue_size: Максимум заданий в очереди
+            max_preview_bytes: Максимальный размер превью в байтах
+            max_side: Максимальный размер превью по длинной стороне
+            timeout: Максимальное время перекодирования одного видео в секундах
+            ffmpeg: Путь к ffmpeg
+        """
+        self.media_storage = media_storage
+        self.workers = workers
+        self.max_preview_bytes = max_preview_bytes
+        self.max_side = max_side
+        self.timeout = timeout
+        self.ffmpeg = ffmpeg
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._workers: List[asyncio.Task] = []
+        # Незавершенные задания по пользователям (для прогресса и отмены)
+        self._jobs: Dict[int, List[VideoJob]] = {}
+        self._background_tasks: Set[asyncio.Task] = set()
+        VIDEO_QUEUE_DEPTH.set_function(self._queue.qsize)
+        VIDEO_PROGRESS.set_function(self._overall_progress)
+
+    def submit(
+        self,
+        user_id: int,
+        file_path: str,
+        file_url: str,
+        on_complete: Optional[OnVideoReady] = None
+    ) -> Optional[VideoJob]:
+        """
+        Ставит видео в очередь перекодирования, не дожидаясь результата
+
+        Args:
+            user_id: ID пользователя (заявки)
+            file_path: Путь к оригиналу, возвращенный MediaStorage
+            file_url: URL оригинала
+            on_complete: Вызывается после успешного перекодирования
+
+        Returns:
+            Задание или None, если очередь переполнена
+        """
+        if not self._workers:
+            self._workers = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+        job = VideoJob(user_id, file_path, file_url, on_complete)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            VIDEO_JOBS.labels('rejected').inc()
+            logger.warning("Очередь перекодирования переполнена, видео %s не обработано", file_path)
+            return None
+        self._jobs.setdefault(user_id, []).append(job)
+        return job
+
+    def progress(self, user_id: int) -> Optional[float]:
+        """Средний прогресс незавершенных заданий пользователя (None, если их нет)"""
+        jobs = self._jobs.get(user_id)
+        if not jobs:
+            return None
+        return sum(job.progress for job in jobs) / len(jobs)
+
+    def _overall_progress(self) -> float:
+        jobs = [job for user_jobs in self._jobs.values() for job in user_jobs]
+        if not jobs:
+            return 0.0
+        return sum(job.progress for job in jobs) / len(jobs)
+
+    def cancel(self, user_id: int) -> None:
+        """Отменяет задания пользователя: ожидающие пропускаются, запущенный ffmpeg завершается"""
+        for job in self._jobs.pop(user_id, ()):
+            job.cancelled = True
+            if job.process is not None and job.process.returncode is None:
+                job.process.kill()
+
+    async def close(self) -> None:
+        """Останавливает обработчики очереди и запущенные процессы ffmpeg"""
+        for user_id in list(self._jobs):
+            self.cancel(user_id)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, *self._background_tasks, return_exceptions=True)
+        self._workers = []
+
+    async def _worker(self) -> None:
+        while True:
+            job: VideoJob = await self._queue.get()
+            try:
+                await self._run_job(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Ошибка в обработчике очереди перекодирования: %s", e)
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job: VideoJob) -> None:
+        if job.cancelled:
+            VIDEO_JOBS.labels('cancelled').inc()
+            return
+
+        started = time.perf_counter()
+        outcome = 'failed'
+        try:
+            job.info = await asyncio.wait_for(self._transcode(job), self.timeout)
+            outcome = 'ok'
+        except asyncio.TimeoutError:
+            outcome = 'timeout'
+            logger.error("Перекодирование %s не уложилось в %.0f с", job.file_path, self.timeout)
+        except Exception as e:
+            if job.cancelled:
+                outcome = 'cancelled'
+            else:
+                logger.error("Ошибка при перекодировании %s: %s", job.file_path, e)
+        finally:
+            if job.process is not None and job.process.returncode is None:
+                job.process.kill()
+                await job.process.wait()
+            VIDEO_JOBS.labels(outcome).inc()
+            VIDEO_TRANSCODE_LATENCY.observe(time.perf_counter() - started)
+            self._forget(job)
+
+        if job.info is not None and job.on_complete is not None and not job.cancelled:
+            # Обработчик не задерживает следующее задание очереди
+            task = asyncio.ensure_future(self._notify(job))
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+
+    def _forget(self, job: VideoJob) -> None:
+        jobs = self._jobs.get(job.user_id)
+        if jobs is None:
+            return
+        if job in jobs:
+            jobs.remove(job)
+        if not jobs:
+            del self._jobs[job.user_id]
+
+    async def _notify(self, job: VideoJob) -> None:
+        try:
+            await job.on_complete(job)
+        except Exception as e:
+            logger.error("Ошибка при сохранении превью видео %s: %s", job.file_url, e)
+
+    async def _transcode(self, job: VideoJob) -> VideoInfo:
+        """Создает обложку и превью видео"""
+        storage = self.media_storage
+        relative = Path(job.file_path).relative_to(storage.storage_path)
+        # videos/<user_id>/<имя>.mp4 -> previews/<user_id>/<имя>.mp4, posters/<user_id>/<имя>.jpg
+        name = Path(*relative.parts[1:]).with_suffix('').as_posix()
+        preview_path = storage.storage_path / f"previews/{name}.mp4"
+        poster_path = storage.storage_path / f"posters/{name}.jpg"
+
+        duration, width, height = parse_probe(await self._probe(job))
+
+        # Обложка - кадр на первой секунде (или в середине короткого ролика)
+        seek = min(1.0, duration / 2) if duration else 0.0
+        await self._ffmpeg(job, poster_path, 'image2', [
+            '-ss', f'{seek:.2f}', '-i', job.file_path,
+            '-frames:v', '1',
+            '-vf', f"scale='min({self.POSTER_SIDE},iw)':'min({self.POSTER_SIDE},ih)'"
+                   ":force_original_aspect_ratio=decrease",
+            '-q:v', '4',
+        ])
+
+        # Битрейт по длительности, чтобы превью уместилось в лимит размера;
+        # -fs дополнительно обрезает файл, если оценка ошиблась
+        video_bitrate = self.MAX_VIDEO_BITRATE
+        if duration:
+            budget = self.max_preview_bytes * 8 * 0.95 / duration - self.AUDIO_BITRATE
+            video_bitrate = int(max(self.MIN_VIDEO_BITRATE, min(video_bitrate, budget)))
+        await self._ffmpeg(job, preview_path, 'mp4', [
+            '-i', job.file_path,
+            '-vf', f"scale='min({self.max_side},iw)':'min({self.max_side},ih)'"
+                   ":force_original_aspect_ratio=decrease:force_divisible_by=2",
+            '-c:v', 'libx264', '-preset', 'veryfast', '-profile:v', 'main', '-pix_fmt', 'yuv420p',
+            '-b:v', str(video_bitrate), '-maxrate', str(video_bitrate), '-bufsize', str(2 * video_bitrate),
+            '-c:a', 'aac', '-b:a', str(self.AUDIO_BITRATE), '-ac', '2',
+            '-movflags', '+faststart',
+            '-fs', str(self.max_preview_bytes),
+            '-progress', 'pipe:1', '-nostats',
+        ], duration=duration)
+
+        original_bytes = os.path.getsize(job.file_path)
+        preview_bytes = os.path.getsize(preview_path)
+        VIDEO_BYTES.labels('original').inc(original_bytes)
+        VIDEO_BYTES.labels('preview').inc(preview_bytes)
+
+        # Уже сжатый оригинал в пределах лимита не заменяем более тяжелой копией
+        if preview_bytes >= original_bytes and original_bytes <= self.max_preview_bytes:
+            preview_url = job.file_url
+        else:
+            preview_url = storage.get_file_url(str(preview_path))
+        return VideoInfo(
+            width=width or 0,
+            height=height or 0,
+            duration=duration or 0.0,
+            preview_url=preview_url,
+            poster_url=storage.get_file_url(str(poster_path))
+        )
+
+    async def _probe(self, job: VideoJob) -> str:
+        """Вывод ``ffmpeg -i`` с описанием файла (ffmpeg завершается с ошибкой - это ожидаемо)"""
+        process = await asyncio.create_subprocess_exec(
+            self.ffmpeg, '-hide_banner', '-i', job.file_path,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+        job.process = process
+        _, stderr = await process.communicate()
+        return stderr.decode(errors='replace')
+
+    async def _ffmpeg(
+        self,
+        job: VideoJob,
+        target: Path,
+        format: str,
+        arguments: List[str],
+        duration: Optional[float] = None
+    ) -> None:
+        """
+        Запускает ffmpeg с записью во временный файл и атомарно переносит результат
+
+        Если задана длительность, прогресс задания обновляется по выводу ``-progress``.
+        """
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = target.with_name(f'.{target.name}.tmp')
+        process = await asyncio.create_subprocess_exec(
+            self.ffmpeg, '-hide_banner', '-v', 'error', '-y', *arguments, '-f', format, str(tmp_path),
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        job.process = process
+        # stderr читается параллельно, чтобы ffmpeg не заблокировался на полном буфере
+        stderr_task = asyncio.ensure_future(process.stderr.read())
+        try:
+            async for line in process.stdout:
+                if duration and line.startswith(b'out_time_us='):
+                    value = line[len(b'out_time_us='):].strip()
+                    if value.isdigit():
+                        job.progress = min(1.0, int(value) / 1e6 / duration)
+            returncode = await process.wait()
+            stderr = await stderr_task
+            if job.cancelled:
+                raise RuntimeError("задание отменено")
+            if returncode != 0:
+                raise RuntimeError(f"ffmpeg завершился с кодом {returncode}: {stderr.decode(errors='replace')[-500:]}")
+            # Файлы раздает nginx
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, target)
+        finally:
+            stderr_task.cancel()
+            if tmp_path.exists():
+                tmp_path.unlink()
@@ -0,0 +1,192 @@
+"""
+HTTP-сервер на aiohttp: вебхук Telegram, /health и /metrics
+"""
+import asyncio
+import hashlib
+import hmac
+import logging
+import signal
+from typing import Optional
+
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+WEBHOOK_UPDATES = registry.counter(
+    'bot_webhook_updates',
+    'Обновления, полученные через вебхук',
+    ('status',)
+)
+UPDATE_QUEUE_DEPTH = registry.gauge(
+    'bot_update_queue_depth',
+    'Количество обновлений в очереди на обработку'
+)
+
+
+def derive_secret_token(bot_token: str) -> str:
+    """
+    Секрет вебхука по умолчанию, одинаковый для всех экземпляров бота
+
+    Telegram допускает в секрете только символы A-Z, a-z, 0-9, _ и -.
+    """
+    return hashlib.sha256(f"webhook:{bot_token}".encode()).hexdigest()
+
+
+class WebhookServer:
+    """
+    Принимает обновления Telegram по HTTP.
+
+    Обработчик вебхука проверяет секретный заголовок, кладет обновление в
+    ограниченную очередь ``application.update_queue`` и сразу отвечает 200;
+    обновления обрабатывает само приложение. Если очередь заполнена,
+    возвращается 503, и Telegram повторит доставку позже.
+    """
+
+    def __init__(
+        self,
+        application: Application,
+        secret_token: Optional[str] = None,
+        webhook_path: str = '/telegram',
+        host: str = '0.0.0.0',
+        port: int = 8080
+    ):
+        """
+        Args:
+            application: Приложение PTB (update_queue должна быть ограниченной)
+            secret_token: Секрет вебхука; если None, маршрут вебхука не создается
+            webhook_path: Путь вебхука
+            host: Адрес для прослушивания
+            port: Порт для прослушивания
+        """
+        self.application = application
+        self.secret_token = secret_token
+        self.webhook_path = webhook_path
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    def create_app(self) -> web.Application:
+        """Создает aiohttp-приложение с маршрутами"""
+        app = web.Application()
+        app.router.add_get('/health', self.handle_health)
+        app.router.add_get('/metrics', self.handle_metrics)
+        if self.secret_token is not None:
+            app.router.add_post(self.webhook_path, self.handle_webhook)
+        return app
+
+    async def handle_webhook(self, request: web.Request) -> web.Response:
+        """Принимает обновление от Telegram"""
+        secret = request.headers.get(SECRET_HEADER, '')
+        if not hmac.compare_digest(secret, self.secret_token):
+            WEBHOOK_UPDATES.labels('forbidden').inc()
+            return web.Response(status=403)
+
+        try:
+            update = Update.de_json(await request.json(), self.application.bot)
+            if update is None:
+                raise ValueError("пустое тело запроса")
+        except (ValueError, TypeError, KeyError) as e:
+            logger.warning("Некорректное обновление в вебхуке: %s", e)
+            WEBHOOK_UPDATES.labels('invalid').inc()
+            return web.Response(status=400)
+
+        try:
+            self.application.update_queue.put_nowait(update)
+        except asyncio.QueueFull:
+            logger.warning("Очередь обновлений заполнена, просим Telegram повторить позже")
+            WEBHOOK_UPDATES.labels('rejected').inc()
+            return web.Response(status=503)
+
+        WEBHOOK_UPDATES.labels('accepted').inc()
+        return web.Response()
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        """Проверка работоспособности"""
+        queue = self.application.update_queue
+        status = 'ok' if self.application.running else 'starting'
+        return web.json_response(
+            {'status': status, 'queue': queue.qsize(), 'queue_max': queue.maxsize},
+            status=200 if self.application.running else 503
+        )
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        """Метрики в текстовом формате Prometheus"""
+        UPDATE_QUEUE_DEPTH.set(self.application.update_queue.qsize())
+        return web.Response(
+            text=registry.render(),
+            content_type='text/plain',
+            headers={'X-Content-Type-Options': 'nosniff'}
+        )
+
+    async def start(self) -> None:
+        """Запускает HTTP-сервер"""
+        self._runner = web.AppRunner(self.create_app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info("HTTP-сервер слушает %s:%s", self.host, self.port)
+
+    async def stop(self) -> None:
+        """Останавливает HTTP-сервер"""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def run_webhook(
+    application: Application,
+    webhook_url: str,
+    secret_token: str,
+    webhook_path: str = '/telegram',
+    host: str = '0.0.0.0',
+    port: int = 8080
+) -> None:
+    """
+    Запускает бота в режиме вебхука до получения SIGINT/SIGTERM
+
+    Повторяет жизненный цикл ``Application.run_polling``: initialize,
+    post_init, start, затем stop, post_stop, shutdown, post_shutdown.
+
+    Args:
+        application: Приложение PTB
+        webhook_url: Публичный адрес сервиса (без пути вебхука)
+        secret_token: Секрет вебхука
+        webhook_path: Путь вебхука
+        host: Адрес для прослушивания
+        port: Порт для прослушивания
+    """
+    server = WebhookServer(application, secret_token, webhook_path, host, port)
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    await application.initialize()
+    try:
+        if application.post_init:
+            await application.post_init(application)
+
+        await application.bot.set_webhook(
+            url=webhook_url.rstrip('/') + webhook_path,
+            secret_token=secret_token,
+            allowed_updates=Update.ALL_TYPES
+        )
+        await application.start()
+        await server.start()
+        logger.info("Бот запущено в режимі webhook...")
+
+        await stop_event.wait()
+    finally:
+        await server.stop()
+        if application.running:
+            await application.stop()
+            if application.post_stop:
+                await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
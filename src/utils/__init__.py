@@ -1,3 +1,3 @@
-from .validators import validate_email, validate_phone
+from .validators import validate_email, validate_phone, parse_phone, validate_many
 
-__all__ = ['validate_email', 'validate_phone']
+__all__ = ['validate_email', 'validate_phone', 'parse_phone', 'validate_many']
@@ -0,0 +1,198 @@
+"""
+Словарь с ограничением размера (LRU) и временем жизни записей (TTL)
+"""
+import heapq
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Hashable, Iterator, List, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+# Причины вытеснения, передаваемые в on_evict
+EXPIRED = 'expired'
+CAPACITY = 'capacity'
+
+_MISSING = object()
+
+
+class ExpiringMap(Generic[K, V]):
+    """
+    Словарь для состояния пользователей, который не растет бесконечно.
+
+    - ``capacity``: при переполнении вытесняется давно не использованная запись;
+    - ``ttl``: запись истекает через ``ttl`` секунд после последней записи
+      (``set``), можно задать свой TTL для отдельной записи;
+    - истекшие записи удаляются лениво при обращении к ним и периодически
+      (не чаще раза в ``sweep_interval`` секунд) при любой операции;
+    - ``on_evict(key, value, reason)`` вызывается для вытесненных и истекших
+      записей (но не для удаленных явно через ``pop``/``del``).
+
+    Счетчики ``evictions`` и ``stats()`` показывают размер и число вытеснений;
+    в /metrics их выводит ``services.metrics.track_state_map``.
+    """
+
+    def __init__(
+        self,
+        capacity: Optional[int] = None,
+        ttl: Optional[float] = None,
+        on_evict: Optional[Callable[[K, V, str], None]] = None,
+        sweep_interval: float = 60.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            capacity: Максимальное количество записей (None - без ограничения)
+            ttl: Время жизни записей в секундах по умолчанию (None - бессрочно)
+            on_evict: Обработчик вытеснения записей
+            sweep_interval: Минимальный интервал между периодическими очистками
+            clock: Источник времени (для тестов)
+        """
+        if capacity is not None and capacity <= 0:
+            raise ValueError("capacity должен быть больше 0")
+        self.capacity = capacity
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.sweep_interval = sweep_interval
+        self._clock = clock
+        # key -> (value, expires_at); порядок - от давно использованных к недавним
+        self._data: "OrderedDict[K, Tuple[V, Optional[float]]]" = OrderedDict()
+        # Куча сроков истечения; записи с устаревшим сроком пропускаются
+        self._deadlines: List[Tuple[float, int, K]] = []
+        self._counter = 0
+        self._last_sweep = clock()
+        self.evictions: Dict[str, int] = {EXPIRED: 0, CAPACITY: 0}
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        """Возвращает значение и помечает запись как недавно использованную"""
+        self._maybe_sweep()
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        if self._is_expired(entry):
+            self._evict(key, EXPIRED)
+            return default
+        self._data.move_to_end(key)
+        return entry[0]
+
+    def set(self, key: K, value: V, ttl: Optional[float] = None) -> None:
+        """
+        Добавляет или заменяет запись, заново отсчитывая ее время жизни
+
+        Args:
+            key: Ключ
+            value: Значение
+            ttl: Время жизни записи (по умолчанию - ``self.ttl``)
+        """
+        self._maybe_sweep()
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = None
+        if ttl is not None:
+            expires_at = self._clock() + ttl
+            self._counter += 1
+            heapq.heappush(self._deadlines, (expires_at, self._counter, key))
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+
+        if self.capacity is not None:
+            while len(self._data) > self.capacity:
+                self._evict(next(iter(self._data)), CAPACITY)
+
+        # Не даем куче разрастись из-за многократно обновленных записей
+        if len(self._deadlines) > 2 * len(self._data) + 64:
+            self._rebuild_deadlines()
+
+    def setdefault(self, key: K, default: V) -> V:
+        """Возвращает значение по ключу, при отсутствии - сохраняет ``default``"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            self.set(key, default)
+            return default
+        return value
+
+    def pop(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        """Удаляет запись без вызова on_evict"""
+        entry = self._data.pop(key, None)
+        if entry is None or self._is_expired(entry):
+            return default
+        return entry[0]
+
+    def sweep(self) -> int:
+        """
+        Удаляет все истекшие записи
+
+        Returns:
+            Количество удаленных записей
+        """
+        now = self._clock()
+        self._last_sweep = now
+        removed = 0
+        while self._deadlines and self._deadlines[0][0] <= now:
+            expires_at, _, key = heapq.heappop(self._deadlines)
+            entry = self._data.get(key)
+            # Запись могла быть обновлена или удалена после добавления в кучу
+            if entry is not None and entry[1] == expires_at:
+                self._evict(key, EXPIRED)
+                removed += 1
+        return removed
+
+    def clear(self) -> None:
+        """Удаляет все записи без вызова on_evict"""
+        self._data.clear()
+        self._deadlines.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Размер и счетчики вытеснений"""
+        return {'size': len(self._data), **self.evictions}
+
+    def _is_expired(self, entry: Tuple[V, Optional[float]]) -> bool:
+        return entry[1] is not None and entry[1] <= self._clock()
+
+    def _maybe_sweep(self) -> None:
+        if self._deadlines and self._clock() - self._last_sweep >= self.sweep_interval:
+            self.sweep()
+
+    def _evict(self, key: K, reason: str) -> None:
+        value, _ = self._data.pop(key)
+        self.evictions[reason] += 1
+        if self.on_evict is not None:
+            try:
+                self.on_evict(key, value, reason)
+            except Exception as e:
+                logger.error("Ошибка в обработчике вытеснения для %s: %s", key, e)
+
+    def _rebuild_deadlines(self) -> None:
+        self._deadlines = [
+            (expires_at, index, key)
+            for index, (key, (_, expires_at)) in enumerate(self._data.items())
+            if expires_at is not None
+        ]
+        heapq.heapify(self._deadlines)
+        self._counter = len(self._deadlines)
+
+    def __getitem__(self, key: K) -> V:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: K, value: V) -> None:
+        self.set(key, value)
+
+    def __delitem__(self, key: K) -> None:
+        if self.pop(key, _MISSING) is _MISSING:
+            raise KeyError(key)
+
+    def __contains__(self, key: object) -> bool:
+        # Проверка наличия не меняет порядок LRU
+        entry = self._data.get(key)
+        return entry is not None and not self._is_expired(entry)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __iter__(self) -> Iterator[K]:
+        return iter(list(self._data))
@@ -1,53 +1,64 @@
+from functools import lru_cache
+from typing import Tuple
+
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemove
 
+# Об'єкти aiogram незмінні (frozen), тому кожна клавіатура будується один
+# раз при імпорті і далі повторно використовується у всіх повідомленнях
+
+@lru_cache(maxsize=None)
+def build_reply_keyboard(*rows: Tuple[str, ...]) -> ReplyKeyboardMarkup:
+    """
+    Клавіатура з текстових кнопок, кешується за набором рядків
+
+    Args:
+        rows: Рядки клавіатури, кожен - кортеж підписів кнопок
+    """
+    kb = [[KeyboardButton(text=text) for text in row] for row in rows]
+    return ReplyKeyboardMarkup(keyboard=kb, resize_keyboard=True)
+
+_MAIN_KEYBOARD = build_reply_keyboard(("🔧 Поломка", "🖨 Якість друку"))
+
+_PROFILE_NAME_KEYBOARD = build_reply_keyboard(("👤 Використати ім'я з профілю",))
+
+_PHONE_KEYBOARD = ReplyKeyboardMarkup(
+    keyboard=[[KeyboardButton(text="📱 Надати номер телефону", request_contact=True)]],
+    resize_keyboard=True
+)
+
+_PRINTER_MODEL_KEYBOARD = build_reply_keyboard(
+    ("A1 (Combo)", "A1 mini (Combo)"),
+    ("P1P", "P1S (Combo)"),
+    ("X1C (Combo)", "X1E")
+)
+
+_CONFIRMATION_KEYBOARD = build_reply_keyboard(("❌ Скасувати", "✅ Підтверджую"))
+
+_NEXT_KEYBOARD = build_reply_keyboard(("Далі",))
+
 def get_main_keyboard() -> ReplyKeyboardMarkup:
     """Клавіатура головного меню"""
-    kb = [[
-        KeyboardButton(text="🔧 Поломка"),
-        KeyboardButton(text="🖨 Якість друку"),
-    ]]
-    return ReplyKeyboardMarkup(keyboard=kb, resize_keyboard=True)
+    return _MAIN_KEYBOARD
 
 def get_profile_name_keyboard() -> ReplyKeyboardMarkup:
     """Клавіатура для використання імені з профілю"""
-    kb = [[KeyboardButton(text="👤 Використати ім'я з профілю")]]
-    return ReplyKeyboardMarkup(keyboard=kb, resize_keyboard=True)
+    return _PROFILE_NAME_KEYBOARD
 
 def get_phone_keyboard() -> ReplyKeyboardMarkup:
     """Клавіатура з кнопкою надання номера телефону"""
-    kb = [[KeyboardButton(text="📱 Надати номер телефону", request_contact=True)]]
-    return ReplyKeyboardMarkup(keyboard=kb, resize_keyboard=True)
+    return _PHONE_KEYBOARD
 
 def get_printer_model_keyboard() -> ReplyKeyboardMarkup:
     """Клавіатура вибору моделі принтера"""
-    kb = [
-        [
-            KeyboardButton(text="A1 (Combo)"),
-            KeyboardButton(text="A1 mini (Combo)")
-        ],
-        [
-            KeyboardButton(text="P1P"),
-            KeyboardButton(text="P1S (Combo)")
-        ],
-        [
-            KeyboardButton(text="X1C (Combo)"),
-            KeyboardButton(text="X1E")
-        ]
-    ]
-    return ReplyKeyboardMarkup(keyboard=kb, resize_keyboard=True)
+    return _PRINTER_MODEL_KEYBOARD
 
 def get_confirmation_keyboard() -> ReplyKeyboardMarkup:
     """Клавіатура підтвердження заявки"""
-    kb = [[
-        KeyboardButton(text="❌ Скасувати"),
-        KeyboardButton(text="✅ Підтверджую")
-    ]]
-    return ReplyKeyboardMarkup(keyboard=kb, resize_keyboard=True)
+    return _CONFIRMATION_KEYBOARD
 
 def get_next_keyboard() -> ReplyKeyboardMarkup:
     """Клавіатура для переходу далі"""
-    kb = [[KeyboardButton(text="Далі")]]
-    return ReplyKeyboardMarkup(keyboard=kb, resize_keyboard=True)
+    return _NEXT_KEYBOARD
 
 # Створюємо об'єкт для видалення клавіатури
 remove_keyboard = ReplyKeyboardRemove()
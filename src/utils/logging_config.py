@@ -0,0 +1,250 @@
+"""
+Налаштування логування: JSON-записи, черга та фоновий потік запису
+
+Обробник кореневого логера лише кладе LogRecord у чергу - без вводу-виводу
+і, якщо аргументи незмінні, без форматування. Форматування повідомлення
+(``msg % args``), маскування персональних даних, серіалізація в JSON і запис
+у потік виконуються в окремому потоці QueueListener, тому цикл подій за це
+не платить.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+from datetime import datetime, timezone
+from itertools import count
+from typing import Dict, Optional, TextIO
+
+# Атрибути LogRecord; все інше в записі - поля, передані через extra=
+_RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+_EMAIL_RE = re.compile(r'[a-zA-Z0-9._%+-]+@([a-zA-Z0-9.-]+\.[a-zA-Z]{2,})')
+# Українські номери з роздільниками: +38 (050) 123-45-67, 380501234567, 0501234567.
+# Номер починається з 0 після коду країни, тому ID користувачів Telegram
+# (вони не починаються з 0) не маскуються
+_PHONE_RE = re.compile(
+    r'(?<!\d)(?:\+?38[\s-]*)?\(?0\d{2}\)?(?:[\s-]*\d){7}(?!\d)'
+)
+
+
+def redact(text: str) -> str:
+    """
+    Маскує email та номери телефонів
+
+    Від email лишається домен (``***@gmail.com``), від номера - останні дві
+    цифри, щоб записи одного користувача можна було зіставити.
+    """
+    if '@' in text:
+        text = _EMAIL_RE.sub(r'***@\1', text)
+    return _PHONE_RE.sub(lambda m: '***' + m.group()[-2:], text)
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Форматує запис як один рядок JSON
+
+    Поля: ts, level, logger, msg, exc; поля з ``extra=`` додаються як є.
+    Повідомлення, traceback і значення полів (нерядкові - у вигляді JSON)
+    проходять через redact().
+    """
+
+    def __init__(self, redact_pii: bool = True):
+        super().__init__()
+        self.redact_pii = redact_pii
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': redact(message) if self.redact_pii else message,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = _redact_value(value) if self.redact_pii else value
+        exc = record.exc_text
+        if not exc and record.exc_info:
+            exc = self.formatException(record.exc_info)
+        if exc:
+            entry['exc'] = redact(exc) if self.redact_pii else exc
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _redact_value(value):
+    """Маскує дані в значенні поля extra; вкладені структури перевіряються у вигляді JSON"""
+    if isinstance(value, str):
+        return redact(value)
+    if value is None or isinstance(value, bool):
+        return value
+    text = json.dumps(value, ensure_ascii=False, default=str)
+    redacted = redact(text)
+    if redacted == text:
+        return value
+    try:
+        return json.loads(redacted)
+    except ValueError:
+        # Замаскований номер на місці числа - вже не JSON
+        return redacted
+
+
+class TextFormatter(logging.Formatter):
+    """Звичайний текстовий формат (для локальної розробки) з маскуванням даних"""
+
+    def __init__(self, redact_pii: bool = True):
+        super().__init__('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        self.redact_pii = redact_pii
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        return redact(text) if self.redact_pii else text
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Пропускає лише кожен N-й DEBUG-запис обраних логерів
+
+    Правила задаються префіксами імен логерів: ``{'services.media_group': 0.1}``
+    залишає 10% DEBUG-записів цього логера та його дочірніх. Записи INFO і
+    вище не відкидаються. Рішення приймається лічильником, без випадкових
+    чисел, і кешується для кожного імені логера.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._every: Dict[str, int] = {}
+        self._counters: Dict[str, count] = {}
+
+    def _every_for(self, name: str) -> int:
+        every = self._every.get(name)
+        if every is None:
+            rate = 1.0
+            prefix = ''
+            for rule, rule_rate in self.rates.items():
+                matches = name == rule or name.startswith(rule + '.')
+                if matches and len(rule) > len(prefix):
+                    prefix, rate = rule, rule_rate
+            every = 0 if rate <= 0 else max(1, round(1 / rate))
+            self._every[name] = every
+            self._counters[name] = count()
+        return every
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        every = self._every_for(record.name)
+        if every == 1:
+            return True
+        return every != 0 and next(self._counters[record.name]) % every == 0
+
+
+_IMMUTABLE_TYPES = (str, int, float, bool, bytes, type(None))
+_EXC_FORMATTER = logging.Formatter()
+
+
+def _has_immutable_args(args) -> bool:
+    if not args:
+        return True
+    # Словник у args - це сам аргумент виклику (logger.info('%(a)s', mapping))
+    return isinstance(args, tuple) and all(isinstance(value, _IMMUTABLE_TYPES) for value in args)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler без форматування у потоці, що логує
+
+    Стандартний QueueHandler.prepare() форматує повідомлення перед тим, як
+    покласти запис у чергу. Тут запис з незмінними аргументами (рядки, числа)
+    передається як є, і ``msg % args`` виконує слухач. Якщо серед аргументів
+    є змінювані об'єкти (словники, заявки), повідомлення форматується
+    одразу: інакше в лог потрапив би їхній стан на момент запису. Traceback
+    теж форматується одразу, щоб запис у черзі не тримав кадри стеку.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if not isinstance(record.msg, str) or not _has_immutable_args(record.args):
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _EXC_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def parse_sampling(spec: str) -> Dict[str, float]:
+    """Розбирає LOG_SAMPLING виду ``services.media_group=0.1,aiogram.event=0.01``"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, rate = item.partition('=')
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+# Фоновий потік запису, запущений setup_logging()
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging(
+    level: Optional[str] = None,
+    fmt: Optional[str] = None,
+    sampling: Optional[Dict[str, float]] = None,
+    redact_pii: bool = True,
+    stream: TextIO = sys.stderr
+) -> None:
+    """
+    Налаштовує кореневий логер
+
+    За замовчуванням параметри беруться зі змінних оточення LOG_LEVEL
+    (INFO), LOG_FORMAT (json або text) та LOG_SAMPLING.
+
+    Фоновий потік запису зупиняється при виході з процесу або явно через
+    stop_logging(), дописуючи всі записи з черги.
+    """
+    global _listener
+    stop_logging()
+
+    level = (level or os.getenv('LOG_LEVEL', 'INFO')).upper()
+    fmt = (fmt or os.getenv('LOG_FORMAT', 'json')).lower()
+    if sampling is None:
+        sampling = parse_sampling(os.getenv('LOG_SAMPLING', ''))
+
+    output = logging.StreamHandler(stream)
+    output.setFormatter(JsonFormatter(redact_pii) if fmt == 'json' else TextFormatter(redact_pii))
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    handler = _DeferredQueueHandler(records)
+    if sampling:
+        handler.addFilter(SamplingFilter(sampling))
+
+    # Не збираємо для кожного запису дані, яких немає у форматі: потік,
+    # процес, задачу asyncio
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    logging.logAsyncioTasks = False
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    """Дописує записи з черги та зупиняє фоновий потік запису"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
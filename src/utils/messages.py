@@ -1,4 +1,5 @@
 """Текстові повідомлення для бота"""
+from .templates import Template
 
 # Головне меню
 WELCOME_MESSAGE = """Вітаю! Я бот підтримки Bambu Lab Україна 🇺🇦
@@ -19,14 +20,16 @@ REQUEST_PRINTER_MODEL = "🖨 Вкажіть модель вашого прин
 REQUEST_ISSUE_DESCRIPTION = "✍️ Напишіть код поломки та опишіть проблему"
 REQUEST_PHOTO = "📸 Надішліть фото або відео, які демонструють проблему (до 10 фото) або оберіть 'Далі'"
 
-# Підтвердження
-ORDER_CONFIRMED = "✅ Зафіксували номер замовлення: {}"
+# Підтвердження (шаблони: введені користувачем значення екрануються для HTML)
+ORDER_CONFIRMED = Template("✅ Зафіксували номер замовлення: {order_number}")
 ORDER_NOT_FOUND = "✅ Зафіксували, що ви купували не у нас"
-NAME_CONFIRMED = "✅ Зафіксували ваші дані: {} {}"
-PHONE_CONFIRMED = "✅ Зафіксували номер телефону: {}"
-MODEL_CONFIRMED = "✅ Зафіксували модель принтеру: {}"
+NAME_CONFIRMED = Template("✅ Зафіксували ваші дані: {first_name} {last_name}")
+FULL_NAME_CONFIRMED = Template("✅ Зафіксували ваше ім'я: {full_name}")
+PHONE_CONFIRMED = Template("✅ Зафіксували номер телефону: {phone}")
+MODEL_CONFIRMED = Template("✅ Зафіксували модель принтеру: {model}")
 ISSUE_CONFIRMED = "✅ Зафіксували опис проблеми"
-PHOTO_ADDED = "✅ Фото додано ({}/10) Можете додати ще фото або натисніть 'Далі'"
+ISSUE_DESCRIPTION_CONFIRMED = Template(ISSUE_CONFIRMED + ":\n{description}")
+PHOTO_ADDED = Template("✅ Фото додано ({count}/10) Можете додати ще фото або натисніть 'Далі'")
 
 # Помилки
 PHONE_ERROR = "❌ Введіть будь ласка номер тільки у форматі +380XXXXXXXXX"
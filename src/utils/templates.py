@@ -0,0 +1,159 @@
+"""
+Скомпільовані шаблони повідомлень з HTML-екрануванням
+
+Шаблон розбирається один раз при створенні: статичні фрагменти і поля
+зберігаються окремо, тому render() лише екранує значення та склеює готові
+частини одним join замість повторного розбору рядка чи ланцюжка ``+=``.
+"""
+import html
+import re
+from string import Formatter
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Максимальна довжина текстового повідомлення Telegram
+MESSAGE_LIMIT = 4096
+
+_TAG = re.compile(r'<[^>]*>')
+
+
+def escape(value: Any) -> str:
+    """
+    Екранує текст для parse_mode='HTML'
+
+    Telegram вимагає екранувати лише &, < та >. Кожен символ перевіряється
+    одним проходом ``in``, заміна виконується тільки якщо він є, тож
+    звичайний текст без спецсимволів повертається без копіювання.
+    """
+    text = value if isinstance(value, str) else str(value)
+    if '&' in text:
+        text = text.replace('&', '&amp;')
+    if '<' in text:
+        text = text.replace('<', '&lt;')
+    if '>' in text:
+        text = text.replace('>', '&gt;')
+    return text
+
+
+class Template:
+    """
+    Шаблон у синтаксисі str.format з іменованими полями: ``"👤 <b>Клієнт:</b> {name}"``
+
+    При створенні шаблон компілюється у функцію з f-рядком, де статичні
+    фрагменти вже вбудовані, а кожне поле обгорнуте escape(), тож render()
+    коштує як звичайний f-рядок. Значення полів екрануються, розмітка самого
+    шаблону - ні; поля зі списку ``raw`` вставляються як є (для вже готових
+    HTML-фрагментів).
+    """
+
+    __slots__ = ('source', 'fields', 'render')
+
+    def __init__(self, source: str, raw: Iterable[str] = ()):
+        raw = frozenset(raw)
+        namespace: Dict[str, Any] = {'_escape': escape, '_format': format}
+        body: List[str] = []
+        fields: List[str] = []
+        for literal, name, spec, conversion in Formatter().parse(source):
+            body.append(literal.replace('{', '{{').replace('}', '}}'))
+            if name is None:
+                continue
+            if not name.isidentifier() or conversion:
+                raise ValueError(f"Шаблон підтримує лише іменовані поля: {source!r}")
+            expression = name
+            if spec:
+                namespace[f'_spec{len(fields)}'] = spec
+                expression = f'_format({name}, _spec{len(fields)})'
+            if name not in raw:
+                expression = f'_escape({expression})'
+            body.append('{' + expression + '}')
+            if name not in fields:
+                fields.append(name)
+
+        arguments = f"*, {', '.join(fields)}" if fields else ''
+        code = f"def render({arguments}):\n    return f{''.join(body)!r}\n"
+        exec(compile(code, f'<template {source[:40]!r}>', 'exec'), namespace)
+        self.source = source
+        self.fields = tuple(fields)
+        self.render: Callable[..., str] = namespace['render']
+
+    def __call__(self, **values: Any) -> str:
+        return self.render(**values)
+
+    def __str__(self) -> str:
+        return self.source
+
+    def __repr__(self) -> str:
+        return f"Template({self.source!r})"
+
+
+def message_length(text: str) -> int:
+    """Довжина тексту в одиницях UTF-16, як її рахує Telegram"""
+    if text.isascii():
+        return len(text)
+    return len(text.encode('utf-16-le')) // 2
+
+
+def html_text_length(text: str) -> int:
+    """
+    Довжина тексту з розміткою HTML після розбору сутностей: теги не
+    рахуються, ``&amp;`` та інші сутності рахуються як один символ.
+    Саме з цією довжиною Telegram порівнює ліміти повідомлення і підпису.
+    """
+    if '<' in text or '&' in text:
+        text = html.unescape(_TAG.sub('', text))
+    return message_length(text)
+
+
+def split_message(text: str, limit: int = MESSAGE_LIMIT) -> List[str]:
+    """
+    Розбиває текст на частини, кожна з яких вміщується в одне повідомлення
+
+    Розрив робиться по абзацу, інакше по рядку, інакше по пробілу. Теги в
+    шаблонах не переходять через рядки, тому розмітка не розривається; при
+    вимушеному розриві посеред рядка не розрізаються HTML-сутності (&amp;).
+
+    Args:
+        text: Текст повідомлення (HTML)
+        limit: Максимальна довжина частини
+
+    Returns:
+        Список частин (один елемент, якщо текст вміщується)
+    """
+    # Кожен символ займає не більше двох одиниць UTF-16
+    if len(text) * 2 <= limit or message_length(text) <= limit:
+        return [text]
+
+    chunks = []
+    while text:
+        if message_length(text) <= limit:
+            chunks.append(text)
+            break
+        cut = _find_cut(text, limit)
+        chunk = text[:cut].rstrip()
+        if chunk:
+            chunks.append(chunk)
+        text = text[cut:].lstrip('\n')
+    return chunks
+
+
+def _find_cut(text: str, limit: int) -> int:
+    """Позиція розриву: найдовший префікс до limit одиниць UTF-16"""
+    # Символи, що займають дві одиниці UTF-16 (емодзі), можуть потрапити на
+    # межу; 'ignore' відкидає розрізану сурогатну пару
+    end = len(text.encode('utf-16-le')[:limit * 2].decode('utf-16-le', 'ignore'))
+
+    # Розрив ближче до початку дав би занадто короткі частини
+    for separator in ('\n\n', '\n', ' '):
+        position = text.rfind(separator, end // 2, end)
+        if position > 0:
+            return position + len(separator)
+
+    # Не розрізаємо HTML-сутність навпіл
+    ampersand = text.rfind('&', max(0, end - 8), end)
+    if ampersand > 0 and ';' not in text[ampersand:end]:
+        return ampersand
+    return end
+
+
+def render_sections(sections: Iterable[Optional[str]], separator: str = '') -> str:
+    """Склеює відрендерені секції, пропускаючи порожні"""
+    return separator.join([section for section in sections if section])
@@ -1,17 +1,105 @@
 import re
+from typing import Iterable, List, Optional, Tuple
+
+from .messages import PHONE_ERROR
+
+# Шаблони компілюються один раз при імпорті модуля
+_EMAIL = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
+_PHONE = r'\+?(?:38)?0(\d{9})'
+EMAIL_RE = re.compile(_EMAIL)
+PHONE_RE = re.compile(_PHONE)
+
+# Роздільники, які користувачі ставлять у номерах: "+38 (050) 123-45-67"
+_PHONE_SEPARATORS = str.maketrans('', '', ' \t-().')
+# Інші нецифрові символи ("050/123 45 67") теж ігноруються, як і раніше
+_NON_DIGITS = re.compile(r'\D')
+
+PHONE_PREFIX = '+380'
+DESCRIPTION_MIN_LENGTH = 10
+DESCRIPTION_MAX_LENGTH = 3000
 
 
 def validate_email(email: str) -> bool:
     """Валідація email адреси"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return bool(re.match(pattern, email))
+    return EMAIL_RE.fullmatch(email) is not None
+
+
+def parse_phone(phone: str) -> Optional[str]:
+    """
+    Нормалізує український номер телефону
+
+    Приймає номери з будь-якими роздільниками та з кодом країни або без
+    нього (0501234567, 380501234567, +38 (050) 123-45-67, 050/123 45 67):
+    враховуються лише цифри.
+
+    Returns:
+        Номер у форматі +380XXXXXXXXX або None, якщо номер некоректний
+    """
+    match = PHONE_RE.fullmatch(phone)
+    if match is None:
+        # Роздільники прибираємо лише за потреби: translate помітно повільніший
+        stripped = phone.translate(_PHONE_SEPARATORS)
+        match = PHONE_RE.fullmatch(stripped)
+        if match is None and not stripped.lstrip('+').isdigit():
+            match = PHONE_RE.fullmatch(_NON_DIGITS.sub('', stripped))
+    return PHONE_PREFIX + match.group(1) if match else None
 
 
 def validate_phone(phone: str) -> bool:
     """Валідація номера телефону (український формат)"""
-    # Видаляємо всі символи крім цифр
-    digits_only = re.sub(r'\D', '', phone)
-    # Перевіряємо, чи це український номер (починається з 0 або +380)
-    if digits_only.startswith('380'):
-        digits_only = '0' + digits_only[3:]
-    return len(digits_only) == 10 and digits_only.startswith('0')
+    return parse_phone(phone) is not None
+
+
+def validate_many(values: Iterable[str], kind: str) -> List[Optional[str]]:
+    """
+    Перевіряє багато значень одразу (наприклад, при імпорті чи міграції заявок)
+
+    Args:
+        values: Значення для перевірки
+        kind: 'email' або 'phone'
+
+    Returns:
+        Для кожного значення: email без змін / номер у форматі +380XXXXXXXXX,
+        або None, якщо значення некоректне
+    """
+    if kind == 'phone':
+        return [parse_phone(value) for value in values]
+    if kind == 'email':
+        fullmatch = EMAIL_RE.fullmatch
+        return [value if fullmatch(value) else None for value in values]
+    raise ValueError(f"Невідомий тип значень: {kind}")
+
+
+class PhoneValidator:
+    """Перевірка номера телефону з повідомленням для користувача"""
+
+    @staticmethod
+    def validate(phone: Optional[str]) -> Tuple[bool, str]:
+        """
+        Returns:
+            (True, номер у форматі +380XXXXXXXXX) або (False, текст помилки)
+        """
+        normalized = parse_phone(phone) if phone else None
+        if normalized is None:
+            return False, PHONE_ERROR
+        return True, normalized
+
+
+class IssueDescriptionValidator:
+    """Перевірка опису проблеми"""
+
+    @staticmethod
+    def validate(description: Optional[str]) -> Tuple[bool, str]:
+        """
+        Returns:
+            (True, опис без зайвих пробілів) або (False, текст помилки)
+        """
+        description = (description or '').strip()
+        if len(description) < DESCRIPTION_MIN_LENGTH:
+            return False, (
+                f"❌ Опишіть, будь ласка, проблему детальніше "
+                f"(щонайменше {DESCRIPTION_MIN_LENGTH} символів)"
+            )
+        if len(description) > DESCRIPTION_MAX_LENGTH:
+            return False, f"❌ Опис занадто довгий (до {DESCRIPTION_MAX_LENGTH} символів)"
+        return True, description
@@ -0,0 +1,100 @@
+"""
+RedisApplicationStore з двома репліками на одному Redis: локальний кеш
+не повертає застарілі чи видалені заявки, а додавання до списків не
+перезаписують значення, додані іншою реплікою
+"""
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip('fakeredis')
+pytest.importorskip('lupa')  # Lua-скрипти у fakeredis
+
+from src.services.application_store import RedisApplicationStore  # noqa: E402
+
+
+def run_replicas(scenario) -> None:
+    """Запускає сценарій із двома сховищами на спільному fakeredis"""
+    async def main():
+        server = fakeredis.FakeServer()
+        a = RedisApplicationStore(fakeredis.FakeAsyncRedis(server=server))
+        b = RedisApplicationStore(fakeredis.FakeAsyncRedis(server=server))
+        try:
+            await scenario(a, b)
+        finally:
+            await a.close()
+            await b.close()
+
+    asyncio.run(main())
+
+
+def test_update_from_other_replica_is_visible() -> None:
+    async def scenario(a, b):
+        await a.create(1)
+        await a.flush()
+        assert (await b.get(1)).email is None
+
+        await a.update(1, email='user@example.com')
+        await a.flush()
+        assert (await b.get(1)).email == 'user@example.com'
+
+    run_replicas(scenario)
+
+
+def test_delete_from_other_replica_is_visible() -> None:
+    async def scenario(a, b):
+        await a.create(1)
+        await a.flush()
+        assert await b.get(1) is not None
+
+        await a.delete(1)
+        await a.flush()
+        assert await b.get(1) is None
+
+    run_replicas(scenario)
+
+
+def test_appends_from_both_replicas_are_kept() -> None:
+    async def scenario(a, b):
+        await a.create(1)
+        await a.flush()
+        await b.get(1)
+
+        await a.append(1, 'photos', 'u1')
+        await a.flush()
+        await b.append(1, 'photos', 'u2')
+        await b.flush()
+
+        assert (await a.get(1)).photos == ['u1', 'u2']
+        assert (await b.get(1)).photos == ['u1', 'u2']
+
+    run_replicas(scenario)
+
+
+def test_concurrent_appends_are_not_lost() -> None:
+    async def scenario(a, b):
+        await a.create(1)
+        await a.flush()
+        await b.get(1)
+
+        # Обидві репліки дописують до списку до того, як побачили зміни одна одної
+        await a.append(1, 'photos', 'u1')
+        await b.append(1, 'photos', 'u2')
+        await a.flush()
+        await b.flush()
+
+        assert sorted((await a.get(1)).photos) == ['u1', 'u2']
+        assert sorted((await b.get(1)).photos) == ['u1', 'u2']
+
+    run_replicas(scenario)
+
+
+def test_cached_read_is_served_without_decoding() -> None:
+    async def scenario(a, b):
+        application = await a.create(1)
+        await a.update(1, full_name='Іван')
+        await a.flush()
+        assert await a.get(1) is application
+        assert (await b.get(1)).full_name == 'Іван'
+
+    run_replicas(scenario)
@@ -0,0 +1,102 @@
+"""
+ContentStore: підрахунок посилань, відновлення індексу зі знімка та
+журналу, гонка додавання з видаленням того самого вмісту
+"""
+import os
+from pathlib import Path
+
+from src.services.content_store import ContentStore
+
+
+def make_store(tmp_path: Path) -> ContentStore:
+    (tmp_path / 'photos').mkdir(exist_ok=True)
+    return ContentStore(tmp_path / 'cas')
+
+
+def add(store: ContentStore, tmp_path: Path, name: str, data: bytes) -> str:
+    return store.add_bytes(data, tmp_path / 'photos' / name, f'photos/{name}')
+
+
+def test_same_content_is_stored_once(tmp_path: Path) -> None:
+    store = make_store(tmp_path)
+    digest = add(store, tmp_path, 'a.jpg', b'photo')
+    assert add(store, tmp_path, 'b.jpg', b'photo') == digest
+    assert store.ref_count(digest) == 2
+    assert (tmp_path / 'photos' / 'b.jpg').read_bytes() == b'photo'
+
+    assert store.release('photos/a.jpg') is False
+    assert store.blob_path(digest).exists()
+    assert store.release('photos/b.jpg') is True
+    assert not store.blob_path(digest).exists()
+    assert store.ref_count(digest) == 0
+    assert store.release('photos/b.jpg') is None
+
+
+def test_index_is_restored_from_journal(tmp_path: Path) -> None:
+    store = make_store(tmp_path)
+    kept = add(store, tmp_path, 'a.jpg', b'one')
+    add(store, tmp_path, 'b.jpg', b'one')
+    released = add(store, tmp_path, 'c.jpg', b'two')
+    store.release_many(['photos/b.jpg', 'photos/c.jpg'])
+    store.close()
+
+    restored = ContentStore(tmp_path / 'cas')
+    assert restored.ref_count(kept) == 1
+    assert restored.ref_count(released) == 0
+    assert restored.release('photos/a.jpg') is True
+
+
+def test_index_is_restored_after_compaction(tmp_path: Path) -> None:
+    store = make_store(tmp_path)
+    store.COMPACT_MIN = 3
+    digests = [add(store, tmp_path, f'{i}.jpg', bytes([i])) for i in range(5)]
+    store.release('photos/0.jpg')
+    store.close()
+    assert (tmp_path / 'cas' / ContentStore.INDEX_FILE).exists()
+
+    restored = ContentStore(tmp_path / 'cas')
+    assert [restored.ref_count(digest) for digest in digests] == [0, 1, 1, 1, 1]
+
+
+def test_incomplete_journal_line_is_dropped(tmp_path: Path) -> None:
+    store = make_store(tmp_path)
+    digest = add(store, tmp_path, 'a.jpg', b'photo')
+    store.close()
+    journal = tmp_path / 'cas' / ContentStore.JOURNAL_FILE
+    with open(journal, 'ab') as f:
+        f.write(b'["-", "photos/a.j')
+
+    restored = ContentStore(tmp_path / 'cas')
+    assert restored.ref_count(digest) == 1
+    # Наступний запис не склеюється з відкинутим рядком
+    add(restored, tmp_path, 'b.jpg', b'photo')
+    restored.close()
+    assert ContentStore(tmp_path / 'cas').ref_count(digest) == 2
+
+
+def test_add_when_content_is_released_before_commit(tmp_path: Path) -> None:
+    store = make_store(tmp_path)
+    digest = add(store, tmp_path, 'a.jpg', b'photo')
+    commit = store._commit
+
+    def racing_commit(*args, **kwargs):
+        # Останнє посилання звільняється між перевіркою в add_bytes і _commit
+        store.release('photos/a.jpg')
+        return commit(*args, **kwargs)
+
+    store._commit = racing_commit
+    assert add(store, tmp_path, 'b.jpg', b'photo') == digest
+    assert store.ref_count(digest) == 1
+    assert (tmp_path / 'photos' / 'b.jpg').read_bytes() == b'photo'
+
+
+def test_existing_target_is_replaced(tmp_path: Path) -> None:
+    store = make_store(tmp_path)
+    old = add(store, tmp_path, 'a.jpg', b'old')
+    new = add(store, tmp_path, 'a.jpg', b'new')
+
+    assert (tmp_path / 'photos' / 'a.jpg').read_bytes() == b'new'
+    assert store.ref_count(old) == 0
+    assert not store.blob_path(old).exists()
+    assert store.ref_count(new) == 1
+    assert not [name for name in os.listdir(store.blob_path(new).parent) if name.endswith('.tmp')]
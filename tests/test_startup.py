@@ -0,0 +1,37 @@
+"""
+Регресійна перевірка холодного старту: імпорт src.main не тягне модулі,
+які мають завантажуватися лише за потреби
+
+Список модулів спільний із бенчмарком benchmarks/startup.py, який також
+показує час імпорту.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from startup import DEFERRED_MODULES  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def imported_modules() -> set:
+    """Модулі, завантажені після ``import src.main`` у новому процесі"""
+    process = subprocess.run(
+        [sys.executable, '-c', 'import sys, src.main; print("\\n".join(sys.modules))'],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        env={**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'}
+    )
+    assert process.returncode == 0, process.stderr[-2000:]
+    return set(process.stdout.split())
+
+
+@pytest.mark.parametrize('module', DEFERRED_MODULES)
+def test_module_is_deferred(imported_modules: set, module: str) -> None:
+    loaded = sorted(name for name in imported_modules if name == module or name.startswith(module + '.'))
+    assert not loaded, f"{module} імпортується разом із src.main: {', '.join(loaded)}"
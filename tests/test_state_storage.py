@@ -0,0 +1,100 @@
+"""
+RedisStateStorage (бот на aiogram) на fakeredis: діалоги в бінарному
+вигляді, користувачі в hash, ID повідомлень окремим списком
+"""
+import asyncio
+import os
+import sys
+from datetime import timedelta
+
+import pytest
+
+fakeredis = pytest.importorskip('fakeredis')
+pytest.importorskip('aiogram')
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# Модулі бота на aiogram імпортуються як верхньорівневі пакети з src
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from models.dialog import DialogState  # noqa: E402
+from models.storage import RedisStateStorage  # noqa: E402
+from models.user import User, decode_user, encode_user  # noqa: E402
+
+
+def dialog_storage(redis) -> RedisStateStorage:
+    return RedisStateStorage(
+        redis,
+        'test:dialog:',
+        DialogState.to_bytes,
+        lambda user_id, data: DialogState.from_bytes(data),
+        timedelta(days=2),
+        binary=True
+    )
+
+
+def user_storage(redis) -> RedisStateStorage:
+    return RedisStateStorage(redis, 'test:user:', encode_user, decode_user, timedelta(days=30))
+
+
+def test_dialog_roundtrip_and_ttl() -> None:
+    async def main():
+        redis = fakeredis.FakeAsyncRedis()
+        storage = dialog_storage(redis)
+        dialog = DialogState(user_id=1, user_name='Іван', photo_files=['a.jpg'], current_step='phone')
+        await storage.set(1, dialog)
+
+        loaded = await storage.get(1)
+        assert loaded == dialog
+        assert await storage.get(2) is None
+        assert 0 < await redis.ttl('test:dialog:1') <= 2 * 24 * 3600
+
+    asyncio.run(main())
+
+
+def test_user_hash_skips_empty_fields() -> None:
+    async def main():
+        redis = fakeredis.FakeAsyncRedis()
+        storage = user_storage(redis)
+        await storage.set(1, User(user_id=1, first_name='Іван', last_name=''))
+        await storage.set(2, User(user_id=2, first_name='', last_name='', phone_number='+380501234567'))
+
+        assert await redis.hgetall('test:user:1') == {b'first_name': 'Іван'.encode(), b'last_name': b''}
+        users = await storage.get_many([1, 2, 3])
+        assert users == {
+            1: User(user_id=1, first_name='Іван', last_name=''),
+            2: User(user_id=2, first_name='', last_name='', phone_number='+380501234567'),
+        }
+
+    asyncio.run(main())
+
+
+def test_message_ids_survive_set_and_are_popped_once() -> None:
+    async def main():
+        storage = dialog_storage(fakeredis.FakeAsyncRedis())
+        # ID для неіснуючого запису не зберігаються
+        await storage.push_ids(1, [10])
+        assert await storage.pop_ids(1) == []
+
+        await storage.set(1, DialogState(user_id=1))
+        await storage.push_ids(1, [10, 11])
+        await storage.set(1, DialogState(user_id=1, current_step='name'))
+        await storage.push_ids(1, [12])
+
+        assert await storage.pop_ids(1) == [10, 11, 12]
+        assert await storage.pop_ids(1) == []
+
+    asyncio.run(main())
+
+
+def test_delete_removes_record_and_ids() -> None:
+    async def main():
+        redis = fakeredis.FakeAsyncRedis()
+        storage = dialog_storage(redis)
+        await storage.set(1, DialogState(user_id=1))
+        await storage.push_ids(1, [10])
+        await storage.delete(1)
+
+        assert await storage.get(1) is None
+        assert await redis.exists('test:dialog:1', 'test:dialog:1:ids') == 0
+
+    asyncio.run(main())
@@ -0,0 +1,44 @@
+"""
+parse_phone приймає ті самі номери, що й попередня validate_phone, яка
+відкидала всі нецифрові символи
+
+Попередня реалізація та генератор номерів спільні з бенчмарком
+benchmarks/validators.py.
+"""
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from validators import legacy_validate_phone, sample_phones  # noqa: E402
+from src.utils.validators import parse_phone  # noqa: E402
+
+
+@pytest.mark.parametrize('phone, expected', [
+    ('0501234567', '+380501234567'),
+    ('+380501234567', '+380501234567'),
+    ('380501234567', '+380501234567'),
+    ('+38 (050) 123-45-67', '+380501234567'),
+    ('050/123 45 67', '+380501234567'),
+    ('050.123.45.67', '+380501234567'),
+    ('050_123_45_67', '+380501234567'),
+    ('тел. 050 123 45 67', '+380501234567'),
+    ('12345', None),
+    ('+1 555 010 9999', None),
+    ('80501234567', None),
+])
+def test_parse_phone(phone: str, expected) -> None:
+    assert parse_phone(phone) == expected
+
+
+@pytest.mark.parametrize('phone', ['050/123 45 67', '050_123_45_67', '(050)1234567', '38-050-123-45-67'])
+def test_accepts_what_legacy_accepted(phone: str) -> None:
+    assert (parse_phone(phone) is not None) == legacy_validate_phone(phone)
+
+
+def test_matches_legacy_on_sample() -> None:
+    for phone in sample_phones(2000):
+        assert (parse_phone(phone) is not None) == legacy_validate_phone(phone), phone